@@ -37,7 +37,9 @@ class Admin(commands.Cog):
     async def reload(self, ctx, extension):
         extension = f"belphegor.{extension}"
         try:
-            if extension in self.bot.extensions:
+            if extension in self.bot.lazy_extensions:
+                await self.bot.load_lazy_extension(extension)
+            elif extension in self.bot.extensions:
                 self.bot.reload_extension(extension)
             else:
                 self.bot.load_extension(extension)
@@ -124,7 +126,7 @@ class Admin(commands.Cog):
     @checks.owner_only()
     async def restart(self, ctx):
         self.bot.restart_flag = True
-        await self.bot.logout()
+        await self.bot.close()
 
     @commands.command(hidden=True)
     @checks.owner_only()
@@ -203,8 +205,71 @@ class Admin(commands.Cog):
 
     @commands.command(hidden=True)
     @checks.owner_only()
-    async def mongo(self, ctx, col, *, raw_query):
-        raw_query = utils.clean_codeblock(raw_query)
+    async def policystats(self, ctx):
+        policies = self.bot.command_policies.values()
+        checked = sum(p.checked for p in policies)
+        denied = sum(p.denied for p in policies)
+        check_time = sum(p.check_time for p in policies)
+        average = check_time / checked if checked else 0
+        await ctx.send(
+            f"```\n"
+            f"Policies: {len(self.bot.command_policies)}\n"
+            f"Checked:  {checked}\n"
+            f"Denied:   {denied}\n"
+            f"Time:     {check_time/1000000:.3f}ms total, {average:.0f}ns average\n"
+            f"```"
+        )
+
+    @commands.command(hidden=True)
+    @checks.owner_only()
+    async def tasks(self, ctx):
+        await ctx.send(f"```\n{self.bot.supervisor.report()}\n```")
+
+    @commands.command(hidden=True)
+    @checks.owner_only()
+    async def cpuqueue(self, ctx):
+        await ctx.send(f"```\n{self.bot.cpu_scheduler.report()}\n```")
+
+    @commands.command(hidden=True)
+    @checks.owner_only()
+    async def dbloader(self, ctx):
+        await ctx.send(f"```\n{self.bot.db.stats.report()}\n```")
+
+    @commands.command(hidden=True)
+    @checks.owner_only()
+    async def counters(self, ctx, flush=None):
+        if flush == "flush":
+            written = await self.bot.counters.flush()
+            await ctx.send(f"Flushed {written} documents.")
+        else:
+            await ctx.send(f"```\n{self.bot.counters.report()}\n```")
+
+    @commands.command(hidden=True)
+    @checks.owner_only()
+    async def startup(self, ctx):
+        await ctx.send(f"```\n{self.bot.extension_report()}\n```")
+
+    @commands.command(hidden=True)
+    @checks.owner_only()
+    async def metrics(self, ctx, sort="total"):
+        if sort == "dump":
+            return await ctx.send(file=discord.File.from_str(self.bot.metrics.dump(), "metrics.txt"))
+        elif sort not in ("total", "count", "max", "average"):
+            return await ctx.send("Sort by total, count, max or average.")
+        await ctx.send(f"```\n{self.bot.metrics.command_table(sort=sort)}\n```")
+
+    @commands.command(hidden=True)
+    @checks.owner_only()
+    async def mongo(self, ctx, col, *, raw_query=""):
+        if col == "slow":
+            sort = raw_query or "max"
+            if sort not in ("max", "total", "count", "average"):
+                return await ctx.send("Sort by max, total, count or average.")
+            return await ctx.send(f"```\n{self.bot.query_profiler.table(15, sort=sort)}\n```")
+        elif col == "explain" and raw_query.isdigit():
+            return await self.explain_slow_query(ctx, int(raw_query))
+
+        raw_query, explain = self.strip_explain(utils.clean_codeblock(raw_query))
         try:
             raw = eval(raw_query, globals(), locals())
         except:
@@ -217,6 +282,8 @@ class Admin(commands.Cog):
             query = raw[0]
             projection = raw[1]
             projection["_id"] = False
+        if explain:
+            return await self.send_explain(ctx, {"find": col, "filter": query, "projection": projection})
         data = []
         try:
             async for d in self.bot.db[col].find(query, projection=projection):
@@ -235,12 +302,14 @@ class Admin(commands.Cog):
     @commands.command(hidden=True)
     @checks.owner_only()
     async def aggregate(self, ctx, col, *, raw_query):
-        raw_query = utils.clean_codeblock(raw_query)
+        raw_query, explain = self.strip_explain(utils.clean_codeblock(raw_query))
         try:
             query = eval(raw_query, globals(), locals())
         except:
             return await ctx.send(f"```\n{traceback.format_exc()}\n```")
 
+        if explain:
+            return await self.send_explain(ctx, {"aggregate": col, "pipeline": query, "cursor": {}})
         data = []
         try:
             async for d in self.bot.db[col].aggregate(query):
@@ -257,6 +326,56 @@ class Admin(commands.Cog):
         else:
             await ctx.send("Nothing found.")
 
+    def strip_explain(self, raw_query):
+        if raw_query.startswith("explain "):
+            return utils.clean_codeblock(raw_query[8:]), True
+        else:
+            return raw_query, False
+
+    async def send_explain(self, ctx, command):
+        try:
+            result = await self.bot.db.command({"explain": command, "verbosity": "executionStats"})
+        except pymongo.errors.OperationFailure as e:
+            return await ctx.send(e)
+        text = json.dumps(result, indent=4, ensure_ascii=False, default=repr)
+        await ctx.send(file=discord.File(BytesIO(text.encode("utf-8")), filename="explain.json"))
+
+    async def explain_slow_query(self, ctx, position):
+        query_profiler = self.bot.query_profiler
+        items = query_profiler.slowest(position)
+        if not 0 < position <= len(items):
+            return await ctx.send("Position out of range.")
+        stats = items[position-1]
+        try:
+            info = await query_profiler.explain(self.bot.db, stats)
+        except pymongo.errors.OperationFailure as e:
+            return await ctx.send(e)
+        if info is None:
+            return await ctx.send(f"{stats.command_name} can't be explained.")
+        shape = json.dumps(stats.shape, ensure_ascii=False, default=repr)
+        await ctx.send(
+            f"```\n{stats.command_name} {stats.collection}: {shape[:1500]}\n"
+            f"Plan:          {info['plan']}\n"
+            f"Docs examined: {info['docs_examined']}\n"
+            f"Keys examined: {info['keys_examined']}\n"
+            f"Returned:      {info['returned']}\n```"
+        )
+
+    @commands.command(hidden=True)
+    @checks.owner_only()
+    async def indexes(self, ctx):
+        await ctx.send(f"```\n{self.bot.index_registry.report()}\n\nSearch indexes:\n{self.bot.search_indexes.report()}\n```")
+
+    @commands.command(hidden=True)
+    @checks.owner_only()
+    async def searchcache(self, ctx, clear=None):
+        results = self.bot.search_indexes.results
+        if clear == "clear":
+            results.clear()
+            await ctx.confirm()
+        else:
+            await ctx.send(f"```\n{results.report()}\n```")
+
     @commands.command(hidden=True, aliases=["sudo"])
     @checks.owner_only()
     async def force(self, ctx, *, cmd):
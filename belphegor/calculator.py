@@ -864,6 +864,8 @@ class MathParse(BaseParse):
 #==================================================================================================================================================
 
 class Calculator(commands.Cog):
+    snapshot_version = 1
+
     def __init__(self, bot):
         self.bot = bot
         try:
@@ -874,6 +876,11 @@ class Calculator(commands.Cog):
             del bot.enable_calc_log
 
         self.parsers = data_type.AutoCleanupDict(120, loop=bot.loop)
+        for user_id, parser in (bot.snapshots.pop(self) or {}).items():
+            self.parsers[user_id] = parser
+
+    def snapshot_state(self):
+        return dict(self.parsers.container)
 
     def cog_unload(self):
         self.bot.enable_calc_log = self.enable_log
@@ -926,7 +933,9 @@ class Calculator(commands.Cog):
         l = ""
         try:
             m = self.get_calc(ctx.author.id, text)
-            results, time_taken = await self.bot.loop.run_in_executor(None, self.time_stuff, m.result)
+            results, time_taken = await self.bot.run_cpu(ctx, self.time_stuff, m.result)
+        except checks.CustomError:
+            raise
         except ParseError as e:
             target = getattr(e, "target", m)
             await ctx.send(f"{e}\n```\n{target.show_parse_error()}\n```")
@@ -986,7 +995,9 @@ class Calculator(commands.Cog):
         stuff = utils.clean_codeblock(stuff)
         input = MathParse(stuff)
         try:
-            r, input_time = await self.bot.loop.run_in_executor(None, self.time_stuff, input.result)
+            r, input_time = await self.bot.run_cpu(ctx, self.time_stuff, input.result)
+        except checks.CustomError:
+            raise
         except:
             return await ctx.send("Calculation error. Please double check your input.")
         else:
@@ -1003,7 +1014,7 @@ class Calculator(commands.Cog):
             "x2 = (-b - sqrt(Δ))/(2a)"
         )
         solution.user_variables.update(coefficients)
-        results, solution_time = await self.bot.loop.run_in_executor(None, self.time_stuff, solution.result)
+        results, solution_time = await self.bot.run_cpu(ctx, self.time_stuff, solution.result)
         r = "\n".join(results[-9:])
         r = f"ax^2 + bx + c = 0\n{r}"
         time_taken = input_time + solution_time
@@ -1021,7 +1032,9 @@ class Calculator(commands.Cog):
         stuff = utils.clean_codeblock(stuff)
         input = MathParse(stuff)
         try:
-            r, input_time = await self.bot.loop.run_in_executor(None, self.time_stuff, input.result)
+            r, input_time = await self.bot.run_cpu(ctx, self.time_stuff, input.result)
+        except checks.CustomError:
+            raise
         except:
             return await ctx.send("Calculation error. Please double check your input.")
         else:
@@ -1045,7 +1058,7 @@ class Calculator(commands.Cog):
             "x3 = -(b + C1 * ζ2 + C2 / ζ2)/(3a)"
         )
         solution.user_variables.update(coefficients)
-        results, solution_time = await self.bot.loop.run_in_executor(None, self.time_stuff, solution.result)
+        results, solution_time = await self.bot.run_cpu(ctx, self.time_stuff, solution.result)
         r = "\n".join(results[-14:])
         r = f"ax^3 + bx^2 + cx + d = 0\n{r}"
         time_taken = input_time + solution_time
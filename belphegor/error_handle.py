@@ -12,7 +12,7 @@ class ErrorHandle(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.set_error_handle()
-        bot.loop.create_task(self.get_wh())
+        bot.create_task(self.get_wh(), category="cog_setup", owner=self)
 
     def cog_unload(self):
         self.bot.on_error = self.old_on_error
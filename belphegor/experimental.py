@@ -4,6 +4,7 @@ from . import utils
 from .utils import config, checks, modding
 import PIL
 import io
+import numpy as np
 import pymongo
 from datetime import datetime, timedelta
 import pytz
@@ -17,6 +18,10 @@ import traceback
 BEGINNING = datetime(2018, 6, 19, 0, 0, 0, tzinfo=pytz.utc)
 BATCH_SIZE = 1000
 WAIT_TIME = 300
+STATUSES = ("online", "dnd", "idle", "offline")
+STATUS_COLUMNS = {stt: i for i, stt in enumerate(STATUSES)}
+HOURS = 720
+BUCKET_KEYS = [("user_id", 1), ("mark", 1)]
 
 #==================================================================================================================================================
 
@@ -25,12 +30,44 @@ class WTFException(Exception):
 
 #==================================================================================================================================================
 
+def _group_sum(keys, durations, size):
+    result = np.zeros((size, len(STATUSES)))
+    np.add.at(result, keys, durations)
+    return result
+
+def _expire_at(mark):
+    #a bucket leaves every chart window once its mark is HOURS old, the TTL index deletes it an hour after that
+    return BEGINNING + timedelta(hours=mark+HOURS+1)
+
+#==================================================================================================================================================
+
 class MemberStats:
-    __slots__ = ("id", "last_updated")
+    #durations is a ring of the last HOURS hour marks by status column, marks holds which hour mark each row is for
+    __slots__ = ("id", "last_updated", "timezone", "marks", "durations")
 
-    def __init__(self, id, *, last_updated):
+    def __init__(self, id, *, last_updated, timezone=0):
         self.id = id
         self.last_updated = last_updated
+        self.timezone = timezone
+        self.marks = np.full(HOURS, -1, dtype=np.int64)
+        self.durations = np.zeros((HOURS, len(STATUSES)), dtype=np.float32)
+
+    def add(self, mark, stt, dur):
+        column = STATUS_COLUMNS.get(stt)
+        if column is None:
+            return
+        slot = mark % HOURS
+        current = self.marks[slot]
+        if current != mark:
+            if current > mark:
+                return
+            self.marks[slot] = mark
+            self.durations[slot] = 0
+        self.durations[slot, column] += dur
+
+    def window(self, mark, hours=HOURS):
+        valid = (self.marks > mark - hours) & (self.marks <= mark)
+        return self.marks[valid], self.durations[valid]
 
     def process_status(self, stt, *, update=False):
         start = self.last_updated
@@ -62,9 +99,19 @@ class MemberStats:
 #==================================================================================================================================================
 
 class Statistics(commands.Cog):
+    #presence history is one {user_id, mark, expire_at, online, dnd, idle, offline} document per user per hour mark, durations in hours
+    #retention is left to the TTL index on expire_at, so nothing here rewrites or scans old buckets
+    #queued status writes are (user_id, UpdateOne) pairs so an opt out can drop the ones still pending
+    snapshot_version = 5
+    db_indexes = {
+        "user_data": ["user_id"],
+        "user_status_hourly": [{"keys": BUCKET_KEYS, "unique": True}, "mark", {"keys": "expire_at", "expireAfterSeconds": 0}]
+    }
+
     def __init__(self, bot):
         self.bot = bot
         self.user_data = bot.db.user_data
+        self.status_data = bot.db.user_status_hourly
         self.belphegor_config = bot.db.belphegor_config
 
         self.fetch_ready = asyncio.Event()
@@ -72,107 +119,192 @@ class Statistics(commands.Cog):
         self.done_update_event.clear()
 
         self.all_users = {}
-        try:
-            all_users = bot.saved_stuff.pop("all_users")
-        except KeyError:
+        self.member_guilds = {}
+        self.guild_presence = {}
+        self.all_requests = asyncio.Queue()
+        self.pending_requests = []
+        #held while status buckets are written or a user's buckets are erased
+        self.write_lock = asyncio.Lock()
+        state = bot.snapshots.pop(self)
+        if state is None:
             self.fetch_ready.clear()
-            bot.loop.create_task(self.fetch_users())
+            bot.create_task(self.fetch_users(), category="cog_setup", owner=self)
         else:
+            self.all_users.update(state["all_users"])
+            self.index_members()
             self.fetch_ready.set()
-            self.all_users.update(all_users)
+            for req in state["status_updates"]:
+                self.all_requests.put_nowait(req)
 
-        self.all_requests = bot.saved_stuff.pop("status_updates", asyncio.Queue())
-        self.update_task = bot.create_task_and_count(self.update_regularly())
-        self.clear_task = bot.create_task_and_count(self.clear_old_data())
+        self.update_task = bot.create_task(self.update_regularly(), name="stats_update", category="stats", owner=self)
+
+    def snapshot_state(self):
+        status_updates = list(self.pending_requests)
+        while not self.all_requests.empty():
+            status_updates.append(self.all_requests.get_nowait())
+        self.pending_requests.clear()
+        return {"all_users": self.all_users, "status_updates": status_updates}
 
     def cog_unload(self):
-        self.bot.saved_stuff["all_users"] = self.all_users
-        self.bot.saved_stuff["status_updates"] = self.all_requests
         try:
             self.update_task.cancel()
         except:
             pass
-        try:
-            self.clear_task.cancel()
-        except:
-            pass
 
     async def fetch_users(self):
-        user_ids = []
-        async for doc in self.user_data.aggregate([
-            {
-                "$group": {
-                    "_id": None,
-                    "user_ids": {
-                        "$push": "$user_id"
-                    }
-                }
-            }
-        ]):
-            user_ids = doc["user_ids"]
         now = utils.now_time()
-        for user_id in user_ids:
-            self.all_users[user_id] = MemberStats(user_id, last_updated=now)
-
+        async for doc in self.user_data.find({}, projection={"_id": False, "user_id": True, "timezone": True}):
+            user_id = doc["user_id"]
+            self.all_users[user_id] = MemberStats(user_id, last_updated=now, timezone=doc.get("timezone", 0))
+
+        await self.migrate_status_arrays()
+        await self.stamp_expiry(now)
+        await self.ensure_unique_buckets()
+        await self.load_status_rows(now)
+        self.index_members()
         self.fetch_ready.set()
 
-    async def clear_old_data(self):
-        try:
-            while True:
-                await asyncio.sleep(3600)
-                end = utils.now_time()
-                end_hour = (end - BEGINNING).total_seconds() / 3600
-                last_mark = int(end_hour)
-                await self.user_data.update_many({}, {"$pull": {"status": {"mark": {"$lt": last_mark-720}}}})
-        except asyncio.CancelledError:
-            pass
+    async def load_status_rows(self, now):
+        mark = int((now - BEGINNING).total_seconds() / 3600)
+        all_users = self.all_users
+        async for row in self.status_data.find({"mark": {"$gt": mark-HOURS}}, projection={"_id": False}):
+            member_stats = all_users.get(row["user_id"])
+            if member_stats:
+                for stt in STATUSES:
+                    member_stats.add(row["mark"], stt, row.get(stt, 0))
+
+    async def migrate_status_arrays(self):
+        #move the old per user status arrays into hourly buckets, unset first so a crash can't count anything twice
+        while True:
+            doc = await self.user_data.find_one_and_update(
+                {"status": {"$exists": True}},
+                {"$unset": {"status": ""}},
+                projection={"_id": False, "user_id": True, "status": True}
+            )
+            if doc is None:
+                break
+            buckets = {}
+            for item in doc.get("status") or ():
+                fields = buckets.setdefault(item["mark"], dict.fromkeys(STATUSES, 0))
+                fields[item["stt"]] = fields.get(item["stt"], 0) + item["dur"]
+            reqs = [
+                pymongo.UpdateOne({"user_id": doc["user_id"], "mark": mark}, {"$inc": fields, "$setOnInsert": {"expire_at": _expire_at(mark)}}, upsert=True)
+                for mark, fields in buckets.items()
+            ]
+            for index in range(0, len(reqs), BATCH_SIZE):
+                await self.status_data.bulk_write(reqs[index:index+BATCH_SIZE], ordered=False)
+
+    async def ensure_unique_buckets(self):
+        #racing upserts could duplicate a bucket before the index was unique, merge them so it can be built
+        registry = self.bot.index_registry
+        await registry.ensure(self.qualified_name, {"user_status_hourly": [{"keys": BUCKET_KEYS, "unique": True}]})
+        if registry.error("user_status_hourly", BUCKET_KEYS) is None:
+            return
+        pipeline = [
+            {"$group": {"_id": {"user_id": "$user_id", "mark": "$mark"}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}, **{stt: {"$sum": f"${stt}"} for stt in STATUSES}}},
+            {"$match": {"count": {"$gt": 1}}}
+        ]
+        reqs = []
+        async for group in self.status_data.aggregate(pipeline, allowDiskUse=True):
+            reqs.append(pymongo.UpdateOne({"_id": group["ids"][0]}, {"$set": {stt: group[stt] for stt in STATUSES}}))
+            reqs.append(pymongo.DeleteMany({"_id": {"$in": group["ids"][1:]}}))
+        for index in range(0, len(reqs), BATCH_SIZE):
+            await self.status_data.bulk_write(reqs[index:index+BATCH_SIZE], ordered=False)
+        await registry.ensure(self.qualified_name, {"user_status_hourly": [{"keys": BUCKET_KEYS, "unique": True}]})
+
+    async def stamp_expiry(self, now):
+        #buckets written before the TTL index existed have no expire_at, past ones go now and the rest get stamped once per mark
+        mark = int((now - BEGINNING).total_seconds() / 3600)
+        await self.status_data.delete_many({"mark": {"$lte": mark-HOURS}, "expire_at": None})
+        marks = await self.status_data.distinct("mark", {"expire_at": None})
+        reqs = [pymongo.UpdateMany({"mark": m, "expire_at": None}, {"$set": {"expire_at": _expire_at(m)}}) for m in marks]
+        for index in range(0, len(reqs), BATCH_SIZE):
+            await self.status_data.bulk_write(reqs[index:index+BATCH_SIZE], ordered=False)
+
+    def index_members(self):
+        #guilds each tracked user is in, kept by member join/remove so lookups don't scan every guild
+        member_guilds = self.member_guilds
+        member_guilds.clear()
+        for user_id in self.all_users:
+            member_guilds[user_id] = set()
+        for g in self.bot.guilds:
+            members = g.members
+            if len(members) < len(member_guilds):
+                for m in members:
+                    guild_ids = member_guilds.get(m.id)
+                    if guild_ids is not None:
+                        guild_ids.add(g.id)
+            else:
+                for user_id, guild_ids in member_guilds.items():
+                    if g.get_member(user_id):
+                        guild_ids.add(g.id)
 
     def get_first_member(self, user_id):
-        for g in self.bot.guilds:
-            m = g.get_member(user_id)
+        for guild_id in self.member_guilds.get(user_id, ()):
+            g = self.bot.get_guild(guild_id)
+            m = g.get_member(user_id) if g else None
             if m:
                 return m
 
-    def get_update_request(self, member_stats, status):
+    def get_update_requests(self, member_stats, status):
         member_id = member_stats.id
-        items = member_stats.process_status(status, update=True)
-        if items:
-            return pymongo.UpdateOne(
-                {"user_id": member_id},
-                {"$push": {"status": {"$each": items}}}
-            )
-        else:
-            return None
+        reqs = []
+        for item in member_stats.process_status(status, update=True):
+            member_stats.add(item["mark"], item["stt"], item["dur"])
+            fields = dict.fromkeys(STATUSES, 0)
+            fields[item["stt"]] = item["dur"]
+            reqs.append((member_id, pymongo.UpdateOne(
+                {"user_id": member_id, "mark": item["mark"]},
+                {"$inc": fields, "$setOnInsert": {"expire_at": _expire_at(item["mark"])}},
+                upsert=True
+            )))
+        return reqs
 
     async def update_regularly(self):
-        all_reqs = []
+        all_reqs = self.pending_requests
 
         async def update():
-            await self.user_data.bulk_write(all_reqs)
-            all_reqs.clear()
-
+            async with self.write_lock:
+                #a request taken off the queue while its user opted out is still in flight here
+                all_users = self.all_users
+                reqs = [req for user_id, req in all_reqs if user_id in all_users]
+                all_reqs.clear()
+                if reqs:
+                    await self.status_data.bulk_write(reqs)
+
+        #asyncio.wait rather than wait_for, which can swallow a cancel when the get finishes in the same tick
+        get = None
         try:
             while True:
-                try:
-                    req = await asyncio.wait_for(self.all_requests.get(), WAIT_TIME)
-                except asyncio.TimeoutError:
-                    if all_reqs:
-                        await asyncio.shield(update())
-                else:
-                    all_reqs.append(req)
+                if get is None:
+                    get = asyncio.ensure_future(self.all_requests.get())
+                done, _ = await asyncio.wait((get,), timeout=WAIT_TIME)
+                if done:
+                    all_reqs.append(get.result())
+                    get = None
                     if len(all_reqs) >= BATCH_SIZE:
                         await asyncio.shield(update())
+                elif all_reqs:
+                    await asyncio.shield(update())
         except asyncio.CancelledError:
+            if get is not None:
+                if get.done():
+                    all_reqs.append(get.result())
+                else:
+                    get.cancel()
             if all_reqs:
                 await update()
-            self.done_update_event.set()
         except Exception as e:
             text = traceback.format_exc()
             if len(text) > 1950:
                 text = f"{e.__class__.__name__}: {e}"
             await self.bot.error_hook.execute(f"```\n{text}\n```")
+        finally:
+            self.done_update_event.set()
 
     async def update_all(self):
+        #update_regularly writes what it holds once cancelled, then the rest is written from the in memory stats
+        self.update_task.cancel()
         try:
             await asyncio.wait_for(self.done_update_event.wait(), 30)
         except asyncio.TimeoutError:
@@ -181,19 +313,18 @@ class Statistics(commands.Cog):
         all_reqs = []
         for user_id, member_stats in self.all_users.items():
             member = self.get_first_member(user_id)
-            req = self.get_update_request(member_stats, member.status.value)
-            if req:
-                all_reqs.append(req)
+            if member:
+                all_reqs.extend(self.get_update_requests(member_stats, member.status.value))
 
-        for index in range(0, len(all_reqs), BATCH_SIZE):
-            batch = all_reqs[index:index+BATCH_SIZE]
-            await self.user_data.bulk_write(batch)
+        async with self.write_lock:
+            for index in range(0, len(all_reqs), BATCH_SIZE):
+                batch = [req for _, req in all_reqs[index:index+BATCH_SIZE]]
+                await self.status_data.bulk_write(batch)
 
     async def update(self, member):
         member_stats = self.all_users.get(member.id)
         if member_stats:
-            req = self.get_update_request(member_stats, member.status.value)
-            if req:
+            for req in self.get_update_requests(member_stats, member.status.value):
                 await self.all_requests.put(req)
 
     # @commands.Cog.listener()
@@ -201,20 +332,63 @@ class Statistics(commands.Cog):
     #    if member.bot and member.id not in self.all_users:
     #        await self.update_opt_in(member, True)
 
+    def get_guild_presence(self, guild):
+        #counts are kept up to date by member events, recount if they don't add up, e.g. members chunked in after the first count
+        #compared with the member cache the counts come from, member_count never matches a partly cached guild
+        #and Guild.members would copy the whole cache for a length
+        counts = self.guild_presence.get(guild.id)
+        if counts is None or sum(counts.values()) != len(guild._members):
+            counts = collections.Counter(m.status.value for m in guild.members)
+            self.guild_presence[guild.id] = counts
+        return counts
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        counts = self.guild_presence.get(member.guild.id)
+        if counts is not None:
+            counts[member.status.value] += 1
+        guild_ids = self.member_guilds.get(member.id)
+        if guild_ids is not None:
+            guild_ids.add(member.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        for user_id, guild_ids in self.member_guilds.items():
+            if guild.get_member(user_id):
+                guild_ids.add(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.guild_presence.pop(guild.id, None)
+        for guild_ids in self.member_guilds.values():
+            guild_ids.discard(guild.id)
+
     @commands.Cog.listener()
     async def on_member_remove(self, member):
-        if member.id in self.all_users:
-            for g in self.bot.guilds:
-                m = g.get_member(member.id)
-                if m and m.guild != member.guild:
-                    break
-            else:
-                await self.update_opt_in(member, False)
+        counts = self.guild_presence.get(member.guild.id)
+        if counts is not None:
+            counts[member.status.value] -= 1
+        guild_ids = self.member_guilds.get(member.id)
+        if guild_ids is not None:
+            guild_ids.discard(member.guild.id)
+            if not guild_ids:
+                #the index only knows cached members, confirm before erasing anything
+                guild_ids.update(g.id for g in self.bot.guilds if g.id != member.guild.id and g.get_member(member.id))
+                if not guild_ids:
+                    await self.update_opt_in(member, False)
 
     @commands.Cog.listener()
     async def on_member_update(self, before, after):
         if before.status != after.status:
+            counts = self.guild_presence.get(before.guild.id)
+            if counts is not None:
+                counts[before.status.value] -= 1
+                counts[after.status.value] += 1
             if getattr(before, "id", None) in self.all_users:
+                guild_ids = self.member_guilds.get(before.id)
+                if guild_ids is not None:
+                    #members cached after the index was built
+                    guild_ids.add(before.guild.id)
                 await self.update(before)
 
     async def check_opt_in_user(self, member):
@@ -233,17 +407,13 @@ class Statistics(commands.Cog):
             Display pie chart showing current guild status.
         '''
         await ctx.trigger_typing()
+        counts = self.get_guild_presence(ctx.guild)
         statuses = (
-            {"name": "online", "count": 0, "color": discord.Colour.green().to_rgba()},
-            {"name": "dnd", "count": 0, "color": discord.Colour.red().to_rgba()},
-            {"name": "idle", "count": 0, "color": discord.Colour.orange().to_rgba()},
-            {"name": "offline", "count": 0, "color": discord.Colour.light_grey().to_rgba()}
+            {"name": "online", "count": counts["online"], "color": discord.Colour.green().to_rgba()},
+            {"name": "dnd", "count": counts["dnd"], "color": discord.Colour.red().to_rgba()},
+            {"name": "idle", "count": counts["idle"], "color": discord.Colour.orange().to_rgba()},
+            {"name": "offline", "count": counts["offline"], "color": discord.Colour.light_grey().to_rgba()}
         )
-        guild = ctx.guild
-        for m in guild.members:
-            for i in ("online", "dnd", "idle", "offline"):
-                if m.status == getattr(discord.Status, i):
-                    utils.get_element(statuses, lambda x: x["name"] == i)["count"] += 1
 
         explode = [0, 0, 0, 40]
         maxi = 3
@@ -259,38 +429,15 @@ class Statistics(commands.Cog):
 
         bytes_ = await utils.pie_chart(
             statuses, title=f"{ctx.guild.name}'s current status", unit="members",
-            outline=(0, 0, 0, 0), explode=explode, outline_width=10, loop=self.bot.loop
+            outline=(0, 0, 0, 0), explode=explode, outline_width=10, ctx=ctx
         )
         await ctx.send(file=discord.File(bytes_, "statuses.png"))
 
-    async def fetch_total_status(self, member):
+    def fetch_total_status(self, member):
         now = utils.now_time()
         mark = int((now - BEGINNING).total_seconds() / 3600)
-        member_data = [s async for s in self.user_data.aggregate([
-            {
-                "$match": {"user_id": member.id}
-            },
-            {
-                "$unwind": "$status"
-            },
-            {
-                "$redact": {
-                    "$cond": {
-                        "if": {"$lt": ["$status.mark", mark-720]},
-                        "then": "$$PRUNE",
-                        "else": "$$KEEP"
-                    }
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$status.stt",
-                    "dur": {
-                        "$sum": "$status.dur"
-                    }
-                }
-            }
-        ])]
+        marks, durations = self.all_users[member.id].window(mark)
+        totals = durations.sum(axis=0, dtype=np.float64)
 
         statuses = (
             {"name": "online", "count": 0, "color": discord.Colour.green().to_rgba()},
@@ -299,10 +446,8 @@ class Statistics(commands.Cog):
             {"name": "offline", "count": 0, "color": discord.Colour.light_grey().to_rgba()}
         )
 
-        for item in statuses:
-            data = utils.get_element(member_data, lambda x: x["_id"]==item["name"])
-            if data:
-                item["count"] = data["dur"]
+        for item, total in zip(statuses, totals):
+            item["count"] = float(total)
             if item["name"] == member.status.value:
                 item["count"] += (now - self.all_users[member.id].last_updated).total_seconds() / 3600
 
@@ -320,36 +465,17 @@ class Statistics(commands.Cog):
         target = member or ctx.author
         await self.check_opt_in_user(target)
         await ctx.trigger_typing()
-        statuses = await self.fetch_total_status(target)
-        bytes_ = await utils.pie_chart(statuses, title=f"{target.display_name}'s total status", unit="hours", outline=(0, 0, 0, 0), outline_width=10, loop=self.bot.loop)
+        statuses = self.fetch_total_status(target)
+        bytes_ = await utils.pie_chart(statuses, title=f"{target.display_name}'s total status", unit="hours", outline=(0, 0, 0, 0), outline_width=10, ctx=ctx)
         await ctx.send(file=discord.File(bytes_, filename="pie_status.png"))
 
-    async def fetch_daily_status(self, member):
+    def fetch_daily_status(self, member):
         now = utils.now_time()
         mark = int((now - BEGINNING).total_seconds() / 3600)
-        member_data = [s async for s in self.user_data.aggregate([
-            {
-                "$match": {"user_id": member.id}
-            },
-            {
-                "$unwind": "$status"
-            },
-            {
-                "$redact": {
-                    "$cond": {
-                        "if": {"$lt": ["$status.mark", mark-720]},
-                        "then": "$$PRUNE",
-                        "else": "$$KEEP"
-                    }
-                }
-            },
-            {
-                "$group": {
-                    "_id": {"stt": "$status.stt", "day": {"$floor": {"$divide": [{"$subtract": ["$status.mark", mark]}, 24]}}},
-                    "dur": {"$sum": "$status.dur"}
-                }
-            }
-        ])]
+        marks, durations = self.all_users[member.id].window(mark)
+        days = (mark - marks + 23) // 24
+        past = days > 0
+        sums = _group_sum(days[past], durations[past], 31)
 
         statuses = (
             {"name": "online", "count": collections.OrderedDict(((i, 0) for i in range(30, 0, -1))), "color": discord.Colour.green().to_rgba()},
@@ -358,11 +484,9 @@ class Statistics(commands.Cog):
             {"name": "offline", "count": collections.OrderedDict(((i, 0) for i in range(30, 0, -1))), "color": discord.Colour.light_grey().to_rgba()}
         )
 
-        for item in statuses:
-            for day in range(-30, 0):
-                data = utils.get_element(member_data, lambda x: x["_id"]["day"]==day and x["_id"]["stt"]==item["name"])
-                if data:
-                    item["count"][-day] = data["dur"]
+        for i, item in enumerate(statuses):
+            for day in range(30, 0, -1):
+                item["count"][day] = float(sums[day, i])
             if item["name"] == member.status.value:
                 processed_stt = self.all_users[member.id].process_status(member.status.value)
                 for inst in processed_stt:
@@ -384,10 +508,10 @@ class Statistics(commands.Cog):
         target = member or ctx.author
         await self.check_opt_in_user(target)
         await ctx.trigger_typing()
-        statuses = await self.fetch_daily_status(target)
+        statuses = self.fetch_daily_status(target)
         title = f"{target.display_name}'s status by day"
         try:
-            bytes_ = await utils.line_chart(statuses, unit_y="hours", unit_x="past day", title=title, loop=self.bot.loop)
+            bytes_ = await utils.line_chart(statuses, unit_y="hours", unit_x="past day", title=title, ctx=ctx)
         except ZeroDivisionError:
             await ctx.send("I need at least 1 hour worth of data to perform this command.")
         else:
@@ -396,50 +520,14 @@ class Statistics(commands.Cog):
     def better_offset(self, offset):
         return (offset + 11) % 24 - 11
 
-    async def fetch_hourly_status(self, member, *, offset):
+    def fetch_hourly_status(self, member, *, offset):
         now = utils.now_time()
         mark = int((now - BEGINNING).total_seconds() / 3600)
+        member_stats = self.all_users[member.id]
         if offset is None:
-            offset = "$timezone"
-        raw_data = [s async for s in self.user_data.aggregate([
-            {
-                "$match": {"user_id": member.id}
-            },
-            {
-                "$facet": {
-                    "data": [
-                        {
-                            "$unwind": "$status"
-                        },
-                        {
-                            "$redact": {
-                                "$cond": {
-                                    "if": {"$lt": ["$status.mark", mark-720]},
-                                    "then": "$$PRUNE",
-                                    "else": "$$KEEP"
-                                }
-                            }
-                        },
-                        {
-                            "$group": {
-                                "_id": {"stt": "$status.stt", "mark": {"$mod": [{"$add": ["$status.mark", offset]}, 24]}},
-                                "dur": {"$sum": "$status.dur"}
-                            }
-                        }
-                    ],
-                    "timezone": [
-                        {"$project": {"_id": False, "timezone": "$timezone"}}
-                    ]
-                }
-            }
-        ])][0]
-        member_data = raw_data["data"]
-        if isinstance(offset, str):
-            r = raw_data["timezone"]
-            if r:
-                offset = r[0]["timezone"]
-            else:
-                offset = 0
+            offset = member_stats.timezone
+        marks, durations = member_stats.window(mark)
+        sums = _group_sum((marks + offset) % 24, durations, 24)
 
         statuses = (
             {"name": "online", "count": collections.OrderedDict(((i, 0) for i in range(24))), "color": discord.Colour.green().to_rgba()},
@@ -448,11 +536,9 @@ class Statistics(commands.Cog):
             {"name": "offline", "count": collections.OrderedDict(((i, 0) for i in range(24))), "color": discord.Colour.light_grey().to_rgba()}
         )
 
-        for item in statuses:
+        for i, item in enumerate(statuses):
             for hour in range(24):
-                data = utils.get_element(member_data, lambda x: x["_id"]["stt"]==item["name"] and x["_id"]["mark"]==hour)
-                if data:
-                    item["count"][hour] = data["dur"]
+                item["count"][hour] = float(sums[hour, i])
             if item["name"] == member.status.value:
                 processed_stt = self.all_users[member.id].process_status(member.status.value)
                 for inst in processed_stt:
@@ -479,7 +565,7 @@ class Statistics(commands.Cog):
                 return await ctx.send("Offset should be an integer.")
             else:
                 offset = self.better_offset(offset)
-        offset, statuses = await self.fetch_hourly_status(target, offset=offset)
+        offset, statuses = self.fetch_hourly_status(target, offset=offset)
 
         #transform to percentage
         x_keys = statuses[0]["count"].keys()
@@ -500,38 +586,19 @@ class Statistics(commands.Cog):
         #draw
         title = f"{target.display_name}'s status by time of day (offset {offset:+d})"
         try:
-            bytes_ = await utils.stacked_area_chart(draw_data, unit_y="%", unit_x="time\nof day", title=title, loop=self.bot.loop)
+            bytes_ = await utils.stacked_area_chart(draw_data, unit_y="%", unit_x="time\nof day", title=title, ctx=ctx)
         except ZeroDivisionError:
             await ctx.send("I need at least 1 day worth of data to perform this command.")
         else:
             await ctx.send(file=discord.File(bytes_, filename="area_status.png"))
 
-    async def fetch_weekly_status(self, member):
+    def fetch_weekly_status(self, member):
         now = utils.now_time()
         mark = int((now - BEGINNING).total_seconds() / 3600)
-        member_data = [s async for s in self.user_data.aggregate([
-            {
-                "$match": {"user_id": member.id}
-            },
-            {
-                "$unwind": "$status"
-            },
-            {
-                "$redact": {
-                    "$cond": {
-                        "if": {"$lt": ["$status.mark", mark-672]},
-                        "then": "$$PRUNE",
-                        "else": "$$KEEP"
-                    }
-                }
-            },
-            {
-                "$group": {
-                    "_id": {"stt": "$status.stt", "week": {"$floor": {"$divide": [{"$subtract": ["$status.mark", mark]}, 168]}}},
-                    "dur": {"$sum": "$status.dur"}
-                }
-            }
-        ])]
+        marks, durations = self.all_users[member.id].window(mark, 673)
+        weeks = (mark - marks + 167) // 168
+        past = weeks > 0
+        sums = _group_sum(weeks[past], durations[past], 5)
 
         statuses = (
             {"name": "online", "count": collections.OrderedDict(((i, 0) for i in range(4, 0, -1))), "color": discord.Colour.green().to_rgba()},
@@ -540,11 +607,9 @@ class Statistics(commands.Cog):
             {"name": "offline", "count": collections.OrderedDict(((i, 0) for i in range(4, 0, -1))), "color": discord.Colour.light_grey().to_rgba()}
         )
 
-        for item in statuses:
-            for week in range(-4, 0):
-                data = utils.get_element(member_data, lambda x: x["_id"]["week"]==week and x["_id"]["stt"]==item["name"])
-                if data:
-                    item["count"][-week] = data["dur"]
+        for i, item in enumerate(statuses):
+            for week in range(4, 0, -1):
+                item["count"][week] = float(sums[week, i])
             if item["name"] == member.status.value:
                 processed_stt = self.all_users[member.id].process_status(member.status.value)
                 for inst in processed_stt:
@@ -566,10 +631,10 @@ class Statistics(commands.Cog):
         target = member or ctx.author
         await self.check_opt_in_user(target)
         await ctx.trigger_typing()
-        statuses = await self.fetch_weekly_status(target)
+        statuses = self.fetch_weekly_status(target)
         title = f"{target.display_name}'s status by week"
         try:
-            bytes_ = await utils.bar_chart(statuses, unit_y="hours", unit_x="past week", title=title, loop=self.bot.loop)
+            bytes_ = await utils.bar_chart(statuses, unit_y="hours", unit_x="past week", title=title, ctx=ctx)
         except ZeroDivisionError:
             await ctx.send("I need at least 1 hour worth of data to perform this command.")
         else:
@@ -585,6 +650,7 @@ class Statistics(commands.Cog):
         '''
         await self.check_opt_in_user(ctx.author)
         offset = self.better_offset(offset)
+        self.all_users[ctx.author.id].timezone = offset
         await self.user_data.update_one({"user_id": ctx.author.id}, {"$set": {"timezone": offset}})
         await ctx.send(f"Default offset has been set to {offset:+d}")
 
@@ -593,14 +659,26 @@ class Statistics(commands.Cog):
         member_id = member.id
         if add:
             self.all_users[member_id] = MemberStats(member_id, last_updated=utils.now_time())
+            self.member_guilds[member_id] = {g.id for g in self.bot.guilds if g.get_member(member_id)}
             await self.user_data.update_one(
                 {"user_id": member_id},
-                {"$set": {"user_id": member_id, "timezone": 0, "status": []}},
+                {"$set": {"user_id": member_id, "timezone": 0}},
                 upsert=True
             )
         else:
             self.all_users.pop(member_id, None)
-            await self.user_data.delete_many({"user_id": member_id})
+            self.member_guilds.pop(member_id, None)
+            async with self.write_lock:
+                #queued requests would upsert the erased buckets right back
+                self.pending_requests[:] = [item for item in self.pending_requests if item[0] != member_id]
+                queued = []
+                while not self.all_requests.empty():
+                    queued.append(self.all_requests.get_nowait())
+                for item in queued:
+                    if item[0] != member_id:
+                        self.all_requests.put_nowait(item)
+                await self.user_data.delete_many({"user_id": member_id})
+                await self.status_data.delete_many({"user_id": member_id})
 
     @modding.help(brief="Toggle presence tracking, required for user charts", category="Experimental", field="Status", paragraph=1)
     @commands.command()
@@ -130,7 +130,7 @@ class ConnectFour:
             for e in emojis:
                 await message.add_reaction(e)
 
-        ctx.bot.loop.create_task(add_reactions())
+        ctx.bot.create_task(add_reactions(), category="reaction_add")
 
         async def end_game():
             try:
@@ -197,11 +197,10 @@ class MazeRunner:
         self.rendering = None
 
     @classmethod
-    async def new(cls, ctx, size, *, mode, weave, density, loop=None):
+    async def new(cls, ctx, size, *, mode, weave, density):
         func = functools.partial(getattr(Maze, f"{mode}_algorithm"), (size, size), weave=weave, density=density)
         if mode == "kruskal" and size > 30 and weave:
-            loop = loop or asyncio.get_event_loop()
-            maze = await loop.run_in_executor(None, func)
+            maze = await ctx.bot.run_cpu(ctx, func)
         else:
             maze = func()
         return cls(ctx.author, maze, mode=mode, weave=weave, density=density)
@@ -307,7 +306,7 @@ class MazeRunner:
         else:
             return Image.fromarray(self.rendering)
 
-    async def draw_maze(self, loop=None):
+    async def draw_maze(self, ctx=None, *, loop=None):
         def draw_it():
             image = self._raw_draw()
             bytes_ = BytesIO()
@@ -315,10 +314,12 @@ class MazeRunner:
             bytes_.seek(0)
             return bytes_
 
+        if ctx:
+            return await ctx.bot.run_cpu(ctx, draw_it)
         loop = loop or asyncio.get_event_loop()
         return await loop.run_in_executor(None, draw_it)
 
-    async def draw_solution(self, loop=None):
+    async def draw_solution(self, ctx=None, *, loop=None):
         def draw_it():
             solution = self.maze.solve()
             image = self._raw_draw()
@@ -356,5 +357,7 @@ class MazeRunner:
             bytes_.seek(0)
             return bytes_
 
+        if ctx:
+            return await ctx.bot.run_cpu(ctx, draw_it)
         loop = loop or asyncio.get_event_loop()
         return await loop.run_in_executor(None, draw_it)
@@ -715,24 +715,24 @@ class Doll(data_type.BaseObject):
 #==================================================================================================================================================
 
 class GirlsFrontline(commands.Cog):
+    db_indexes = {"doll_list": ["index"]}
+    search_collections = ("doll_list", "fairy_list")
+
     def __init__(self, bot):
         self.bot = bot
         self.doll_list = bot.db.doll_list
         self.special_equipments = bot.db.special_equipments
         self.fairy_list = bot.db.fairy_list
 
-        test_guild_2 = bot.get_guild(config.TEST_GUILD_2_ID)
         self.emojis = {"white_square": "\u2b1c", "black_square": "\u2b1b", "blue_square": "\U0001f7e6"}
-        for emoji_name in (
+        bot.emoji_registry.resolve(self, config.TEST_GUILD_2_ID, (
             "hp", "damage", "accuracy", "rof", "evasion", "armor",
             "crit_rate", "crit_dmg", "armor_penetration", "clip_size", "mobility",
             "HG", "RF", "AR", "SMG", "MG", "SG", "rank",
-            "mem_frag", "exoskeleton", "battle_fairy", "strategy_fairy", "shotgun_ammo", "peq"
-        ):
-            self.emojis[emoji_name] = discord.utils.find(lambda e: e.name==emoji_name, test_guild_2.emojis)
-        self.emojis["echelon_accuracy"] = self.emojis["accuracy"]
+            "mem_frag", "exoskeleton", "battle_fairy", "strategy_fairy", "shotgun_ammo", "peq", ("echelon_accuracy", "accuracy")
+        ), self.emojis)
 
-        bot.loop.create_task(self.gfwiki_bot_login())
+        bot.create_task(self.gfwiki_bot_login(), category="cog_setup", owner=self)
 
     async def gfwiki_bot_login(self):
         session = self.bot.session
@@ -1122,11 +1122,7 @@ class GirlsFrontline(commands.Cog):
                 query.extend({f"tile.shape.{t}": 1} for t in tile[1:])
 
         result = []
-        async for data in self.doll_list.aggregate([
-            {"$match": {"$and": query}},
-            {"$project": projection},
-            {"$sort": {"index": 1}}
-        ]):
+        for data in await self.bot.search_indexes.find("doll_list", {"$and": query}, projection, [("index", 1)]):
             index = data.pop("index")
             name = data.pop("name")
             name = data.pop("en_name") or name
@@ -71,7 +71,7 @@ class Google(commands.Cog):
         }
 
     def cog_unload(self):
-        self.bot.create_task_and_count(self.google_session.close())
+        self.bot.create_task(self.google_session.close(), category="shutdown")
 
     def _parse_google(self, html):
         soup = BS(html, "lxml")
@@ -1,7 +1,7 @@
 import discord
 from discord.ext import commands
 from . import utils
-from .utils import checks, config, modding
+from .utils import checks, config, modding, data_type
 import asyncio
 import unicodedata
 from io import BytesIO
@@ -13,6 +13,22 @@ import traceback
 #==================================================================================================================================================
 
 DEFAULT_WELCOME = "Eeeeehhhhhh, go away {mention}, I don't want any more work..."
+SETTINGS_PROJECTION = {
+    "log_channel_id": True,
+    "log_message": True,
+    "welcome_channel_id": True,
+    "welcome_message": True,
+    "welcome_rule": True,
+    "autorole_id": True,
+    "autorole_type": True,
+    "autorole_phrase": True,
+    "autorole_response": True,
+    "autorole_response_delete": True,
+    "nsfw_role_id": True,
+    "mute_role_id": True,
+    "muted_member_ids": True,
+    "selfrole_ids": True
+}
 
 #==================================================================================================================================================
 
@@ -21,11 +37,17 @@ class Guild(commands.Cog):
     Doing stuff related to server.
     '''
 
+    db_indexes = {"guild_data": ["guild_id"]}
+
     def __init__(self, bot):
         self.bot = bot
         self.guild_data = bot.db.guild_data
+        self.settings = data_type.DocumentCache(self.guild_data, "guild_id", projection=SETTINGS_PROJECTION, limit=2000)
         self.banned_emojis = set()
-        self.autorole_registration = {}
+        bot.message_pipeline.add_handler("guild_autorole", self.match_autorole, self.autorole, guild_only=True)
+
+    def cog_unload(self):
+        self.bot.message_pipeline.remove_handler("guild_autorole")
 
     @modding.help(brief="Set up bot settings", category="Guild", field="Server management", paragraph=0)
     @commands.group(name="set")
@@ -214,7 +236,7 @@ class Guild(commands.Cog):
         '''
         role = discord.utils.find(lambda r: name.lower()==r.name.lower(), ctx.guild.roles)
         if role:
-            await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$set": {"nsfw_role_id": role.id}, "$setOnInsert": {"guild_id": ctx.guild.id}}, upsert=True)
+            await self.settings.update_one(ctx.guild.id, {"$set": {"nsfw_role_id": role.id}, "$setOnInsert": {"guild_id": ctx.guild.id}}, upsert=True)
             await ctx.confirm()
         else:
             raise checks.CustomError(f"No role named {name} found.")
@@ -225,7 +247,7 @@ class Guild(commands.Cog):
             `>>unset nsfwrole`
             Unset NSFW role.
         '''
-        await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$unset": {"nsfw_role_id": None}})
+        await self.settings.update_one(ctx.guild.id, {"$unset": {"nsfw_role_id": None}})
         await ctx.confirm()
 
     @cmd_set.command(name="muterole")
@@ -238,7 +260,7 @@ class Guild(commands.Cog):
         '''
         role = discord.utils.find(lambda r: name.lower()==r.name.lower(), ctx.guild.roles)
         if role:
-            await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$set": {"mute_role_id": role.id}, "$setOnInsert": {"guild_id": ctx.guild.id}}, upsert=True)
+            await self.settings.update_one(ctx.guild.id, {"$set": {"mute_role_id": role.id}, "$setOnInsert": {"guild_id": ctx.guild.id}}, upsert=True)
             await ctx.confirm()
         else:
             raise checks.CustomError(f"No role named {name} found.")
@@ -249,7 +271,7 @@ class Guild(commands.Cog):
             `>>unset muterole`
             Unset muted role.
         '''
-        await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$unset": {"mute_role_id": None}})
+        await self.settings.update_one(ctx.guild.id, {"$unset": {"mute_role_id": None}})
         await ctx.confirm()
 
     @modding.help(brief="Get/remove NSFW role, if applicable", category="Guild", field="Role", paragraph=1)
@@ -260,8 +282,8 @@ class Guild(commands.Cog):
             `>>creampie`
             Get/remove NSFW role, if applicable.
         '''
-        role_data = await self.guild_data.find_one({"guild_id": ctx.guild.id, "nsfw_role_id": {"$ne": None}}, projection={"_id": -1, "nsfw_role_id": 1})
-        if role_data:
+        role_data = await self.settings.get(ctx.guild.id)
+        if role_data.get("nsfw_role_id"):
             role = discord.utils.find(lambda r: r.id==role_data["nsfw_role_id"], ctx.guild.roles)
             if role:
                 if role in ctx.author.roles:
@@ -280,7 +302,7 @@ class Guild(commands.Cog):
             A message will be sent to that channel every time a new member joined.
         '''
         target = channel or ctx.channel
-        await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$set": {"welcome_channel_id": target.id}, "$setOnInsert": {"guild_id": ctx.guild.id}}, upsert=True)
+        await self.settings.update_one(ctx.guild.id, {"$set": {"welcome_channel_id": target.id}, "$setOnInsert": {"guild_id": ctx.guild.id}}, upsert=True)
         await ctx.confirm()
 
     @cmd_unset.command(name="welcome", aliases=["welcomechannel"])
@@ -289,7 +311,7 @@ class Guild(commands.Cog):
             `>>unset welcome`
             Unset welcome channel.
         '''
-        await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$unset": {"welcome_channel_id": None}})
+        await self.settings.update_one(ctx.guild.id, {"$unset": {"welcome_channel_id": None}})
         await ctx.confirm()
 
     @cmd_set.command(name="welcomemessage")
@@ -304,7 +326,7 @@ class Guild(commands.Cog):
         except:
             await ctx.send("Format error. You sure read the instruction?")
         else:
-            await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$set": {"welcome_message": text}, "$setOnInsert": {"guild_id": ctx.guild.id}}, upsert=True)
+            await self.settings.update_one(ctx.guild.id, {"$set": {"welcome_message": text}, "$setOnInsert": {"guild_id": ctx.guild.id}}, upsert=True)
             await ctx.send(content)
 
     @cmd_unset.command(name="welcomemessage")
@@ -313,7 +335,7 @@ class Guild(commands.Cog):
             `>>unset welcomemessage`
             Unset custom welcome message and use the default one instead.
         '''
-        await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$unset": {"welcome_message": None}})
+        await self.settings.update_one(ctx.guild.id, {"$unset": {"welcome_message": None}})
         await ctx.send(utils.str_format(f"Welcome message will be displayed as:\n{DEFAULT_WELCOME}", name=ctx.author.display_name, mention=ctx.author.mention, server=ctx.guild.name))
 
     @cmd_set.command(name="dmrule", aliases=["rule"])
@@ -328,7 +350,7 @@ class Guild(commands.Cog):
         except:
             await ctx.send("Format error. You sure read the instruction?")
         else:
-            await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$set": {"welcome_rule": text}, "$setOnInsert": {"guild_id": ctx.guild.id}}, upsert=True)
+            await self.settings.update_one(ctx.guild.id, {"$set": {"welcome_rule": text}, "$setOnInsert": {"guild_id": ctx.guild.id}}, upsert=True)
             await ctx.send(content)
 
     @cmd_unset.command(name="dmrule", aliases=["rule"])
@@ -337,7 +359,7 @@ class Guild(commands.Cog):
             `>>unset dmrule`
             Unset DM rule message.
         '''
-        await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$unset": {"welcome_rule": None}})
+        await self.settings.update_one(ctx.guild.id, {"$unset": {"welcome_rule": None}})
         await ctx.confirm()
 
     @cmd_set.command(name="autorole")
@@ -406,15 +428,14 @@ class Guild(commands.Cog):
                 check = True
         else:
             check = False
-        await self.guild_data.update_one(
-            {"guild_id": ctx.guild.id},
+        await self.settings.update_one(
+            ctx.guild.id,
             {
                 "$set": {"autorole_id": role.id, "autorole_type": artype, "autorole_phrase": phrase, "autorole_response": response, "autorole_response_delete": check},
                 "$setOnInsert": {"guild_id": ctx.guild.id}
             },
             upsert=True
         )
-        self.autorole_registration[ctx.guild.id] = phrase
         await ctx.send("\U0001f44c Autorole is ready to go.")
 
     @cmd_unset.command(name="autorole")
@@ -423,8 +444,8 @@ class Guild(commands.Cog):
             `>>unset autorole`
             Unset auto assign/remove role for new member.
         '''
-        await self.guild_data.update_one(
-            {"guild_id": ctx.guild.id},
+        await self.settings.update_one(
+            ctx.guild.id,
             {"$unset": {"autorole_id": None, "autorole_type": None, "autorole_phrase": None, "autorole_response": None}}
         )
         await ctx.confirm()
@@ -439,7 +460,7 @@ class Guild(commands.Cog):
             Bot activity is excluded.
         '''
         target = channel or ctx.channel
-        await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$set": {"log_channel_id": target.id}, "$setOnInsert": {"guild_id": ctx.guild.id}}, upsert=True)
+        await self.settings.update_one(ctx.guild.id, {"$set": {"log_channel_id": target.id}, "$setOnInsert": {"guild_id": ctx.guild.id}}, upsert=True)
         await ctx.confirm()
 
     @cmd_unset.command(name="log", aliases=["logchannel"])
@@ -448,7 +469,7 @@ class Guild(commands.Cog):
             `>>unset log`
             Unset log channel.
         '''
-        await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$unset": {"log_channel_id": ""}})
+        await self.settings.update_one(ctx.guild.id, {"$unset": {"log_channel_id": ""}})
         await ctx.confirm()
 
     @cmd_set.command(name="logmessage")
@@ -458,7 +479,7 @@ class Guild(commands.Cog):
             Set message log.
             If log channel is set, this command enables message edit/delete log.
         '''
-        await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$set": {"log_message": True}, "$setOnInsert": {"guild_id": ctx.guild.id}}, upsert=True)
+        await self.settings.update_one(ctx.guild.id, {"$set": {"log_message": True}, "$setOnInsert": {"guild_id": ctx.guild.id}}, upsert=True)
         await ctx.confirm()
 
     @cmd_unset.command(name="logmessage")
@@ -467,7 +488,7 @@ class Guild(commands.Cog):
             `>>unset logmessage`
             Unset message log.
         '''
-        await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$unset": {"log_message": ""}})
+        await self.settings.update_one(ctx.guild.id, {"$unset": {"log_message": ""}})
         await ctx.confirm()
 
     @cmd_set.command(name="prefix", ignore_extra=False)
@@ -489,6 +510,7 @@ class Guild(commands.Cog):
             current.append(prefix)
             current.sort(reverse=True)
             self.bot.guild_prefixes[ctx.guild.id] = current
+            self.bot.update_prefix_matcher(ctx.guild.id)
             await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$addToSet": {"prefixes": prefix}, "$setOnInsert": {"guild_id": ctx.guild.id}}, upsert=True)
             await ctx.confirm()
 
@@ -514,6 +536,7 @@ class Guild(commands.Cog):
         except:
             await ctx.deny()
         else:
+            self.bot.update_prefix_matcher(ctx.guild.id)
             await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$pull": {"prefixes": prefix}})
             await ctx.confirm()
 
@@ -524,6 +547,7 @@ class Guild(commands.Cog):
             Remove all custom prefixes.
         '''
         self.bot.guild_prefixes[ctx.guild.id] = []
+        self.bot.update_prefix_matcher(ctx.guild.id)
         await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$set": {"prefixes": []}})
         await ctx.confirm()
 
@@ -584,23 +608,18 @@ class Guild(commands.Cog):
         )
         await ctx.confirm()
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    def match_autorole(self, info):
+        guild_data = self.settings.peek(info.guild_id)
+        if guild_data is None:
+            #not cached yet, let the handler load and check it
+            return True
+        else:
+            return info.message.content == guild_data.get("autorole_phrase", False)
+
+    async def autorole(self, message, payload):
         member = message.author
-        if member.bot or not message.guild:
-            return
-        check_not_in = message.guild.id not in self.autorole_registration
-        check_equal = message.content == self.autorole_registration.get(message.guild.id)
-        if check_not_in or check_equal:
-            guild_data = await self.guild_data.find_one(
-                {"guild_id": message.guild.id},
-                projection={"_id": False, "autorole_id": True, "autorole_type": True, "autorole_phrase": True, "autorole_response": True, "autorole_response_delete": True}
-            ) or {}
-            if check_not_in:
-                phrase = guild_data.get("autorole_phrase", False)
-                self.autorole_registration[message.guild.id] = phrase
-                check_equal = message.content == phrase
-        if check_equal:
+        guild_data = await self.settings.get(message.guild.id)
+        if message.content == guild_data.get("autorole_phrase", False):
             role = discord.utils.find(lambda r: r.id==guild_data["autorole_id"], message.guild.roles)
             if not role:
                 return
@@ -628,12 +647,7 @@ class Guild(commands.Cog):
         if member.bot:
             return
         guild = member.guild
-        guild_data = await self.guild_data.find_one(
-            {"guild_id": guild.id},
-            projection={
-                "_id": False, "log_channel_id": True, "welcome_channel_id": True, "welcome_message": True, "welcome_rule": True,
-                "autorole_type": True, "autorole_id": True, "mute_role_id": True, "muted_member_ids": True}
-        )
+        guild_data = await self.settings.get(guild.id)
         if guild_data:
             if member.id in guild_data.get("muted_member_ids", ()):
                 mute_role = discord.utils.find(lambda r: r.id==guild_data["mute_role_id"], guild.roles)
@@ -653,7 +667,7 @@ class Guild(commands.Cog):
                 await welcome_channel.send(utils.str_format(welcome_message, name=member.display_name, mention=member.mention, server=member.guild.name, guild=member.guild.name))
             welcome_rule = guild_data.get("welcome_rule")
             if welcome_rule:
-                self.bot.do_after(member.send(utils.str_format(welcome_rule, server=member.guild.name)), 5)
+                self.bot.do_after(member.send(utils.str_format(welcome_rule, server=member.guild.name)), 5, category="welcome_rule", owner=self)
             autorole_type = guild_data.get("autorole_type", None)
             if autorole_type == 1:
                 role = discord.utils.find(lambda r: r.id==guild_data["autorole_id"], guild.roles)
@@ -665,10 +679,7 @@ class Guild(commands.Cog):
         if member.bot:
             return
         guild = member.guild
-        guild_data = await self.guild_data.find_one(
-            {"guild_id": guild.id},
-            projection={"_id": False, "log_channel_id": True}
-        )
+        guild_data = await self.settings.get(guild.id)
         if guild_data:
             log_channel = guild.get_channel(guild_data.get("log_channel_id"))
             if log_channel:
@@ -683,10 +694,7 @@ class Guild(commands.Cog):
     async def on_member_ban(self, guild, user):
         if user.bot:
             return
-        guild_data = await self.guild_data.find_one(
-            {"guild_id": guild.id},
-            projection={"_id": False, "log_channel_id": True}
-        )
+        guild_data = await self.settings.get(guild.id)
         if guild_data:
             log_channel = guild.get_channel(guild_data.get("log_channel_id"))
             if log_channel:
@@ -702,10 +710,7 @@ class Guild(commands.Cog):
         if before.bot:
             return
         guild = before.guild
-        guild_data = await self.guild_data.find_one(
-            {"guild_id": guild.id},
-            projection={"_id": False, "log_channel_id": True, "log_message": True, "mute_role_id": True, "muted_member_ids": True}
-        )
+        guild_data = await self.settings.get(guild.id)
         if guild_data:
             old_roles = set(before.roles)
             new_roles = set(after.roles)
@@ -726,12 +731,12 @@ class Guild(commands.Cog):
                         embed.add_field(name="Roles add", value=", ".join([r.name for r in add_roles]), inline=False)
                         if guild_data.get("mute_role_id") in (r.id for r in add_roles):
                             if before.id not in guild_data.get("muted_members", ()):
-                                await self.guild_data.update_one({"guild_id": guild.id}, {"$addToSet": {"muted_member_ids": before.id}})
+                                await self.settings.update_one(guild.id, {"$addToSet": {"muted_member_ids": before.id}})
                     if remove_roles:
                         embed.add_field(name="Roles remove", value=", ".join([r.name for r in remove_roles]), inline=False)
                         if guild_data.get("mute_role_id") in (r.id for r in remove_roles):
                             if before.id in guild_data.get("muted_members", ()):
-                                await self.guild_data.update_one({"guild_id": guild.id}, {"$pull": {"muted_member_ids": before.id}})
+                                await self.settings.update_one(guild.id, {"$pull": {"muted_member_ids": before.id}})
                 embed.set_footer(text=utils.format_time(utils.now_time()))
 
                 if guild_data.get("log_message"):
@@ -746,10 +751,7 @@ class Guild(commands.Cog):
         guild = message.guild
         if not guild:
             return
-        guild_data = await self.guild_data.find_one(
-            {"guild_id": guild.id},
-            projection={"_id": False, "log_channel_id": True, "log_message": True}
-        )
+        guild_data = await self.settings.get(guild.id)
         if guild_data:
             if guild_data.get("log_message"):
                 log_channel = guild.get_channel(guild_data.get("log_channel_id"))
@@ -783,10 +785,7 @@ class Guild(commands.Cog):
         guild = before.guild
         if not guild:
             return
-        guild_data = await self.guild_data.find_one(
-            {"guild_id": guild.id},
-            projection={"_id": False, "log_channel_id": True, "log_message": True}
-        )
+        guild_data = await self.settings.get(guild.id)
         if guild_data:
             if guild_data.get("log_message"):
                 log_channel = guild.get_channel(guild_data.get("log_channel_id"))
@@ -807,10 +806,7 @@ class Guild(commands.Cog):
         if messages:
             channel = messages[0].channel
             guild = channel.guild
-            guild_data = await self.guild_data.find_one(
-                {"guild_id": guild.id},
-                projection={"_id": False, "log_channel_id": True, "log_message": True}
-            )
+            guild_data = await self.settings.get(guild.id)
             if guild_data:
                 if guild_data.get("log_message"):
                     log_channel = guild.get_channel(guild_data.get("log_channel_id"))
@@ -823,13 +819,14 @@ class Guild(commands.Cog):
                         all_text = "\n".join((f"{m.created_at.strftime('%Y-%m-%d %I:%M:%S')} {m.id: <18} {m.author}\n{textwrap.indent(m.content, '    ')}" for m in messages))
                         await log_channel.send(embed=embed, file=discord.File(BytesIO(all_text.encode("utf-8")), filename="purged_messages.log"))
 
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.settings.invalidate(guild.id)
+
     async def get_selfroles(self, guild):
-        role_data = await self.guild_data.find_one({"guild_id": guild.id}, projection={"_id": -1, "selfrole_ids": 1})
-        if role_data:
-            roles = (discord.utils.find(lambda r: r.id==role_id, guild.roles) for role_id in role_data.get("selfrole_ids", []))
-            return [r for r in roles if r is not None]
-        else:
-            return []
+        role_data = await self.settings.get(guild.id)
+        roles = (guild.get_role(role_id) for role_id in role_data.get("selfrole_ids", []))
+        return [r for r in roles if r is not None]
 
     @modding.help(brief="Get selfrole with given name, if applicable", category="Guild", field="Role", paragraph=0)
     @commands.group(invoke_without_command=True)
@@ -870,7 +867,7 @@ class Guild(commands.Cog):
         '''
         role = discord.utils.find(lambda r: r.name.lower()==name.lower(), ctx.guild.roles)
         if role:
-            await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$addToSet": {"selfrole_ids": role.id}, "$setOnInsert": {"guild_id": ctx.guild.id}}, upsert=True)
+            await self.settings.update_one(ctx.guild.id, {"$addToSet": {"selfrole_ids": role.id}, "$setOnInsert": {"guild_id": ctx.guild.id}}, upsert=True)
             await ctx.confirm()
         else:
             await ctx.deny()
@@ -887,7 +884,7 @@ class Guild(commands.Cog):
         '''
         role = discord.utils.find(lambda r: r.name.lower()==name.lower(), ctx.guild.roles)
         if role:
-            await self.guild_data.update_one({"guild_id": ctx.guild.id}, {"$pull": {"selfrole_ids": role.id}})
+            await self.settings.update_one(ctx.guild.id, {"$pull": {"selfrole_ids": role.id}})
             await ctx.confirm()
         else:
             await ctx.deny()
@@ -952,7 +949,7 @@ class Guild(commands.Cog):
                 return await ctx.send("There's no member with any selfrole.")
             check_roles.append({"name": "All with selfroles", "count": {"": len(all_members)}, "color": (255, 255, 255, 255)})
 
-            bytes_ = await utils.bar_chart(check_roles, unit_y="members", unit_x="", loop=self.bot.loop)
+            bytes_ = await utils.bar_chart(check_roles, unit_y="members", unit_x="", ctx=ctx)
             await ctx.send(file=discord.File(bytes_, filename="distribution.png"))
 
     @modding.help(brief="Give member mute role if applicable", category="Guild", field="Server management", paragraph=1)
@@ -966,8 +963,8 @@ class Guild(commands.Cog):
             Can specify mute time in reason, i.e. `for 1 hour`.
             If no mute time is specified, mute indefinitely.
         '''
-        role_data = await self.guild_data.find_one({"guild_id": ctx.guild.id, "mute_role_id": {"$ne": None}}, projection={"_id": -1, "mute_role_id": 1})
-        if role_data:
+        role_data = await self.settings.get(ctx.guild.id)
+        if role_data.get("mute_role_id"):
             muted_role = discord.utils.find(lambda r: r.id==role_data["mute_role_id"], ctx.guild.roles)
             await member.add_roles(muted_role)
             try:
@@ -1001,8 +998,8 @@ class Guild(commands.Cog):
             `>>unmute <member>`
             Remove muted role from member.
         '''
-        role_data = await self.guild_data.find_one({"guild_id": ctx.guild.id, "mute_role_id": {"$ne": None}}, projection={"_id": -1, "mute_role_id": 1})
-        if role_data:
+        role_data = await self.settings.get(ctx.guild.id)
+        if role_data.get("mute_role_id"):
             muted_role = discord.utils.find(lambda r: r.id==role_data["mute_role_id"], ctx.guild.roles)
             await member.remove_roles(muted_role)
             await ctx.send(f"{member.mention} has been unmute.")
@@ -1110,7 +1107,7 @@ class Guild(commands.Cog):
             `>>prefix`
             Display all server prefixes.
         '''
-        prefixes = await self.bot.get_prefix(ctx.message)
+        prefixes = self.bot.get_all_prefixes(ctx.guild.id)
         prefixes.remove(f"<@!{ctx.me.id}> ")
         await ctx.send(embed=discord.Embed(title=f"Prefixes for {ctx.guild.name}", description="\n".join((f"{i+1}. {p}" for i, p in enumerate(prefixes)))))
 
@@ -1225,6 +1222,7 @@ class Guild(commands.Cog):
         guild_data = self.bot.disabled_data.get(ctx.guild.id, {})
         guild_data["disabled_bot_guild"] = True
         self.bot.disabled_data[ctx.guild.id] = guild_data
+        self.bot.update_command_policy(ctx.guild.id)
         await self.guild_data.update_one(
             {
                 "guild_id": ctx.guild.id
@@ -1247,6 +1245,7 @@ class Guild(commands.Cog):
         guild_data = self.bot.disabled_data.get(ctx.guild.id, {})
         guild_data["disabled_bot_guild"] = False
         self.bot.disabled_data[ctx.guild.id] = guild_data
+        self.bot.update_command_policy(ctx.guild.id)
         await self.guild_data.update_one(
             {
                 "guild_id": ctx.guild.id
@@ -1270,6 +1269,7 @@ class Guild(commands.Cog):
         disabled_channel.add(channel.id)
         guild_data["disabled_bot_channel"] = disabled_channel
         self.bot.disabled_data[ctx.guild.id] = guild_data
+        self.bot.update_command_policy(ctx.guild.id)
         await self.guild_data.update_one(
             {
                 "guild_id": ctx.guild.id
@@ -1294,6 +1294,7 @@ class Guild(commands.Cog):
         disabled_channel.discard(channel.id)
         guild_data["disabled_bot_channel"] = disabled_channel
         self.bot.disabled_data[ctx.guild.id] = guild_data
+        self.bot.update_command_policy(ctx.guild.id)
         await self.guild_data.update_one(
             {
                 "guild_id": ctx.guild.id
@@ -1317,6 +1318,7 @@ class Guild(commands.Cog):
         disabled_member.add(member.id)
         guild_data["disabled_bot_member"] = disabled_member
         self.bot.disabled_data[ctx.guild.id] = guild_data
+        self.bot.update_command_policy(ctx.guild.id)
         await self.guild_data.update_one(
             {
                 "guild_id": ctx.guild.id
@@ -1341,6 +1343,7 @@ class Guild(commands.Cog):
         disabled_member.discard(member.id)
         guild_data["disabled_bot_member"] = disabled_member
         self.bot.disabled_data[ctx.guild.id] = guild_data
+        self.bot.update_command_policy(ctx.guild.id)
         await self.guild_data.update_one(
             {
                 "guild_id": ctx.guild.id
@@ -1382,6 +1385,7 @@ class Guild(commands.Cog):
         disabled_guild.add(cmd)
         guild_data["disabled_command_guild"] = disabled_guild
         self.bot.disabled_data[ctx.guild.id] = guild_data
+        self.bot.update_command_policy(ctx.guild.id)
         await self.guild_data.update_one(
             {
                 "guild_id": ctx.guild.id
@@ -1409,6 +1413,7 @@ class Guild(commands.Cog):
         disabled_guild.discard(cmd)
         guild_data["disabled_command_guild"] = disabled_guild
         self.bot.disabled_data[ctx.guild.id] = guild_data
+        self.bot.update_command_policy(ctx.guild.id)
         await self.guild_data.update_one(
             {
                 "guild_id": ctx.guild.id
@@ -1434,6 +1439,7 @@ class Guild(commands.Cog):
         disabled_channel.add((cmd, channel.id))
         guild_data["disabled_command_channel"] = disabled_channel
         self.bot.disabled_data[ctx.guild.id] = guild_data
+        self.bot.update_command_policy(ctx.guild.id)
         await self.guild_data.update_one(
             {
                 "guild_id": ctx.guild.id
@@ -1461,6 +1467,7 @@ class Guild(commands.Cog):
         disabled_channel.discard((cmd, channel.id))
         guild_data["disabled_command_channel"] = disabled_channel
         self.bot.disabled_data[ctx.guild.id] = guild_data
+        self.bot.update_command_policy(ctx.guild.id)
         await self.guild_data.update_one(
             {
                 "guild_id": ctx.guild.id
@@ -1486,6 +1493,7 @@ class Guild(commands.Cog):
         disabled_member.add((cmd, member.id))
         guild_data["disabled_command_member"] = disabled_member
         self.bot.disabled_data[ctx.guild.id] = guild_data
+        self.bot.update_command_policy(ctx.guild.id)
         await self.guild_data.update_one(
             {
                 "guild_id": ctx.guild.id
@@ -1513,6 +1521,7 @@ class Guild(commands.Cog):
         disabled_member.discard((cmd, member.id))
         guild_data["disabled_command_member"] = disabled_member
         self.bot.disabled_data[ctx.guild.id] = guild_data
+        self.bot.update_command_policy(ctx.guild.id)
         await self.guild_data.update_one(
             {
                 "guild_id": ctx.guild.id
@@ -32,37 +32,31 @@ class Help(commands.Cog):
         Help and utility commands.
     '''
 
+    snapshot_version = 2
+
     def __init__(self, bot):
         self.bot = bot
         self.bot.remove_command("help")
-        test_guild = bot.get_guild(config.TEST_GUILD_ID)
-        test_guild_3 = bot.get_guild(config.TEST_GUILD_3_ID)
         self.otogi_guild = bot.get_guild(config.OTOGI_GUILD_ID)
-        creampie_guild = bot.get_guild(config.CREAMPIE_GUILD_ID)
-        dpy_guild = bot.get_guild(config.DISCORDPY_GUILD_ID)
+        registry = bot.emoji_registry
         self.emojis = {}
-        for emoji_name in ("mochi", "ranged"):
-            self.emojis[emoji_name] = discord.utils.find(lambda e: e.name==emoji_name, creampie_guild.emojis)
-        for emoji_name in ("hu",):
-            self.emojis[emoji_name] = discord.utils.find(lambda e: e.name==emoji_name, test_guild.emojis)
-        for emoji_name in ("core",):
-            self.emojis[emoji_name] = discord.utils.find(lambda e: e.name==emoji_name, test_guild_3.emojis)
-        for emoji_name in ("python", "dpy"):
-            if dpy_guild:
-                self.emojis[emoji_name] = discord.utils.find(lambda e: e.name==emoji_name, dpy_guild.emojis)
-            else:
-                self.emojis["python"] = "\U0001f40d"
-                self.emojis["dpy"] = "\U0001f967"
+        registry.resolve(self, config.CREAMPIE_GUILD_ID, ("mochi", "ranged"), self.emojis)
+        registry.resolve(self, config.TEST_GUILD_ID, ("hu",), self.emojis)
+        registry.resolve(self, config.TEST_GUILD_3_ID, ("core",), self.emojis)
+        if bot.get_guild(config.DISCORDPY_GUILD_ID):
+            registry.resolve(self, config.DISCORDPY_GUILD_ID, ("python", "dpy"), self.emojis)
+        else:
+            self.emojis["python"] = "\U0001f40d"
+            self.emojis["dpy"] = "\U0001f967"
 
-        self.command_run_count = bot.saved_stuff.pop("command_run_count", {})
-        self.recent_commands = bot.saved_stuff.pop("recent_commands", collections.deque(maxlen=20))
+        state = bot.snapshots.pop(self) or {}
+        self.recent_commands = state.get("recent_commands", collections.deque(maxlen=20))
 
-        bot.loop.create_task(self.get_webhook())
+        bot.create_task(self.get_webhook(), category="cog_setup", owner=self)
         self.setup_help()
 
-    def cog_unload(self):
-        self.bot.saved_stuff["command_run_count"] = self.command_run_count
-        self.bot.saved_stuff["recent_commands"] = self.recent_commands
+    def snapshot_state(self):
+        return {"recent_commands": self.recent_commands}
 
     def setup_help(self):
         infodump = {
@@ -277,10 +271,12 @@ class Help(commands.Cog):
 
     @commands.Cog.listener()
     async def on_command_completion(self, ctx):
+        if getattr(ctx.command, "lazy", False):
+            return
         cmd = ctx.command.qualified_name
         if cmd in ("reload", "unload"):
             self.setup_help()
-        self.command_run_count[cmd] = self.command_run_count.get(cmd, 0) + 1
+        self.bot.command_analytics.record(cmd, getattr(ctx.guild, "id", None))
         self.recent_commands.append(cmd)
 
     @commands.command()
@@ -552,27 +548,42 @@ class Help(commands.Cog):
         await ctx.send(final_url)
 
     @commands.command(hidden=True)
-    async def topcmd(self, ctx):
-        all_cmds = sorted(list(self.command_run_count.items()), key=lambda x: x[1], reverse=True)
-
-        embed = discord.Embed(title="Commands run")
-        total = (x[1] for x in all_cmds)
-        embed.add_field(name="Total", value=f"{sum(total)}", inline=False)
-
-        top = []
-        rest = []
-        for cmd in all_cmds:
-            if len(top) >= 3:
-                rest.append(cmd)
-            else:
-                top.append(cmd)
+    async def topcmd(self, ctx, scope=None):
+        '''
+            `>>topcmd <optional: day|global|hour>`
+            All time command usage, or the last 24 hours in this server, in all servers, or the last hour in this server.
+        '''
+        command_analytics = self.bot.command_analytics
+        guild_id = getattr(ctx.guild, "id", None)
+        if scope == "day":
+            title = "Commands run in this server in the last 24 hours"
+            all_cmds = command_analytics.top_recent(guild_id=guild_id)
+        elif scope == "global":
+            title = "Commands run in the last 24 hours"
+            all_cmds = command_analytics.top_recent()
+        elif scope == "hour":
+            title = "Commands run in this server in the last hour"
+            all_cmds = command_analytics.top_recent(guild_id=guild_id, minutes=60)
+        else:
+            title = "Commands run"
+            all_cmds = command_analytics.top(50)
+        if scope in ("day", "global", "hour"):
+            total = sum(x[1] for x in all_cmds)
+            all_cmds = all_cmds[:50]
+        else:
+            total = command_analytics.totals.total
+
+        embed = discord.Embed(title=title)
+        embed.add_field(name="Total", value=f"{total}", inline=False)
 
+        top = all_cmds[:3]
+        rest = all_cmds[3:]
         top_cmd_txt = "\n".join((f"{i+1}\u20e3 {x[0]} - {x[1]} times" for i, x in enumerate(top)))
         the_rest = ", ".join((f"{x[0]} ({x[1]})" for x in rest))
         the_rest_pages = utils.split_page(the_rest, 1000, check=lambda x: x==",")
-        embed.add_field(name="Top commands", value=top_cmd_txt, inline=False)
-        embed.add_field(name="Other", value=the_rest_pages[0], inline=False)
-        embed.add_field(name="Recent commands", value=", ".join(reversed(self.recent_commands)), inline=False)
+        embed.add_field(name="Top commands", value=top_cmd_txt or "None", inline=False)
+        embed.add_field(name="Other", value=the_rest_pages[0] or "None", inline=False)
+        embed.add_field(name="Recent commands", value=", ".join(reversed(self.recent_commands)) or "None", inline=False)
 
         await ctx.send(embed=embed)
 
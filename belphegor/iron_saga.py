@@ -172,6 +172,8 @@ class Mech(data_type.BaseObject):
 #==================================================================================================================================================
 
 class IronSaga(commands.Cog):
+    search_collections = ("pilot_index", "part_index", "pet_index", "mech_index")
+
     def __init__(self, bot):
         self.bot = bot
         self.pilot_index = bot.db.pilot_index
@@ -182,13 +184,11 @@ class IronSaga(commands.Cog):
             "SSS": "[SSS] ", "SS": "[SS] ", "S": "[S] ", "A": "[A] ", "B": "[B] ", "C": "[C] "
         }
 
-        test_guild_3 = bot.get_guild(config.TEST_GUILD_3_ID)
-        for emoji_name in (
+        bot.emoji_registry.resolve(self, config.TEST_GUILD_3_ID, (
             "exp_capsule", "blinking",
             "normal", "fire", "ice", "em",  "beam", "explosive", "acid",
             "main_arm", "secondary_arm", "missile", "melee", "mega_weapon"
-        ):
-            self.emojis[emoji_name] = discord.utils.find(lambda e: e.name==emoji_name, test_guild_3.emojis)
+        ), self.emojis)
 
     @commands.group(invoke_without_command=True)
     async def pilot(self, ctx, *, name):
@@ -150,14 +150,14 @@ class Misc(commands.Cog):
         self.guild_data = bot.db.guild_data
         self.owo = {"/o/": "\\o\\", "\\o\\": "/o/", "\\o/": "/o\\", "/o\\": "\\o/"}
         self.setup_ascii_chars()
-        self.auto_rep_disabled = set()
-        bot.loop.create_task(self.fetch_auto_rep_settings())
+        self.auto_rep_disabled = bot.auto_rep_disabled
+        bot.create_task(self.fetch_auto_rep_settings(), category="cog_setup", owner=self)
+        bot.message_pipeline.add_handler("misc_auto_reply", self.match_auto_reply, self.auto_reply, auto_reply=True)
 
-        self.dragon_chars = {}
-        dragon_guild = bot.get_guild(DRAGON_SHOUT_GUILD_ID)
-        for c in DRAGON_ALPHABET:
-            emoji = discord.utils.find(lambda e: e.name==f"dragon_{c}", dragon_guild.emojis)
-            self.dragon_chars[c] = emoji
+        self.dragon_chars = bot.emoji_registry.resolve(self, DRAGON_SHOUT_GUILD_ID, ((c, f"dragon_{c}") for c in DRAGON_ALPHABET))
+
+    def cog_unload(self):
+        self.bot.message_pipeline.remove_handler("misc_auto_reply")
 
     def quote(self, streak):
         if streak.endswith("ddd"):
@@ -259,14 +259,11 @@ class Misc(commands.Cog):
         except:
             pass
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
-        if not message.guild:
-            pass
-        elif message.guild.id in self.auto_rep_disabled:
-            return
+    def match_auto_reply(self, info):
+        inp = info.message.content
+        return inp == "ping" or inp[:3] in self.owo
+
+    async def auto_reply(self, message, payload):
         inp = message.content
         if inp == "ping":
             await self.ping(message.channel)
@@ -415,7 +412,7 @@ class Misc(commands.Cog):
         embed.set_footer(text=f"Poll will close in {utils.seconds_to_text(duration)}.")
         message = await ctx.send(embed=embed)
         for i in range(len(items)):
-            self.bot.loop.create_task(message.add_reaction(int_to_emoji[i+1]))
+            self.bot.create_task(message.add_reaction(int_to_emoji[i+1]), category="reaction_add")
         await asyncio.sleep(duration)
         message = await ctx.fetch_message(message.id)
         result = {}
@@ -707,7 +704,8 @@ class Misc(commands.Cog):
                 embed.set_image(url=message.attachments[0].url)
             await ctx.send(embed=embed)
 
-    def to_ascii(self, image, width, height):
+    @staticmethod
+    def to_ascii(image, width, height):
         image = image.resize((width, height)).convert("L")
 
         pixels = image.getdata()
@@ -759,7 +757,7 @@ class Misc(commands.Cog):
             image = Image.open(BytesIO(bytes_))
         except OSError:
             return await ctx.send("Cannot identify image.")
-        text = await self.bot.loop.run_in_executor(None, self.to_ascii, image, width, width//2)
+        text = await self.bot.run_cpu(ctx, self.to_ascii, image, width, width//2, process=True)
         await ctx.send(file=discord.File(BytesIO(text.encode("utf-8")), filename=f"ascii_{len(text)}_chars.txt"))
 
     def setup_ascii_chars(self):
@@ -905,7 +903,7 @@ class Misc(commands.Cog):
             end = time.perf_counter()
             return ret, end-start
 
-        result, time_taken = await self.bot.loop.run_in_executor(None, do_stuff)
+        result, time_taken = await self.bot.run_cpu(ctx, do_stuff)
         await ctx.send(f"Result in {time_taken*1000:.2f}ms```\n{result}\n```")
 
     @ascii_edge.error
@@ -982,7 +980,7 @@ class Misc(commands.Cog):
             else:
                 return next(blank_chars)
 
-        result = await self.bot.loop.run_in_executor(None, self.convert_image_to_ascii, image, None, per_cut, width, height, 2, 4, threshold, inverse)
+        result = await self.bot.run_cpu(ctx, self.convert_image_to_ascii, image, None, per_cut, width, height, 2, 4, threshold, inverse)
         if result.isspace():
             await ctx.send("Result is all blank. Maybe you should try tweaking threshold a little?")
         else:
@@ -1018,7 +1016,7 @@ class Misc(commands.Cog):
             pt = (np.sum(cut[:, 0:2])//3, np.sum(cut[:, 2:4])//3)
             return MOON_PATTERN[pt]
 
-        result = await self.bot.loop.run_in_executor(None, self.convert_image_to_ascii, image, None, per_cut, width, height, 4, 4, threshold, inverse)
+        result = await self.bot.run_cpu(ctx, self.convert_image_to_ascii, image, None, per_cut, width, height, 4, 4, threshold, inverse)
         await ctx.send(f"```\n{result}\n```")
 
     @modding.help(brief="pong", category=None, field="Other", paragraph=0)
@@ -1108,7 +1106,7 @@ class Misc(commands.Cog):
             bio.seek(0)
             return bio
 
-        bytes_2 = await self.bot.loop.run_in_executor(None, do_stuff)
+        bytes_2 = await self.bot.run_cpu(ctx, do_stuff)
         await ctx.send(file=discord.File(bytes_2, "monochrome.png"))
 
     def rgb_to_hsv(self, rgb):
@@ -1218,7 +1216,7 @@ class Misc(commands.Cog):
             bio.seek(0)
             return bio
 
-        bytes_2 = await self.bot.loop.run_in_executor(None, do_stuff)
+        bytes_2 = await self.bot.run_cpu(ctx, do_stuff)
         await ctx.send(file=discord.File(bytes_2, "monochrome.png"))
 
     def rgb_to_hsl(self, rgb):
@@ -1321,7 +1319,7 @@ class Misc(commands.Cog):
             bio.seek(0)
             return bio
 
-        bytes_2 = await self.bot.loop.run_in_executor(None, do_stuff)
+        bytes_2 = await self.bot.run_cpu(ctx, do_stuff)
         await ctx.send(file=discord.File(bytes_2, "sketch.png"))
 
     @modding.help(brief="Turn avatar into sketch", category="Misc", field="Processing", paragraph=1)
@@ -1371,7 +1369,7 @@ class Misc(commands.Cog):
             bio.seek(0)
             return bio
 
-        bytes_2 = await self.bot.loop.run_in_executor(None, do_stuff)
+        bytes_2 = await self.bot.run_cpu(ctx, do_stuff)
         await ctx.send(file=discord.File(bytes_2, "sketch2.png"))
 
     @modding.help(brief="[Elementary cellular automaton](https://en.wikipedia.org/wiki/Elementary_cellular_automaton)", category="Misc", field="Processing", paragraph=0)
@@ -275,7 +275,7 @@ class MusicPlayer:
 
     def ready_to_play(self, channel):
         self.channel = channel
-        self.player = weakref.ref(self.bot.loop.create_task(self.play_till_eternity()))
+        self.player = weakref.ref(self.bot.create_task(self.play_till_eternity(), category="music_player"))
 
     def skip(self):
         if self.guild.voice_client:
@@ -304,7 +304,7 @@ class MusicPlayer:
 
     def quit(self):
         self.cancel()
-        self.bot.create_task_and_count(self.leave_voice())
+        self.bot.create_task(self.leave_voice(), category="shutdown")
 
     async def play_till_eternity(self):
         def next_part(e):
@@ -363,6 +363,8 @@ class Music(commands.Cog):
     Music is life.
     '''
 
+    db_indexes = {"music_playlist_data": ["guild_id"]}
+
     def __init__(self, bot):
         self.bot = bot
         self.playlist_data = bot.db.music_playlist_data
@@ -593,10 +595,9 @@ class Music(commands.Cog):
             \U0001f501 - Repeat playlist
         '''
         music_player = await self.get_music_player(ctx.guild)
-        _loop = self.bot.loop
         modes = ("\U000025b6", "\U0001f502", "\U0001f501")
         for m in modes:
-            _loop.create_task(ctx.message.add_reaction(m))
+            self.bot.create_task(ctx.message.add_reaction(m), category="reaction_add")
         try:
             reaction, user = await self.bot.wait_for("reaction_add", check=lambda r, u: r.emoji in modes and u.id==ctx.author.id, timeout=60)
         except asyncio.TimeoutError:
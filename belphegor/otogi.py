@@ -361,6 +361,9 @@ class Otogi(commands.Cog):
     Otogi daemon info and summon simulation.
     '''
 
+    db_indexes = {"otogi_simulation_player_list": ["id"], "daemon_collection": ["id"]}
+    search_collections = ("daemon_collection",)
+
     def __init__(self, bot):
         self.bot = bot
 
@@ -372,13 +375,10 @@ class Otogi(commands.Cog):
         self.stat_sheet = db.otogi_effective_stats_sheet
         self.belphegor_config = db.belphegor_config
 
-        creampie_guild = self.bot.get_guild(config.CREAMPIE_GUILD_ID)
-        self.emojis = {}
-        for emoji_name in (
+        self.emojis = bot.emoji_registry.resolve(self, config.CREAMPIE_GUILD_ID, (
             "atk", "hp", "skill", "ability", "bond", "star", "mochi", "phantasma",
             "anima", "divina", "ranged", "melee", "healer", "assist"
-        ):
-            self.emojis[emoji_name] = discord.utils.find(lambda e:e.name==emoji_name, creampie_guild.emojis)
+        ))
 
         self.lock = asyncio.Lock()
 
@@ -426,7 +426,6 @@ class Otogi(commands.Cog):
         await paging.navigate(ctx)
 
     async def _search_att(self, attrs):
-        result = []
         query = {}
         projection = {"_id": False, "id": True, "name": True}
         for attr in attrs:
@@ -492,7 +491,7 @@ class Otogi(commands.Cog):
             query.update(q)
             projection.update(p)
 
-        async for daemon in self.daemon_collection.find(query, projection=projection, sort=[("id", 1)]):
+        def transform(daemon):
             new_daemon = {}
             new_daemon["id"] = daemon.pop("id")
             new_daemon["name"] = daemon.pop("name")
@@ -512,8 +511,9 @@ class Otogi(commands.Cog):
                 else:
                     r = f"{r}\n{key}: {value}"
             new_daemon["value"] = r
-            result.append(new_daemon)
-        return result
+            return new_daemon
+
+        return await self.bot.search_indexes.find("daemon_collection", query, projection, [("id", 1)]), transform
 
     @modding.help(brief="Find daemons with given conditions", category="Otogi", field="Database", paragraph=0)
     @cmd_daemon.command(name="filter")
@@ -543,10 +543,10 @@ class Otogi(commands.Cog):
             - description
         '''
         attrs = [(k, v) for k, v in data.items() if k and v]
-        result = await self._search_att(attrs)
+        result, transform = await self._search_att(attrs)
         if result:
-            paging = utils.Paginator(
-                result, 5, separator="\n\n",
+            paging = utils.StreamPaginator(
+                result, 5, total=len(result), transform=transform, separator="\n\n",
                 title=f"Search result: {len(result)} results",
                 description=lambda i, x: f"`#{x['id']}` **{x['name']}**{x['value']}",
                 colour=discord.Colour.orange()
@@ -858,6 +858,9 @@ class Otogi(commands.Cog):
             await ctx.invoke(cmd_wikia, data=data)
 
     async def get_player(self, id):
+        player = await self.player_list.find_one({"id": id})
+        if player:
+            return player
         async with self.lock:
             return await self.player_list.find_one_and_update(
                 {"id": id},
@@ -890,13 +893,11 @@ class Otogi(commands.Cog):
                 rarity = 3
             pool = await self.summon_pool.find_one({"rarity": rarity})
             daemon_id = random.choice(pool["pool"])
-            await self.player_list.find_one_and_update(
+            await self.player_list.update_one(
                 {"id": id},
-                {
-                    "$inc": {"total_attempts": 1},
-                    "$push": {"daemons": {"$each": [{"id": daemon_id, "lb": 0}], "$sort": {"id": 1, "lb": -1}}}
-                }
+                {"$push": {"daemons": {"$each": [{"id": daemon_id, "lb": 0}], "$sort": {"id": 1, "lb": -1}}}}
             )
+            self.bot.counters.increment("otogi_simulation_player_list", {"id": id}, "total_attempts")
             daemon = await ctx.search(daemon_id, self.daemon_collection, cls=Daemon, atts=[], index_att="id", name_att="name", prompt=False)
             embed = discord.Embed(title=f"{ctx.author.display_name} summoned {daemon.name}!", colour=discord.Colour.orange())
             scale_url = daemon.true_image_url
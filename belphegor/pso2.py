@@ -290,40 +290,37 @@ class PSO2(commands.Cog):
     PSO2 info.
     '''
 
+    db_indexes = {"weapon_list": ["category"]}
+    search_collections = ("chip_library", "weapon_list", "unit_list")
+
     def __init__(self, bot):
         self.bot = bot
         self.chip_library = bot.db.chip_library
         self.weapon_list = bot.db.weapon_list
         self.unit_list = bot.db.unit_list
         self.guild_data = bot.db.guild_data
-        test_guild = self.bot.get_guild(config.TEST_GUILD_ID)
-        test_guild_2 = self.bot.get_guild(config.TEST_GUILD_2_ID)
         self.emojis = {}
-        for emoji_name in (
+        bot.emoji_registry.resolve(self, config.TEST_GUILD_ID, (
             "fire", "ice", "lightning", "wind", "light", "dark",
             "hu", "fi", "ra", "gu", "fo", "te", "br", "bo", "su", "hr", "ph", "et", "lu",
             "satk", "ratk", "tatk", "ability", "potential",
-            "pa", "saf", "star_0", "star_1", "star_2", "star_3", "star_4", "rappy"
-        ):
-            self.emojis[emoji_name] = discord.utils.find(lambda e:e.name==emoji_name, test_guild.emojis)
-        for emoji_name in WEAPON_SORT:
-            self.emojis[emoji_name] = discord.utils.find(lambda e:e.name==emoji_name, test_guild.emojis)
-        for emoji_name in (
+            "pa", "saf", "star_0", "star_1", "star_2", "star_3", "star_4", "rappy",
+            *WEAPON_SORT
+        ), self.emojis)
+        bot.emoji_registry.resolve(self, config.TEST_GUILD_2_ID, (
             "sdef", "rdef", "tdef", "dex", "rear", "arm", "leg", "sub", "s_res", "r_res", "t_res",
             "fire_res", "ice_res", "lightning_res", "wind_res", "light_res", "dark_res",
-            "s_class", "s1", "s2", "s3", "s4", "s5", "s6", "s7", "s8"
-        ):
-            self.emojis[emoji_name] = discord.utils.find(lambda e:e.name==emoji_name, test_guild_2.emojis)
-        self.emojis["set_effect"] = self.emojis["rear"]
+            "s_class", "s1", "s2", "s3", "s4", "s5", "s6", "s7", "s8", ("set_effect", "rear")
+        ), self.emojis)
         self.last_jp_eq_data = None
         self.last_na_eq_data = None
         self.api_data = {}
         self.server_data = None
-        self.eq_alert_forever = weakref.ref(bot.loop.create_task(self.eq_alert()))
+        self.eq_alert_forever = weakref.ref(bot.create_task(self.eq_alert(), name="eq_alert", category="pso2_alert", owner=self))
         self.daily_order_pattern = bot.db.daily_order_pattern
         self.calendar = build("calendar", "v3", developerKey=token.GOOGLE_CLIENT_API_KEY)
         self.incoming_events = data_type.Observer()
-        self.boost_remind_forever = weakref.ref(bot.loop.create_task(self.boost_remind()))
+        self.boost_remind_forever = weakref.ref(bot.create_task(self.boost_remind(), name="boost_remind", category="pso2_alert", owner=self))
 
     def cog_unload(self):
         try:
@@ -376,7 +373,6 @@ class PSO2(commands.Cog):
         await ctx.send(embed=weapon.embed_form(self))
 
     async def _search_att(self, attrs):
-        result = []
         query = {}
         projection = {"_id": False, "category": True, "en_name": True, "jp_name": True}
         special = None
@@ -457,7 +453,7 @@ class PSO2(commands.Cog):
             query.update(q)
             projection.update(p)
 
-        async for weapon in self.weapon_list.find(query, projection=projection):
+        def transform(weapon):
             new_weapon = {}
             new_weapon["category"] = weapon.pop("category")
             new_weapon["en_name"] = weapon.pop("en_name")
@@ -497,8 +493,9 @@ class PSO2(commands.Cog):
                 else:
                     ret.append(f"{key}: {desc}")
             new_weapon["value"] = "\n".join(ret)
-            result.append(new_weapon)
-        return result
+            return new_weapon
+
+        return await self.bot.search_indexes.find("weapon_list", query, projection), transform
 
     @modding.help(brief="Search weapons with given conditions", category="PSO2", field="Database", paragraph=0)
     @cmd_weapon.command(name="filter")
@@ -521,10 +518,10 @@ class PSO2(commands.Cog):
             raise checks.CustomError("Can't filter without any input you know.")
 
         attrs = [(k, v) for k, v in data.items()]
-        result = await self._search_att(attrs)
+        result, transform = await self._search_att(attrs)
         if result:
-            paging = utils.Paginator(
-                result, 5, separator="\n\n",
+            paging = utils.StreamPaginator(
+                result, 5, total=len(result), transform=transform, separator="\n\n",
                 title=f"Search result: {len(result)} results",
                 description=lambda i, x: f"{self.emojis[x['category']]}**{x['en_name']}**\n{x['value']}",
                 colour=discord.Colour.blue()
@@ -778,7 +775,6 @@ class PSO2(commands.Cog):
         }
 
     async def eq_alert(self):
-        _loop = self.bot.loop
         try:
             await self.check_for_new_version()
             while True:
@@ -862,7 +858,7 @@ class PSO2(commands.Cog):
             return
         except (ConnectionError, aiohttp.ClientConnectorError):
             await asyncio.sleep(60)
-            self.eq_alert_forever = weakref.ref(_loop.create_task(self.eq_alert()))
+            self.eq_alert_forever = weakref.ref(self.bot.create_task(self.eq_alert(), name="eq_alert", category="pso2_alert", owner=self))
         except Exception as e:
             text = traceback.format_exc()
             if len(text) > 1950:
@@ -879,10 +875,10 @@ class PSO2(commands.Cog):
                 else:
                     print("Discord gone crazy so can't log shit")
 
-            _loop.create_task(log_error())
+            self.bot.create_task(log_error(), category="error_log")
 
             await asyncio.sleep(600)
-            self.eq_alert_forever = weakref.ref(_loop.create_task(self.eq_alert()))
+            self.eq_alert_forever = weakref.ref(self.bot.create_task(self.eq_alert(), name="eq_alert", category="pso2_alert", owner=self))
 
     def get_emoji(self, dt_obj):
         if dt_obj.minute == 0:
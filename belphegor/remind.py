@@ -13,11 +13,13 @@ import weakref
 #==================================================================================================================================================
 
 class Remind(commands.Cog):
+    db_indexes = {"remind_event_list": ["event_time", [("author_id", 1), ("event_time", 1)]]}
+
     def __init__(self, bot):
         self.bot = bot
         self.active = asyncio.Event()
         self.event_list = bot.db.remind_event_list
-        self.reminder = weakref.ref(bot.loop.create_task(self.check_till_eternity()))
+        self.reminder = weakref.ref(bot.create_task(self.check_till_eternity(), name="reminder_loop", category="reminder_loop", owner=self))
 
     def cog_unload(self):
         self.reminder().cancel()
@@ -62,7 +64,7 @@ class Remind(commands.Cog):
             if channel and member:
                 await channel.send(f"{add_text}{member.mention}, {wait_time_text} ago you asked me to remind you: \"{remind_event['text']}\"")
 
-        self.bot.loop.create_task(reminder())
+        self.bot.create_task(reminder(), category="reminder")
 
     @modding.help(brief=None, category="Misc", field="Commands", paragraph=2)
     @commands.group(aliases=["reminder"])
@@ -3,7 +3,6 @@ from discord.ext import commands
 from . import utils
 from .utils import checks, modding
 import re
-from rapidfuzz import process
 
 #==================================================================================================================================================
 
@@ -14,13 +13,18 @@ NO_WORD_REGEX = re.compile(r"\W+")
 #==================================================================================================================================================
 
 class Sticker(commands.Cog):
+    db_indexes = {"sticker_list": ["name", [("author_id", 1), ("name", 1)]]}
+
     def __init__(self, bot):
         self.bot = bot
         self.sticker_list = self.bot.db.sticker_list
         self.guild_data = bot.db.guild_data
         self.sticker_regexes = {}
-        bot.loop.create_task(self.get_all_prefixes())
-        self.auto_rep_disabled = bot.get_cog("Misc").auto_rep_disabled
+        bot.create_task(self.get_all_prefixes(), category="cog_setup", owner=self)
+        bot.message_pipeline.add_handler("sticker", self.match_sticker, self.send_sticker, auto_reply=True)
+
+    def cog_unload(self):
+        self.bot.message_pipeline.remove_handler("sticker")
 
     async def get_all_prefixes(self):
         async for data in self.guild_data.find(
@@ -29,27 +33,18 @@ class Sticker(commands.Cog):
         ):
             self.sticker_regexes[data["guild_id"]] = re.compile(fr"(?<={re.escape(data['sticker_prefix'])})\w+")
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
-        gid = getattr(message.guild, "id", None)
-        if gid in self.auto_rep_disabled:
-            return
-        result = self.sticker_regexes.get(gid, DEFAULT_PREFIX_REGEX).findall(message.content)
-        query = {"name": {"$in": result}}
+    def match_sticker(self, info):
+        return self.sticker_regexes.get(info.guild_id, DEFAULT_PREFIX_REGEX).findall(info.message.content)
+
+    async def send_sticker(self, message, names):
+        query = {"name": {"$in": names}}
         if message.guild:
-            query["banned_guilds"] = {"$not": {"$eq": gid}}
-        st = await self.sticker_list.find_one_and_update(query, {"$inc": {"uses": 1}}, projection={"_id": False, "url": True})
+            query["banned_guilds"] = {"$not": {"$eq": message.guild.id}}
+        st = await self.sticker_list.find_one(query, projection={"_id": False, "name": True, "url": True})
         if st:
+            self.bot.counters.increment("sticker_list", {"name": st["name"]}, "uses")
             await message.channel.send(st["url"])
 
-    @commands.Cog.listener()
-    async def on_command_completion(self, ctx):
-        if ctx.command.name == "reload":
-            if ctx.args[2] == "misc":
-                self.auto_rep_disabled = self.bot.get_cog("Misc").auto_rep_disabled
-
     @modding.help(brief=None, category="Tag & sticker", field="Commands", paragraph=1)
     @commands.group()
     async def sticker(self, ctx):
@@ -108,6 +103,16 @@ class Sticker(commands.Cog):
         else:
             await ctx.send(f"Cannot delete sticker.\nEither sticker doesn't exist or you are not the creator of the sticker.")
 
+    def name_pages(self, query, **kwargs):
+        return utils.StreamPaginator(
+            lambda skip: self.sticker_list.find(query, projection={"_id": False, "name": True}, sort=[("name", 1)], skip=skip),
+            10,
+            total=lambda: self.sticker_list.count_documents(query),
+            transform=lambda x: x["name"],
+            description=lambda i, x: f"`{i+1}.` {x}",
+            **kwargs
+        )
+
     @modding.help(brief="Display all stickers by a user", category="Tag & sticker", field="Commands", paragraph=1)
     @sticker.command(name="list")
     async def cmd_sticker_list(self, ctx, user: discord.User=None):
@@ -117,14 +122,12 @@ class Sticker(commands.Cog):
             If no user is provided, get all stickers you created.
         '''
         target = user or ctx.author
-        sticker_names = await self.sticker_list.distinct("name", {"author_id": target.id})
-        if sticker_names:
-            paging = utils.Paginator(
-                sticker_names, 10,
-                title=f"All stickers by {target.display_name}",
-                description=lambda i, x: f"`{i+1}.` {x}",
-                colour=discord.Colour.green()
-            )
+        paging = self.name_pages(
+            {"author_id": target.id},
+            title=f"All stickers by {target.display_name}",
+            colour=discord.Colour.green()
+        )
+        if await paging.prefetch():
             await paging.navigate(ctx)
         else:
             await ctx.send("You haven't created any sticker.")
@@ -136,9 +139,9 @@ class Sticker(commands.Cog):
             `>>sticker find <name>`
             Find stickers by name.
         '''
-        sticker_names = await self.sticker_list.distinct("name", {})
-        relevant = process.extract(name, sticker_names, limit=10)
-        text = "\n".join((f"{r[0]} ({r[1]}%)" for r in relevant if r[1]>50))
+        sticker_names = await self.bot.search_indexes.name_list("sticker_list")
+        relevant = sticker_names.extract(name, limit=10, cutoff=50)
+        text = "\n".join((f"{r[0]} ({r[1]:.0f}%)" for r in relevant))
         await ctx.send(embed=discord.Embed(title="Result:", description=text, colour=discord.Colour.green()))
 
     @modding.help(brief="Ban a sticker in current server", category="Tag & sticker", field="Commands", paragraph=1)
@@ -178,13 +181,11 @@ class Sticker(commands.Cog):
             `>>sticker banlist`
             Display current guild's sticker ban list.
         '''
-        banned_stickers = await self.sticker_list.distinct("name", {"banned_guilds": ctx.guild.id})
-        if banned_stickers:
-            paging = utils.Paginator(
-                banned_stickers, 10,
-                title="Banned stickers for this server",
-                description=lambda i, x: f"`{i+1}.` {x}"
-            )
+        paging = self.name_pages(
+            {"banned_guilds": ctx.guild.id},
+            title="Banned stickers for this server"
+        )
+        if await paging.prefetch():
             await paging.navigate(ctx)
         else:
             await ctx.send("This server has no banned sticker.")
@@ -239,7 +240,7 @@ class Sticker(commands.Cog):
                 embed.description = "Banned in this server."
             embed.add_field(name="Name", value=f"[{name}]({data['url']})", inline=False)
             embed.add_field(name="Author", value=f"<@{data['author_id']}>")
-            embed.add_field(name="Uses", value=data.get("uses", 0))
+            embed.add_field(name="Uses", value=data.get("uses", 0)+self.bot.counters.pending("sticker_list", {"name": name}, "uses"))
             await ctx.send(embed=embed)
         else:
             await ctx.send(f"Can't find sticker with name {name}.")
@@ -2,27 +2,26 @@ import discord
 from discord.ext import commands
 from . import utils
 from .utils import checks, modding
-from rapidfuzz import process
 
 #==================================================================================================================================================
 
 class Tag(commands.Cog):
+    db_indexes = {"tag_list": [[("guild_id", 1), ("name", 1)], [("guild_id", 1), ("author_id", 1), ("name", 1)]]}
+
     def __init__(self, bot):
         self.bot = bot
         self.tag_list = bot.db.tag_list
 
     async def get_tag(self, name, guild, *, update=False):
-        if update:
-            tag = await self.tag_list.find_one_and_update({"guild_id": guild.id, "name": name}, {"$inc": {"uses": 1}})
-        else:
-            tag = await self.tag_list.find_one({"guild_id": guild.id, "name": name})
+        tag = await self.tag_list.find_one({"guild_id": guild.id, "name": name})
         if tag:
+            if update:
+                self.bot.counters.increment("tag_list", {"guild_id": guild.id, "name": name}, "uses")
             alias_of = tag.get("alias_of", None)
             if alias_of:
-                if update:
-                    tag = await self.tag_list.find_one_and_update({"guild_id": guild.id, "name": alias_of}, {"$inc": {"uses": 1}})
-                else:
-                    tag = await self.tag_list.find_one({"guild_id": guild.id, "name": alias_of})
+                tag = await self.tag_list.find_one({"guild_id": guild.id, "name": alias_of})
+                if tag and update:
+                    self.bot.counters.increment("tag_list", {"guild_id": guild.id, "name": alias_of}, "uses")
         return tag
 
     @modding.help(brief="Get tag with given name", category="Tag & sticker", field="Commands", paragraph=0)
@@ -35,7 +34,12 @@ class Tag(commands.Cog):
         '''
         tag = await self.get_tag(name, ctx.guild, update=True)
         if tag is None:
-            await ctx.send(f"Cannot find tag {name} in database.")
+            tag_names = await self.bot.search_indexes.name_list("tag_list", query={"guild_id": ctx.guild.id})
+            relevant = tag_names.extract(name, limit=3)
+            if relevant:
+                await ctx.send(f"Cannot find tag {name} in database. Did you mean: {', '.join(r[0] for r in relevant)}?")
+            else:
+                await ctx.send(f"Cannot find tag {name} in database.")
         else:
             await ctx.send(tag["content"])
 
@@ -128,11 +132,21 @@ class Tag(commands.Cog):
             `>>tag find <name>`
             Find tags with given name.
         '''
-        tag_names = await self.tag_list.distinct("name", {"guild_id": ctx.guild.id})
-        relevant = process.extract(name, tag_names, limit=10)
-        text = "\n".join((f"{r[0]} ({r[1]}%)" for r in relevant if r[1]>50))
+        tag_names = await self.bot.search_indexes.name_list("tag_list", query={"guild_id": ctx.guild.id})
+        relevant = tag_names.extract(name, limit=10, cutoff=50)
+        text = "\n".join((f"{r[0]} ({r[1]:.0f}%)" for r in relevant))
         await ctx.send(f"Result:\n```\n{text}\n```")
 
+    def name_pages(self, query, **kwargs):
+        kwargs.setdefault("total", lambda: self.tag_list.count_documents(query))
+        return utils.StreamPaginator(
+            lambda skip: self.tag_list.find(query, projection={"_id": False, "name": True}, sort=[("name", 1)], skip=skip),
+            10,
+            transform=lambda x: x["name"],
+            description=lambda i, x: f"`{i+1}.` {x}",
+            **kwargs
+        )
+
     @modding.help(brief="Display all tags in current server", category="Tag & sticker", field="Commands", paragraph=0)
     @tag_cmd.command(name="all")
     @checks.guild_only()
@@ -141,17 +155,18 @@ class Tag(commands.Cog):
             `>>tag all`
             Display current server's all tags.
         '''
-        tags = await self.tag_list.distinct("name", {"guild_id": ctx.guild.id})
-        if tags:
-            paging = utils.Paginator(
-                tags, 10,
-                title=f"All ({len(tags)}) tags for this server",
-                description=lambda i, x: f"`{i+1}.` {x}",
-                colour=discord.Colour.blue()
-            )
-            await paging.navigate(ctx)
-        else:
-            await ctx.send("This server has no tag.")
+        query = {"guild_id": ctx.guild.id}
+        #the title shows it, so count once up front, cheap on the guild_id index
+        count = await self.tag_list.count_documents(query)
+        if count == 0:
+            return await ctx.send("This server has no tag.")
+        paging = self.name_pages(
+            query,
+            total=count,
+            title=f"All ({count}) tags for this server",
+            colour=discord.Colour.blue()
+        )
+        await paging.navigate(ctx)
 
     @modding.help(brief="Display all tags by member", category="Tag & sticker", field="Commands", paragraph=0)
     @tag_cmd.command(name="list")
@@ -163,14 +178,12 @@ class Tag(commands.Cog):
             If no member is provided, get all stickers you created.
         '''
         target = member or ctx.author
-        tag_names = await self.tag_list.distinct("name", {"guild_id": ctx.guild.id, "author_id": target.id})
-        if tag_names:
-            paging = utils.Paginator(
-                tag_names, 10,
-                title=f"All tags by {target.display_name}",
-                description=lambda i, x: f"`{i+1}.` {x}",
-                colour=discord.Colour.blue()
-            )
+        paging = self.name_pages(
+            {"guild_id": ctx.guild.id, "author_id": target.id},
+            title=f"All tags by {target.display_name}",
+            colour=discord.Colour.blue()
+        )
+        if await paging.prefetch():
             await paging.navigate(ctx)
         else:
             await ctx.send("You haven't created any tag.")
@@ -192,7 +205,7 @@ class Tag(commands.Cog):
             if original:
                 embed.add_field(name="Alias of", value=original)
             else:
-                embed.add_field(name="Uses", value=data.get("uses", 0))
+                embed.add_field(name="Uses", value=data.get("uses", 0)+self.bot.counters.pending("tag_list", {"guild_id": ctx.guild.id, "name": name}, "uses"))
             await ctx.send(embed=embed)
         else:
             await ctx.send(f"Can't find tag with name {name}.")
@@ -2,4 +2,4 @@ from .string_utils import *
 from .request import *
 from .image_processing import *
 from .data_type import get_element, to_int, circle_iter
-from .paginator import Paginator, EVERYONE, try_it
+from .paginator import Paginator, StreamPaginator, EVERYONE, try_it
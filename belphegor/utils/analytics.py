@@ -0,0 +1,149 @@
+from datetime import datetime, timezone
+import collections
+import pymongo
+import time
+
+#==================================================================================================================================================
+
+HOURLY_COLLECTION = "command_usage_hourly"
+TOTAL_COLLECTION = "command_usage_total"
+#hourly documents are kept a week by a TTL index, only the last day is read back
+HOURLY_RETENTION = 168
+
+#==================================================================================================================================================
+
+def _expire_at(hour):
+    return datetime.fromtimestamp((hour + HOURLY_RETENTION + 1) * 3600, timezone.utc)
+
+#==================================================================================================================================================
+
+class TopK:
+    '''
+        Exact counts with the k largest kept in order, each increment moves one entry by local swaps instead of a full sort.
+    '''
+
+    def __init__(self, k=50, counts=None):
+        self.k = k
+        self.counts = dict(counts or {})
+        self.total = sum(self.counts.values())
+        self.top = sorted(self.counts, key=self.counts.__getitem__, reverse=True)[:k]
+        self.positions = {name: i for i, name in enumerate(self.top)}
+
+    def add(self, name, amount=1):
+        counts = self.counts
+        value = counts.get(name, 0) + amount
+        counts[name] = value
+        self.total += amount
+
+        top = self.top
+        positions = self.positions
+        i = positions.get(name)
+        if i is None:
+            if len(top) < self.k:
+                i = len(top)
+                top.append(name)
+            elif value > counts[top[-1]]:
+                del positions[top[-1]]
+                i = len(top) - 1
+                top[i] = name
+            else:
+                return
+            positions[name] = i
+        while i > 0 and counts[top[i-1]] < value:
+            top[i-1], top[i] = name, top[i-1]
+            positions[top[i]] = i
+            i -= 1
+        positions[name] = i
+
+    def most_common(self, n=None):
+        counts = self.counts
+        return [(name, counts[name]) for name in self.top[:n]]
+
+#==================================================================================================================================================
+
+class CommandAnalytics:
+    '''
+        Command invocations bucketed per minute (last hour) and per hour (last day) in memory, by guild then command.
+        Hourly and all time counts are written behind through the bot counter buffer, so windowed queries only merge buckets.
+    '''
+
+    db_indexes = {
+        HOURLY_COLLECTION: [[("hour", 1), ("guild_id", 1), ("command", 1)], {"keys": "expire_at", "expireAfterSeconds": 0}],
+        TOTAL_COLLECTION: ["command"]
+    }
+
+    def __init__(self, db, counters, *, top_k=50):
+        self.db = db
+        self.counters = counters
+        self.totals = TopK(top_k)
+        self.minutes = collections.deque(maxlen=60)
+        self.hours = collections.deque(maxlen=24)
+
+    async def load(self):
+        counts = {}
+        async for doc in self.db[TOTAL_COLLECTION].find({}, projection={"_id": False, "command": True, "count": True}):
+            counts[doc["command"]] = doc["count"]
+        self.totals = TopK(self.totals.k, counts)
+
+        current = int(time.time() // 3600)
+        await self.stamp_expiry(current)
+        hours = {}
+        async for doc in self.db[HOURLY_COLLECTION].find({"hour": {"$gt": current-24}}, projection={"_id": False}):
+            bucket = hours.setdefault(doc["hour"], {})
+            guild_counter = bucket.setdefault(doc["guild_id"], collections.Counter())
+            guild_counter[doc["command"]] += doc["count"]
+        self.hours.clear()
+        for hour in sorted(hours):
+            self.hours.append((hour, hours[hour]))
+
+    async def stamp_expiry(self, current):
+        #hourly documents written before the TTL index have no expire_at, old ones go now and the rest get stamped per hour
+        collection = self.db[HOURLY_COLLECTION]
+        await collection.delete_many({"hour": {"$lte": current-HOURLY_RETENTION}, "expire_at": None})
+        hours = await collection.distinct("hour", {"expire_at": None})
+        if hours:
+            await collection.bulk_write([pymongo.UpdateMany({"hour": h, "expire_at": None}, {"$set": {"expire_at": _expire_at(h)}}) for h in hours], ordered=False)
+
+    def _bucket(self, buckets, mark):
+        if buckets and buckets[-1][0] == mark:
+            return buckets[-1][1]
+        else:
+            bucket = {}
+            buckets.append((mark, bucket))
+            return bucket
+
+    def record(self, command, guild_id):
+        minute = int(time.time() // 60)
+        hour = minute // 60
+        for buckets, mark in ((self.minutes, minute), (self.hours, hour)):
+            bucket = self._bucket(buckets, mark)
+            try:
+                bucket[guild_id][command] += 1
+            except KeyError:
+                bucket[guild_id] = collections.Counter((command,))
+
+        self.totals.add(command)
+        self.counters.increment(HOURLY_COLLECTION, {"hour": hour, "guild_id": guild_id, "command": command}, "count", upsert=True, on_insert={"expire_at": _expire_at(hour)})
+        self.counters.increment(TOTAL_COLLECTION, {"command": command}, "count", upsert=True)
+
+    def top(self, n=None):
+        return self.totals.most_common(n)
+
+    def top_recent(self, n=None, *, guild_id=None, minutes=None, hours=24):
+        if minutes is not None:
+            buckets, cutoff = self.minutes, int(time.time() // 60) - minutes
+        else:
+            buckets, cutoff = self.hours, int(time.time() // 3600) - hours
+
+        result = collections.Counter()
+        for mark, bucket in reversed(buckets):
+            if mark <= cutoff:
+                break
+            if guild_id is None:
+                for counter in bucket.values():
+                    result.update(counter)
+            else:
+                counter = bucket.get(guild_id)
+                if counter:
+                    result.update(counter)
+        return result.most_common(n)
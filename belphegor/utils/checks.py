@@ -1,6 +1,7 @@
 from discord.ext import commands
 from . import config
 import asyncio
+import time
 
 #==================================================================================================================================================
 
@@ -30,6 +31,56 @@ class CustomError(commands.CommandError):
 
 #==================================================================================================================================================
 
+class CommandPolicy:
+    __slots__ = ("_bot_guild", "_bot_channels", "_bot_members", "_command_guild", "_command_channels", "_command_members", "checked", "denied", "check_time")
+
+    def __init__(self, disabled_data, *, previous=None):
+        #bot-level and command-level rules stay apart so deny_reason checks them in the same order block_or_not always did
+        self._bot_guild = disabled_data.get("disabled_bot_guild", False)
+        self._bot_channels = frozenset(disabled_data.get("disabled_bot_channel", ()))
+        self._bot_members = frozenset(disabled_data.get("disabled_bot_member", ()))
+        self._command_guild = frozenset(disabled_data.get("disabled_command_guild", ()))
+        self._command_channels = frozenset(disabled_data.get("disabled_command_channel", ()))
+        self._command_members = frozenset(disabled_data.get("disabled_command_member", ()))
+
+        if previous:
+            self.checked = previous.checked
+            self.denied = previous.denied
+            self.check_time = previous.check_time
+        else:
+            self.checked = 0
+            self.denied = 0
+            self.check_time = 0
+
+    def __bool__(self):
+        return bool(self._bot_guild or self._bot_channels or self._bot_members or self._command_guild or self._command_channels or self._command_members)
+
+    def _reason(self, cmd_name, channel_id, author_id):
+        if self._bot_guild:
+            return "Command usage is disabled in this server."
+        if channel_id in self._bot_channels:
+            return "Command usage is disabled in this channel."
+        if author_id in self._bot_members:
+            return "You are forbidden from using bot commands in this server."
+        if cmd_name in self._command_guild:
+            return "This command is disabled in this server."
+        if (cmd_name, channel_id) in self._command_channels:
+            return "This command is disabled in this channel."
+        if (cmd_name, author_id) in self._command_members:
+            return "You are forbidden from using this command in this server."
+        return None
+
+    def deny_reason(self, cmd_name, channel_id, author_id):
+        start = time.perf_counter_ns()
+        reason = self._reason(cmd_name, channel_id, author_id)
+        self.checked += 1
+        if reason:
+            self.denied += 1
+        self.check_time += time.perf_counter_ns() - start
+        return reason
+
+#==================================================================================================================================================
+
 def owner_only():
     def check_owner_only(ctx):
         if ctx.author.id==config.OWNER_ID:
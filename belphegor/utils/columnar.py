@@ -0,0 +1,276 @@
+import numpy as np
+import copy
+import re
+
+#==================================================================================================================================================
+
+SEPARATOR = ".*?"
+NUMBER_TYPES = (int, float)
+COMPARE = {
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+    "$eq": np.equal
+}
+PY_COMPARE = {
+    "$gt": lambda a, b: a > b,
+    "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b,
+    "$lte": lambda a, b: a <= b,
+    "$eq": lambda a, b: a == b
+}
+
+#==================================================================================================================================================
+
+class UnsupportedQuery(Exception):
+    pass
+
+#==================================================================================================================================================
+
+def _collect(value, parts, out):
+    #mongo path semantics: arrays are traversed, and an array leaf matches by itself or by any element
+    if not parts:
+        out.append(value)
+        if isinstance(value, list):
+            out.extend(value)
+    elif isinstance(value, dict):
+        if parts[0] in value:
+            _collect(value[parts[0]], parts[1:], out)
+    elif isinstance(value, list):
+        if parts[0].isdigit():
+            i = int(parts[0])
+            if i < len(value):
+                _collect(value[i], parts[1:], out)
+        for v in value:
+            if isinstance(v, dict):
+                _collect(v, parts, out)
+
+def _is_number(value):
+    return isinstance(value, NUMBER_TYPES) and not isinstance(value, bool)
+
+def _same_type(a, b):
+    return (_is_number(a) and _is_number(b)) or (isinstance(a, str) and isinstance(b, str))
+
+def _plain_word(pattern):
+    #the filter commands build patterns as escaped words joined by .*?, a single word is a plain substring test
+    if SEPARATOR in pattern:
+        return None
+    word = re.sub(r"\\(.)", r"\1", pattern)
+    if re.escape(word) != pattern:
+        return None
+    return word
+
+def _sort_key(value):
+    if value is None:
+        return (0, 0)
+    elif _is_number(value):
+        return (1, value)
+    elif isinstance(value, str):
+        return (2, value)
+    else:
+        raise UnsupportedQuery(f"Can't sort by {type(value).__name__}")
+
+#==================================================================================================================================================
+
+class ColumnarTable:
+    '''
+        Column snapshot of a list of documents. Supports the subset of mongo find used by the filter commands:
+        $and/$or, equality, $gt/$gte/$lt/$lte/$eq, $in, $exists, $regex with i option, $all and $elemMatch.
+        Scalar numeric and text columns are numpy arrays so comparisons and single word regexes are vectorized,
+        $elemMatch runs on a table of the array elements and is folded back to documents by owner index.
+        Anything else raises UnsupportedQuery so the caller can ask mongo instead.
+    '''
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.size = len(docs)
+        self.leaves = {}
+        self.numbers = {}
+        self.texts = {}
+        self.elements = {}
+
+    def get_leaves(self, path):
+        leaves = self.leaves.get(path)
+        if leaves is None:
+            parts = path.split(".")
+            leaves = []
+            for doc in self.docs:
+                out = []
+                _collect(doc, parts, out)
+                leaves.append(out)
+            self.leaves[path] = leaves
+        return leaves
+
+    def get_numbers(self, path):
+        #float column with nan for missing, or None if some document holds an array or a non number there
+        try:
+            return self.numbers[path]
+        except KeyError:
+            pass
+        column = np.full(self.size, np.nan)
+        for i, leaves in enumerate(self.get_leaves(path)):
+            if len(leaves) == 1 and _is_number(leaves[0]):
+                column[i] = leaves[0]
+            elif leaves and leaves != [None]:
+                column = None
+                break
+        self.numbers[path] = column
+        return column
+
+    def get_texts(self, path):
+        #lowercased string column and presence mask, or None if some document holds an array or a non string there
+        try:
+            return self.texts[path]
+        except KeyError:
+            pass
+        values = []
+        present = np.zeros(self.size, dtype=bool)
+        result = None
+        for i, leaves in enumerate(self.get_leaves(path)):
+            if len(leaves) == 1 and isinstance(leaves[0], str):
+                values.append(leaves[0].lower())
+                present[i] = True
+            elif leaves and leaves != [None]:
+                break
+            else:
+                values.append("")
+        else:
+            result = (np.array(values, dtype=str) if values else np.array([], dtype=str), present)
+        self.texts[path] = result
+        return result
+
+    def get_elements(self, path):
+        try:
+            return self.elements[path]
+        except KeyError:
+            pass
+        parts = path.split(".")
+        owners = []
+        elements = []
+        for i, doc in enumerate(self.docs):
+            out = []
+            _collect(doc, parts, out)
+            if out and isinstance(out[0], list):
+                for element in out[0]:
+                    owners.append(i)
+                    elements.append(element if isinstance(element, dict) else {"": element})
+        result = (np.array(owners, dtype=np.intp), ColumnarTable(elements))
+        self.elements[path] = result
+        return result
+
+    def _python_mask(self, path, predicate):
+        return np.fromiter((any(predicate(v) for v in leaves) for leaves in self.get_leaves(path)), dtype=bool, count=self.size)
+
+    def mask(self, query):
+        if not isinstance(query, dict):
+            raise UnsupportedQuery(f"Query must be a dict, not {type(query).__name__}")
+        result = np.ones(self.size, dtype=bool)
+        for key, value in query.items():
+            if key == "$and":
+                for q in value:
+                    result &= self.mask(q)
+            elif key == "$or":
+                m = np.zeros(self.size, dtype=bool)
+                for q in value:
+                    m |= self.mask(q)
+                result &= m
+            elif key.startswith("$"):
+                raise UnsupportedQuery(f"Unsupported operator {key}")
+            else:
+                result &= self.field_mask(key, value)
+        return result
+
+    def field_mask(self, path, condition):
+        if not (isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition)):
+            return self.equal_mask(path, condition)
+
+        result = np.ones(self.size, dtype=bool)
+        options = condition.get("$options", "")
+        for op, value in condition.items():
+            if op == "$options":
+                continue
+            elif op == "$regex":
+                result &= self.regex_mask(path, value, options)
+            elif op in COMPARE:
+                result &= self.compare_mask(path, op, value)
+            elif op == "$in":
+                m = np.zeros(self.size, dtype=bool)
+                for v in value:
+                    m |= self.equal_mask(path, v)
+                result &= m
+            elif op == "$exists":
+                m = np.fromiter((bool(leaves) for leaves in self.get_leaves(path)), dtype=bool, count=self.size)
+                result &= m if value else ~m
+            elif op == "$elemMatch":
+                result &= self.elem_match_mask(path, value)
+            elif op == "$all":
+                for item in value:
+                    if isinstance(item, dict) and "$elemMatch" in item:
+                        result &= self.elem_match_mask(path, item["$elemMatch"])
+                    else:
+                        result &= self.equal_mask(path, item)
+            else:
+                raise UnsupportedQuery(f"Unsupported operator {op}")
+        return result
+
+    def equal_mask(self, path, value):
+        if value is None:
+            raise UnsupportedQuery("Null equality also matches missing fields")
+        elif _is_number(value):
+            return self.compare_mask(path, "$eq", value)
+        elif isinstance(value, (dict, list)):
+            return self._python_mask(path, lambda v: v == value)
+        else:
+            return self._python_mask(path, lambda v: v == value and type(v) is type(value))
+
+    def compare_mask(self, path, op, value):
+        if _is_number(value):
+            column = self.get_numbers(path)
+            if column is not None:
+                return COMPARE[op](column, value)
+        elif not isinstance(value, str):
+            raise UnsupportedQuery(f"Can't compare with {type(value).__name__}")
+        compare = PY_COMPARE[op]
+        return self._python_mask(path, lambda v: _same_type(v, value) and compare(v, value))
+
+    def regex_mask(self, path, pattern, options):
+        if not isinstance(pattern, str) or set(options) - {"i"}:
+            raise UnsupportedQuery("Unsupported regex")
+        ignore_case = "i" in options
+        word = _plain_word(pattern) if ignore_case else None
+        if word is not None:
+            texts = self.get_texts(path)
+            if texts is not None:
+                values, present = texts
+                if not self.size:
+                    return present
+                return present & (np.char.find(values, word.lower()) >= 0)
+        regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        return self._python_mask(path, lambda v: isinstance(v, str) and regex.search(v) is not None)
+
+    def elem_match_mask(self, path, query):
+        owners, table = self.get_elements(path)
+        result = np.zeros(self.size, dtype=bool)
+        if table.size:
+            result[owners[table.mask(query)]] = True
+        return result
+
+    def find(self, query, projection=None, sort=None):
+        positions = np.flatnonzero(self.mask(query))
+        docs = [self.docs[p] for p in positions]
+        for key, direction in reversed(sort or []):
+            docs.sort(key=lambda d: _sort_key(d.get(key)), reverse=direction < 0)
+
+        if projection:
+            include = {k for k, v in projection.items() if v and k != "_id"}
+            keep_id = projection.get("_id", True)
+            if include:
+                include = {k.partition(".")[0] for k in include}
+                if keep_id:
+                    include.add("_id")
+                return [{k: copy.deepcopy(v) for k, v in d.items() if k in include} for d in docs]
+            else:
+                exclude = {k for k, v in projection.items() if not v}
+                return [{k: copy.deepcopy(v) for k, v in d.items() if k not in exclude} for d in docs]
+        return [copy.deepcopy(d) for d in docs]
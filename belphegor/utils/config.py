@@ -16,6 +16,35 @@ DATA_PATH = "data"
 
 NO_IMG = "http://i.imgur.com/62di8EB.jpg"
 
+TASK_LIMITS = {
+    "delayed_delete": 500,
+    "reaction_cleanup": 1000,
+    "message_handler": 500
+}
+
+CPU_SCHEDULER = {
+    "workers": 2,
+    #process=True jobs, 0 runs them on the worker threads instead
+    "processes": 2,
+    "max_queue": 50,
+    "max_per_user": 3,
+    "guild_share": 4,
+    "timeout": 60
+}
+
+METRICS_DUMP_PATH = f"{DATA_PATH}/metrics.txt"
+METRICS_DUMP_INTERVAL = 60
+
+EXTENSION_MANIFEST_PATH = f"{DATA_PATH}/extension_manifest.json"
+
+SNAPSHOT_PATH = f"{DATA_PATH}/snapshot.pickle"
+SNAPSHOT_MAX_AGE = 300
+
+COUNTER_FLUSH_INTERVAL = 10
+COUNTER_MAX_PENDING = 500
+
+SEARCH_CACHE_SIZE = 1000
+
 all_extensions = [
     "belphegor.override",
     "belphegor.admin",
@@ -36,3 +65,10 @@ all_extensions = [
     "belphegor.calculator",
     "belphegor.dbots"
 ]
+
+#rarely used, imported on first invoke once their commands are known from the manifest
+lazy_extensions = [
+    "belphegor.image",
+    "belphegor.game",
+    "belphegor.calculator"
+]
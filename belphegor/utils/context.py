@@ -2,6 +2,7 @@ import discord
 from discord.ext import commands
 from . import checks, string_utils as belfmt, paginator, data_type
 import asyncio
+import copy
 import re
 import time
 import json
@@ -16,6 +17,17 @@ def _insert_spaces(attrs):
         yield " "
         yield f"${a}"
 
+async def _iterate(items):
+    for item in items:
+        yield copy.deepcopy(item)
+
+async def _record(cursor, callback):
+    docs = []
+    async for item in cursor:
+        docs.append(item)
+        yield copy.deepcopy(item)
+    callback(docs)
+
 #==================================================================================================================================================
 
 class BelphegorContext(commands.Context):
@@ -34,12 +46,12 @@ class BelphegorContext(commands.Context):
         await self.message.add_reaction("\u274c")
 
     async def yes_no_prompt(self, sentences, *, timeout=60, target=None, delete_mode=False):
-        _loop = self.bot.loop
+        create_task = self.bot.create_task
         message = await self.send(sentences["initial"])
         target = target or self.author
         possible_reactions = ("\u2705", "\u274c")
         for r in possible_reactions:
-            _loop.create_task(message.add_reaction(r))
+            create_task(message.add_reaction(r), category="reaction_add")
         try:
             reaction, user = await self.bot.wait_for(
                 "reaction_add",
@@ -49,35 +61,102 @@ class BelphegorContext(commands.Context):
         except:
             result = None
             if not delete_mode:
-                _loop.create_task(message.edit(content=sentences["timeout"]))
+                create_task(message.edit(content=sentences["timeout"]), category="message_edit")
         else:
             if reaction.emoji == "\u2705":
                 result = True
                 if not delete_mode:
-                    _loop.create_task(message.edit(content=sentences["yes"]))
+                    create_task(message.edit(content=sentences["yes"]), category="message_edit")
             else:
                 result = False
                 if not delete_mode:
-                    _loop.create_task(message.edit(content=sentences["no"]))
+                    create_task(message.edit(content=sentences["no"]), category="message_edit")
         if delete_mode:
-            _loop.create_task(message.delete())
+            create_task(message.delete(), category="message_delete")
         else:
-            _loop.create_task(paginator.try_it(message.clear_reactions()))
+            self.bot.create_task(paginator.try_it(message.clear_reactions()), category="reaction_cleanup")
         return result
 
     async def search(self, name, pool, *, cls=data_type.BaseObject, colour=None, atts=[], aliases_att=None, index_att=None, name_att, emoji_att=None, prompt=None, sort={}):
+        search_index = self.bot.search_indexes.get(pool.name)
         if index_att:
             try:
                 item_id = int(name)
             except ValueError:
                 pass
             else:
-                result = await pool.find_one({index_att: item_id})
+                if search_index:
+                    result = search_index.find_one(index_att, item_id)
+                else:
+                    result = await pool.find_one({index_att: item_id})
                 if result:
                     return cls(result)
                 else:
                     raise checks.CustomError(f"Can't find {name} in database.")
 
+        search_indexes = self.bot.search_indexes
+        key = (pool.name, " ".join(name.lower().split()), tuple(atts), aliases_att, repr(sort))
+        version = search_indexes.version(pool.name)
+        found = search_indexes.cached_result(key)
+        if found is None and search_index:
+            found = search_index.search(name, atts=atts, aliases_att=aliases_att, sort=sort)
+            search_indexes.cache_result(key, version, found)
+        if found is not None:
+            cursor = _iterate(found)
+            total = len(found)
+        else:
+            cursor = _record(
+                self._search_cursor(name, pool, atts=atts, aliases_att=aliases_att, sort=sort),
+                lambda docs: search_indexes.cache_result(key, version, docs)
+            )
+            total = lambda: self._search_count(name, pool, atts=atts, aliases_att=aliases_att)
+        if prompt is False:
+            lower_name = name.lower()
+            async for item_data in cursor:
+                if lower_name in (item_data.get(att, "").lower() for att in atts):
+                    break
+            try:
+                return cls(item_data)
+            except:
+                raise checks.CustomError(f"Can't find {name} in database.")
+        else:
+            emojis = self.cog.emojis
+            description = lambda i, x: f"`{i+1}:` {emojis.get(getattr(x, emoji_att), '') if emoji_att else ''}{getattr(x, name_att)}"
+            paging = paginator.StreamPaginator(
+                cursor, 10,
+                total=total,
+                transform=cls,
+                title="Do you mean:",
+                description=description,
+                colour=colour
+            )
+            result = await paging.prefetch()
+            if not result:
+                if search_index:
+                    fuzzy = search_index.fuzzy(name, atts=atts, aliases_att=aliases_att)
+                    result = [cls(item_data) for item_data, score in fuzzy]
+                    scores = [score for item_data, score in fuzzy]
+                if not result:
+                    raise checks.CustomError(f"Can't find {name} in database.")
+                paging = paginator.StreamPaginator(
+                    result, 10,
+                    total=len(result),
+                    title=f"Can't find {name}, do you mean:",
+                    description=lambda i, x: f"{description(i, x)} ({scores[i]:.0f}%)",
+                    colour=colour
+                )
+            elif paging.get_item_amount() == 1 and not prompt:
+                return result[0]
+
+            t = self.bot.create_task(paging.navigate(self), category="paginator")
+            index = await self.wait_for_choice()
+            t.cancel()
+            if index is None:
+                return None
+            else:
+                return await paging.get_item(index-1)
+
+    def _search_pipeline(self, name, *, atts, aliases_att):
         match_query = {
             "$and": [
                 {
@@ -101,7 +180,7 @@ class BelphegorContext(commands.Context):
                 ]
             }
 
-        pipeline = [
+        return [
             {
                 "$addFields": {
                     "all_att_concat": {
@@ -113,6 +192,9 @@ class BelphegorContext(commands.Context):
                 "$match": match_query
             }
         ]
+
+    def _search_cursor(self, name, pool, *, atts, aliases_att, sort):
+        pipeline = self._search_pipeline(name, atts=atts, aliases_att=aliases_att)
         if sort:
             add_fields = {}
             sort_order = {}
@@ -126,39 +208,16 @@ class BelphegorContext(commands.Context):
             if add_fields:
                 pipeline.append({"$addFields": add_fields})
             pipeline.append({"$sort": sort_order})
-        cursor = pool.aggregate(pipeline)
-        if prompt is False:
-            lower_name = name.lower()
-            async for item_data in cursor:
-                if lower_name in (item_data.get(att, "").lower() for att in atts):
-                    break
-            try:
-                return cls(item_data)
-            except:
-                raise checks.CustomError(f"Can't find {name} in database.")
-        else:
-            result = [cls(item_data) async for item_data in cursor]
-            if not result:
-                raise checks.CustomError(f"Can't find {name} in database.")
-            elif len(result) == 1 and not prompt:
-                return result[0]
-            emojis = self.cog.emojis
+        return pool.aggregate(pipeline)
 
-            paging = paginator.Paginator(
-                result, 10,
-                title="Do you mean:",
-                description=lambda i, x: f"`{i+1}:` {emojis.get(getattr(x, emoji_att), '') if emoji_att else ''}{getattr(x, name_att)}",
-                colour=colour
-            )
-            t = self.bot.loop.create_task(paging.navigate(self))
-            index = await self.wait_for_choice(max=len(result))
-            t.cancel()
-            if index is None:
-                return None
-            else:
-                return result[index-1]
+    async def _search_count(self, name, pool, *, atts, aliases_att):
+        pipeline = self._search_pipeline(name, atts=atts, aliases_att=aliases_att)
+        pipeline.append({"$count": "total"})
+        async for doc in pool.aggregate(pipeline):
+            return doc["total"]
+        return 0
 
-    async def wait_for_choice(self, *, max, target=None, timeout=600):
+    async def wait_for_choice(self, *, max=None, target=None, timeout=600):
         target = target or self.author
         try:
             msg = await self.bot.wait_for("message", check=lambda m: m.author.id==target.id and m.channel.id==self.channel.id, timeout=timeout)
@@ -168,7 +227,7 @@ class BelphegorContext(commands.Context):
             result = int(msg.content.replace(f"<@{self.bot.user.id}>", "").replace(f"<@!{self.bot.user.id}>", "").strip())
         except:
             return None
-        if 0 < result <= max:
+        if 0 < result and (max is None or result <= max):
             return result
         else:
             return None
@@ -0,0 +1,131 @@
+import asyncio
+import pymongo
+import pymongo.errors
+import traceback
+
+#==================================================================================================================================================
+
+def _freeze(key):
+    return tuple(sorted(key.items()))
+
+#==================================================================================================================================================
+
+class CounterBuffer:
+    '''
+        Write-behind $inc. Increments are summed in memory per (collection, key, field) and written as one unordered bulk_write,
+        every interval seconds, as soon as max_pending documents are dirty, and on close.
+        Counters are eventually consistent, use pending() to add what has not been written yet when displaying them.
+        Flushes skip the database write hooks, search indexes and their cached results aren't dropped for a use count.
+        on_insert fields are written with $setOnInsert alongside a key's increments, e.g. an expire_at for a TTL index.
+    '''
+
+    def __init__(self, db, *, interval=10, max_pending=500):
+        self.db = db
+        self.interval = interval
+        self.max_pending = max_pending
+        self.pending_counts = {}
+        self.upsert_collections = set()
+        self.insert_fields = {}
+        self.dirty = 0
+        self.full = asyncio.Event()
+        self.flush_lock = asyncio.Lock()
+        self.increments = 0
+        self.flushes = 0
+        self.written = 0
+
+    def increment(self, collection, key, field, amount=1, *, upsert=False, on_insert=None):
+        self.increments += 1
+        if upsert:
+            self.upsert_collections.add(collection)
+        frozen = _freeze(key)
+        if on_insert:
+            self.insert_fields.setdefault(collection, {})[frozen] = on_insert
+        self._add(collection, frozen, field, amount)
+
+    def _add(self, collection, frozen, field, amount):
+        documents = self.pending_counts.setdefault(collection, {})
+        fields = documents.get(frozen)
+        if fields is None:
+            fields = documents[frozen] = {}
+            self.dirty += 1
+            if self.dirty >= self.max_pending:
+                self.full.set()
+        fields[field] = fields.get(field, 0) + amount
+
+    def pending(self, collection, key, field):
+        return self.pending_counts.get(collection, {}).get(_freeze(key), {}).get(field, 0)
+
+    def _merge(self, pending_counts):
+        for collection, documents in pending_counts.items():
+            for frozen, fields in documents.items():
+                for field, amount in fields.items():
+                    self._add(collection, frozen, field, amount)
+
+    def _update(self, fields, on_insert):
+        if on_insert:
+            return {"$inc": fields, "$setOnInsert": on_insert}
+        else:
+            return {"$inc": fields}
+
+    async def flush(self):
+        async with self.flush_lock:
+            pending_counts = self.pending_counts
+            if not pending_counts:
+                return 0
+            self.pending_counts = {}
+            self.dirty = 0
+            self.full.clear()
+
+            written = 0
+            try:
+                while pending_counts:
+                    collection, documents = next(iter(pending_counts.items()))
+                    upsert = collection in self.upsert_collections
+                    keys = list(documents)
+                    inserts = self.insert_fields.get(collection, {})
+                    reqs = [pymongo.UpdateOne(dict(frozen), self._update(documents[frozen], inserts.get(frozen)), upsert=upsert) for frozen in keys]
+                    try:
+                        await self.db[collection].counter_bulk_write(reqs, ordered=False)
+                    except pymongo.errors.BulkWriteError as e:
+                        #unordered, everything but the reported errors went through
+                        failed = {keys[error["index"]] for error in e.details.get("writeErrors", ())}
+                        print(f"Failed flushing {len(failed)}/{len(reqs)} counters of {collection}: {e}")
+                        self._merge({collection: {frozen: documents[frozen] for frozen in failed}})
+                        written += len(reqs) - len(failed)
+                    except Exception:
+                        print(f"Failed flushing {len(reqs)} counters of {collection}:")
+                        traceback.print_exc()
+                        self._merge({collection: documents})
+                    else:
+                        written += len(reqs)
+                    del pending_counts[collection]
+                    #insert fields stay while their key is pending again, failed ones were merged back above
+                    if inserts:
+                        current = self.pending_counts.get(collection, {})
+                        for frozen in keys:
+                            if frozen not in current:
+                                inserts.pop(frozen, None)
+            except BaseException:
+                #cancelled mid flush, whatever has not been written goes back to the buffer
+                self._merge(pending_counts)
+                raise
+            finally:
+                self.flushes += 1
+                self.written += written
+            return written
+
+    async def flush_regularly(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.full.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def report(self):
+        return (
+            f"Increments:     {self.increments}\n"
+            f"Flushes:        {self.flushes}\n"
+            f"Docs written:   {self.written}\n"
+            f"Dirty now:      {self.dirty}"
+        )
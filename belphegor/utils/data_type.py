@@ -7,6 +7,7 @@ import copy
 import collections
 from datetime import datetime, timedelta
 import pytz
+from pymongo import ReturnDocument
 import itertools
 import time
 import json
@@ -174,3 +175,51 @@ class AutoCleanupDict:
 
     async def on_pop_item(self, key, value):
         pass
+
+#==================================================================================================================================================
+
+class DocumentCache:
+    def __init__(self, collection, key, *, projection={}, limit=1000):
+        self.collection = collection
+        self.key = key
+        self.projection = {"_id": False, **projection}
+        self.limit = limit
+        self.container = collections.OrderedDict()
+
+    def _put(self, key, document):
+        container = self.container
+        container[key] = document
+        container.move_to_end(key)
+        if len(container) > self.limit:
+            container.popitem(last=False)
+        return document
+
+    def peek(self, key, default=None):
+        return self.container.get(key, default)
+
+    async def get(self, key):
+        try:
+            document = self.container[key]
+        except KeyError:
+            document = await self.collection.find_one({self.key: key}, projection=self.projection)
+            return self._put(key, document or {})
+        else:
+            self.container.move_to_end(key)
+            return document
+
+    async def update_one(self, key, update, *, upsert=False):
+        document = await self.collection.find_one_and_update(
+            {self.key: key},
+            update,
+            projection=self.projection,
+            upsert=upsert,
+            return_document=ReturnDocument.AFTER
+        )
+        self._put(key, document or {})
+        return document
+
+    def invalidate(self, key=None):
+        if key is None:
+            self.container.clear()
+        else:
+            self.container.pop(key, None)
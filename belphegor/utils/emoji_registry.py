@@ -0,0 +1,64 @@
+import weakref
+
+#==================================================================================================================================================
+
+def _by_name(emojis):
+    #first emoji wins on duplicate names, same as discord.utils.find
+    index = {}
+    for emoji in emojis:
+        index.setdefault(emoji.name, emoji)
+    return index
+
+def _keyed(names):
+    #a name is filled under itself, a (key, name) pair under key, so aliases follow updates too
+    return tuple((n, n) if isinstance(n, str) else tuple(n) for n in names)
+
+#==================================================================================================================================================
+
+class EmojiRegistry:
+    '''
+        Name to emoji dict per guild, built on first lookup and replaced when the guild updates its emojis.
+        resolve() fills a cog's emoji dict and remembers it, so those names are resolved again on every update of that guild.
+        Names can be (key, name) pairs to store an emoji under another key.
+    '''
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.guilds = {}
+        self.subscribers = weakref.WeakKeyDictionary()
+
+    def get_index(self, guild_id):
+        index = self.guilds.get(guild_id)
+        if index is None:
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                return {}
+            index = self.guilds[guild_id] = _by_name(guild.emojis)
+        return index
+
+    def get(self, guild_id, name, default=None):
+        return self.get_index(guild_id).get(name, default)
+
+    def resolve(self, owner, guild_id, names, target=None):
+        if target is None:
+            target = {}
+        names = _keyed(names)
+        index = self.get_index(guild_id)
+        for key, name in names:
+            target[key] = index.get(name)
+        self.subscribers.setdefault(owner, []).append((guild_id, names, target))
+        return target
+
+    def update(self, guild, emojis):
+        index = self.guilds[guild.id] = _by_name(emojis)
+        for subscriptions in list(self.subscribers.values()):
+            for guild_id, names, target in subscriptions:
+                if guild_id == guild.id:
+                    for key, name in names:
+                        target[key] = index.get(name)
+
+    def unsubscribe(self, owner):
+        self.subscribers.pop(owner, None)
+
+    def drop(self, guild_id):
+        self.guilds.pop(guild_id, None)
@@ -423,7 +423,7 @@ def get_border(xy, epsilon=1):
 
 async def pie_chart(
     data, *, title=None, unit="counts", background=(255, 255, 255, 0), text_color=(255, 255, 255, 255),
-    outline=None, scale=1, aa=4, explode=None, outline_width=4, loop=None
+    outline=None, scale=1, aa=4, explode=None, outline_width=4, loop=None, ctx=None
 ):
     def drawing():
         number_of_fields = len(data)
@@ -486,12 +486,14 @@ async def pie_chart(
         bytes_io.seek(0)
         return bytes_io
 
+    if ctx:
+        return await ctx.bot.run_cpu(ctx, drawing)
     _loop = loop or asyncio.get_event_loop()
     return await _loop.run_in_executor(None, drawing)
 
 async def line_chart(
     data, *, title=None, unit_y="amount", unit_x="time", background=(255, 255, 255, 0), text_color=(255, 255, 255, 255),
-    axis_color=(150, 150, 150, 255), axis_text_color=(215, 215, 215, 255), scale=1, aa=4, loop=None
+    axis_color=(150, 150, 150, 255), axis_text_color=(215, 215, 215, 255), scale=1, aa=4, loop=None, ctx=None
 ):
     def drawing():
         number_of_fields = len(data)
@@ -552,12 +554,14 @@ async def line_chart(
         bytes_io.seek(0)
         return bytes_io
 
+    if ctx:
+        return await ctx.bot.run_cpu(ctx, drawing)
     _loop = loop or asyncio.get_event_loop()
     return await _loop.run_in_executor(None, drawing)
 
 async def stacked_area_chart(
     data, *, title=None, unit_y="amount", unit_x="time", background=(255, 255, 255, 0), text_color=(255, 255, 255, 255),
-    axis_color=(200, 200, 200, 255), axis_text_color=(235, 235, 235, 255), scale=1, aa=4, loop=None
+    axis_color=(200, 200, 200, 255), axis_text_color=(235, 235, 235, 255), scale=1, aa=4, loop=None, ctx=None
 ):
     def drawing():
         number_of_fields = len(data)
@@ -613,12 +617,14 @@ async def stacked_area_chart(
         bytes_io.seek(0)
         return bytes_io
 
+    if ctx:
+        return await ctx.bot.run_cpu(ctx, drawing)
     _loop = loop or asyncio.get_event_loop()
     return await _loop.run_in_executor(None, drawing)
 
 async def bar_chart(
     data, *, title=None, unit_y="amount", unit_x="time", background=(255, 255, 255, 0), text_color=(255, 255, 255, 255),
-    axis_color=(200, 200, 200, 255), axis_text_color=(235, 235, 235, 255), scale=1, aa=4, loop=None
+    axis_color=(200, 200, 200, 255), axis_text_color=(235, 235, 235, 255), scale=1, aa=4, loop=None, ctx=None
 ):
     def drawing():
         number_of_fields = len(data)
@@ -675,5 +681,7 @@ async def bar_chart(
         bytes_io.seek(0)
         return bytes_io
 
+    if ctx:
+        return await ctx.bot.run_cpu(ctx, drawing)
     _loop = loop or asyncio.get_event_loop()
     return await _loop.run_in_executor(None, drawing)
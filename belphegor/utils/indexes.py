@@ -0,0 +1,81 @@
+import pymongo
+import pymongo.errors
+import time
+
+#==================================================================================================================================================
+
+#IndexOptionsConflict, IndexKeySpecsConflict
+INDEX_CONFLICT_CODES = (85, 86)
+
+#==================================================================================================================================================
+
+def _normalize(spec):
+    if isinstance(spec, dict):
+        options = dict(spec)
+        keys, _ = _normalize(options.pop("keys"))
+        return keys, options
+    elif isinstance(spec, str):
+        return [(spec, pymongo.ASCENDING)], {}
+    else:
+        return [(field, direction) for field, direction in spec], {}
+
+#==================================================================================================================================================
+
+class IndexRegistry:
+    '''
+        Indexes declared by cogs through a db_indexes class attribute, {collection: [field or [(field, direction), ...], ...]}.
+        A spec can also be {"keys": field or [(field, direction), ...], **options} to pass create_index options, e.g. expireAfterSeconds.
+        create_index is a no-op on the server when the index already exists, and the registry skips anything it already ensured.
+    '''
+
+    def __init__(self, db):
+        self.db = db
+        self.indexes = {}
+
+    async def ensure(self, owner, indexes):
+        created = 0
+        for collection, specs in indexes.items():
+            for spec in specs:
+                keys, options = _normalize(spec)
+                key = (collection, tuple(keys))
+                item = self.indexes.get(key)
+                if item and item["error"] is None:
+                    item["owners"].add(owner)
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    try:
+                        name = await self.db[collection].create_index(keys, **options)
+                    except pymongo.errors.OperationFailure as e:
+                        if e.code not in INDEX_CONFLICT_CODES:
+                            raise
+                        #same keys declared with other options, e.g. made unique later, so it's rebuilt
+                        print(f"Rebuilding index {keys} on {collection}: {e}")
+                        await self.db[collection].drop_index(keys)
+                        name = await self.db[collection].create_index(keys, **options)
+                except Exception as e:
+                    print(f"Failed creating index {keys} on {collection}: {e}")
+                    name = None
+                    error = str(e)
+                else:
+                    error = None
+                    created += 1
+                self.indexes[key] = {"name": name, "owners": {owner}, "options": options, "error": error, "time": time.perf_counter() - start}
+        return created
+
+    def error(self, collection, spec):
+        item = self.indexes.get((collection, tuple(_normalize(spec)[0])))
+        return item["error"] if item else None
+
+    def report(self):
+        if not self.indexes:
+            return "No index declared."
+        lines = []
+        for (collection, keys), item in sorted(self.indexes.items()):
+            fields = ", ".join(f"{f}{'' if d == 1 else f':{d}'}" for f, d in keys)
+            if item["options"]:
+                fields += "; " + ", ".join(f"{k}={v}" for k, v in item["options"].items())
+            status = f"failed: {item['error']}" if item["error"] else f"{item['time']*1000:.0f}ms"
+            lines.append(f"{collection}({fields}) [{', '.join(sorted(item['owners']))}] {status}")
+        return "\n".join(lines)
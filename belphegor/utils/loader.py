@@ -0,0 +1,266 @@
+import asyncio
+import contextvars
+import copy
+import time
+
+#==================================================================================================================================================
+
+MEMO_TTL = 2
+MAX_BATCH = 100
+WRITE_METHODS = frozenset((
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one", "delete_one", "delete_many",
+    "find_one_and_update", "find_one_and_replace", "find_one_and_delete", "bulk_write", "drop"
+))
+
+#per request memo, one scope per dispatched event so every listener of that event shares it
+_scope = contextvars.ContextVar("loader_scope", default=None)
+
+#==================================================================================================================================================
+
+def begin_scope():
+    return _scope.set({})
+
+def end_scope(token):
+    _scope.reset(token)
+
+def _batch_projection(field, projection):
+    #returns (projection to query with, whether field has to be stripped afterwards), or None if not batchable
+    if projection is None:
+        return None, False
+    elif not isinstance(projection, dict):
+        return None
+    elif projection.get(field):
+        return projection, False
+    elif field in projection:
+        return None
+    elif any(v for k, v in projection.items() if k != "_id"):
+        p = dict(projection)
+        p[field] = True
+        return p, True
+    else:
+        return projection, False
+
+def _batch_key(query):
+    if len(query) != 1:
+        return None
+    field, value = next(iter(query.items()))
+    if field.startswith("$") or "." in field or not isinstance(value, (int, str)) or isinstance(value, bool):
+        return None
+    return field, value
+
+#==================================================================================================================================================
+
+class LoaderStats:
+    __slots__ = ("calls", "memo_hits", "coalesced", "batches", "batched_keys", "passthrough")
+
+    def __init__(self):
+        self.calls = 0
+        self.memo_hits = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.batched_keys = 0
+        self.passthrough = 0
+
+    def report(self):
+        saved = self.memo_hits + self.coalesced + self.batched_keys - self.batches
+        return (
+            f"find_one calls: {self.calls}\n"
+            f"Memo hits:      {self.memo_hits}\n"
+            f"Coalesced:      {self.coalesced}\n"
+            f"Batches:        {self.batches} ({self.batched_keys} keys)\n"
+            f"Passthrough:    {self.passthrough}\n"
+            f"Round trips saved: {saved}"
+        )
+
+#==================================================================================================================================================
+
+class LoaderCollection:
+    '''
+        Wraps a motor collection. find_one is single-flight, simple point lookups on one field within the same loop tick
+        are merged into one $in query, and results are memoized for the current event. Everything else goes straight to motor.
+    '''
+
+    def __init__(self, collection, stats, write_hooks=()):
+        self.collection = collection
+        self.collection_name = collection.name
+        self.stats = stats
+        self.write_hooks = write_hooks
+        #bumped by every write, memo entries from an older generation are ignored in every scope, not just the writer's
+        self.generation = 0
+        self._inflight = {}
+        self._batches = {}
+
+    def __getattr__(self, name):
+        attr = getattr(self.collection, name)
+        if name in WRITE_METHODS:
+            return self._wrap_write(attr)
+        return attr
+
+    def _wrap_write(self, method, *, hooks=True):
+        def write(*args, **kwargs):
+            #once before, so nothing started during the write trusts an older read,
+            #and once done, so whatever was read while the write was in flight doesn't stick
+            self.written(hooks)
+            future = asyncio.ensure_future(method(*args, **kwargs))
+            future.add_done_callback(lambda f: self.written(hooks))
+            return future
+        return write
+
+    def written(self, hooks=True):
+        self.invalidate()
+        if hooks:
+            for hook in self.write_hooks:
+                hook(self.collection_name)
+
+    def counter_bulk_write(self, requests, **kwargs):
+        #counter $inc only, no searched or listed field changes so the write hooks are skipped
+        return self._wrap_write(self.collection.bulk_write, hooks=False)(requests, **kwargs)
+
+    def __getitem__(self, name):
+        return self.collection[name]
+
+    def invalidate(self):
+        self.generation += 1
+        scope = _scope.get()
+        if scope:
+            scope.pop(self.collection_name, None)
+        self._inflight.clear()
+
+    async def find_one(self, filter=None, projection=None, *args, **kwargs):
+        stats = self.stats
+        stats.calls += 1
+        if args or kwargs or not isinstance(filter, dict):
+            stats.passthrough += 1
+            return await self.collection.find_one(filter, projection, *args, **kwargs)
+
+        key = (repr(filter), repr(projection))
+        scope = _scope.get()
+        if scope is not None:
+            memo = scope.get(self.collection_name)
+            if memo:
+                item = memo.get(key)
+                if item and item[1] == self.generation and time.perf_counter() - item[0] < MEMO_TTL:
+                    stats.memo_hits += 1
+                    return copy.deepcopy(item[2])
+
+        generation = self.generation
+        future = self._inflight.get(key)
+        if future is None:
+            owner = True
+            future = self._submit(filter, projection)
+            self._inflight[key] = future
+
+            def done(f, key=key):
+                if self._inflight.get(key) is f:
+                    del self._inflight[key]
+
+            future.add_done_callback(done)
+        else:
+            owner = False
+            stats.coalesced += 1
+
+        result = await asyncio.shield(future)
+        if scope is not None:
+            scope.setdefault(self.collection_name, {})[key] = (time.perf_counter(), generation, result)
+            return copy.deepcopy(result)
+        elif owner:
+            return result
+        else:
+            return copy.deepcopy(result)
+
+    def _submit(self, filter, projection):
+        loop = asyncio.get_event_loop()
+        batch_key = _batch_key(filter)
+        if batch_key is not None:
+            field, value = batch_key
+            bp = _batch_projection(field, projection)
+            if bp is not None:
+                batch_id = (field, repr(projection))
+                batch = self._batches.get(batch_id)
+                if batch is None:
+                    batch = {}
+                    self._batches[batch_id] = batch
+                    loop.call_soon(self._flush, batch_id, field, bp)
+                future = batch.get(value)
+                if future is None:
+                    future = loop.create_future()
+                    batch[value] = future
+                return future
+        return asyncio.ensure_future(self.collection.find_one(filter, projection))
+
+    def _flush(self, batch_id, field, bp):
+        batch = self._batches.pop(batch_id)
+        values = list(batch)
+        for i in range(0, len(values), MAX_BATCH):
+            chunk = {v: batch[v] for v in values[i:i+MAX_BATCH]}
+            if len(chunk) == 1:
+                value, future = next(iter(chunk.items()))
+                asyncio.ensure_future(self._single(field, value, future, bp))
+            else:
+                asyncio.ensure_future(self._batch(field, chunk, bp))
+
+    async def _single(self, field, value, future, bp):
+        projection, strip = bp
+        try:
+            doc = await self.collection.find_one({field: value}, projection)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if doc is not None and strip:
+                doc.pop(field, None)
+            if not future.done():
+                future.set_result(doc)
+
+    async def _batch(self, field, chunk, bp):
+        projection, strip = bp
+        self.stats.batches += 1
+        self.stats.batched_keys += len(chunk)
+        results = {}
+        try:
+            async for doc in self.collection.find({field: {"$in": list(chunk)}}, projection=projection):
+                doc_value = doc.get(field)
+                for v in (doc_value if isinstance(doc_value, list) else (doc_value,)):
+                    if v in chunk and v not in results:
+                        results[v] = doc
+        except Exception as e:
+            for future in chunk.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for value, future in chunk.items():
+            doc = results.get(value)
+            if doc is not None:
+                doc = copy.deepcopy(doc) if isinstance(doc.get(field), list) else doc
+                if strip:
+                    doc.pop(field, None)
+            if not future.done():
+                future.set_result(doc)
+
+#==================================================================================================================================================
+
+class LoaderDatabase:
+    def __init__(self, database):
+        self.database = database
+        self.stats = LoaderStats()
+        self.collections = {}
+        #called with the collection name when a write is sent and again when it completes
+        self.write_hooks = []
+
+    def __getitem__(self, name):
+        try:
+            return self.collections[name]
+        except KeyError:
+            collection = LoaderCollection(self.database[name], self.stats, self.write_hooks)
+            self.collections[name] = collection
+            return collection
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        attr = getattr(self.database, name)
+        if hasattr(attr, "find_one"):
+            return self[name]
+        else:
+            return attr
@@ -0,0 +1,207 @@
+import asyncio
+import time
+import os
+import threading
+import contextvars
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import monitoring
+
+#==================================================================================================================================================
+
+#bucket upper bounds in seconds, 0.5ms to ~65s, anything above goes to the last bucket
+BUCKETS = tuple(0.0005 * 2**i for i in range(18))
+
+_current = contextvars.ContextVar("current_invocation", default=None)
+
+#==================================================================================================================================================
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                break
+        else:
+            i = len(BUCKETS)
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        if self.count == 0:
+            return 0.0
+        rank = self.count * p / 100
+        cumulative = 0
+        for i, c in enumerate(self.counts):
+            cumulative += c
+            if cumulative >= rank:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else 0.0
+
+#==================================================================================================================================================
+
+class Invocation:
+    __slots__ = ("name", "mongo", "executor")
+
+    def __init__(self, name):
+        self.name = name
+        self.mongo = 0.0
+        self.executor = 0.0
+
+#==================================================================================================================================================
+
+class MongoListener(monitoring.CommandListener):
+    #motor runs pymongo in its own executor with a copy of the caller context, so _current is visible here
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.metrics.record_mongo(event.command_name, event.duration_micros / 1000000)
+
+    def failed(self, event):
+        self.metrics.record_mongo(event.command_name, event.duration_micros / 1000000)
+
+class TimedExecutor(ThreadPoolExecutor):
+    def __init__(self, metrics, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = metrics
+
+    def submit(self, fn, *args, **kwargs):
+        invocation = _current.get()
+        metrics = self.metrics
+
+        def timed():
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metrics.record_executor(invocation, time.perf_counter() - start)
+
+        return super().submit(timed)
+
+#==================================================================================================================================================
+
+class Metrics:
+    def __init__(self, loop, *, lag_interval=0.5):
+        self.loop = loop
+        self.lag_interval = lag_interval
+        self.lock = threading.Lock()
+        self.commands = {}
+        self.mongo = {}
+        self.executor = Histogram()
+        self.loop_lag = Histogram()
+        self.listener = MongoListener(self)
+
+    def _get(self, container, name, kind):
+        try:
+            return container[name]
+        except KeyError:
+            item = {k: Histogram() for k in kind}
+            container[name] = item
+            return item
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        invocation = Invocation(name)
+        token = _current.set(invocation)
+        start = time.perf_counter()
+        try:
+            yield invocation
+        finally:
+            wall = time.perf_counter() - start
+            _current.reset(token)
+            with self.lock:
+                item = self._get(self.commands, invocation.name, ("wall", "mongo", "executor"))
+                item["wall"].observe(wall)
+                item["mongo"].observe(invocation.mongo)
+                item["executor"].observe(invocation.executor)
+
+    def record_mongo(self, op, duration):
+        invocation = _current.get()
+        with self.lock:
+            if invocation is not None:
+                invocation.mongo += duration
+            self._get(self.mongo, op, ("time",))["time"].observe(duration)
+
+    def record_executor(self, invocation, duration):
+        with self.lock:
+            if invocation is not None:
+                invocation.executor += duration
+            self.executor.observe(duration)
+
+    async def sample_loop_lag(self):
+        interval = self.lag_interval
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lag.observe(max(time.perf_counter() - start - interval, 0.0))
+
+    def command_table(self, *, sort="total", limit=20):
+        with self.lock:
+            items = list(self.commands.items())
+        items.sort(key=lambda x: getattr(x[1]["wall"], sort), reverse=True)
+        lines = [f"{'Command': <24}{'Runs': >7}{'p50': >9}{'p99': >9}{'Max': >9}{'Mongo': >9}{'Exec': >9}"]
+        for name, item in items[:limit]:
+            wall = item["wall"]
+            lines.append(
+                f"{name[:23]: <24}{wall.count: >7}{wall.percentile(50)*1000: >9.1f}{wall.percentile(99)*1000: >9.1f}{wall.max*1000: >9.1f}"
+                f"{item['mongo'].average*1000: >9.1f}{item['executor'].average*1000: >9.1f}"
+            )
+        lag = self.loop_lag
+        lines.append("")
+        lines.append(f"Loop lag: p50 {lag.percentile(50)*1000:.1f}ms, p99 {lag.percentile(99)*1000:.1f}ms, max {lag.max*1000:.1f}ms")
+        lines.append(f"Executor: {self.executor.count} jobs, avg {self.executor.average*1000:.1f}ms")
+        return "\n".join(lines)
+
+    def dump(self):
+        lines = []
+
+        def add(metric, labels, hist):
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            sep = "," if label_text else ""
+            cumulative = 0
+            for bound, c in zip(BUCKETS, hist.counts):
+                cumulative += c
+                lines.append(f'{metric}_bucket{{{label_text}{sep}le="{bound:g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{label_text}{sep}le="+Inf"}} {hist.count}')
+            lines.append(f"{metric}_sum{{{label_text}}} {hist.total:.6f}")
+            lines.append(f"{metric}_count{{{label_text}}} {hist.count}")
+
+        with self.lock:
+            for name, item in sorted(self.commands.items()):
+                for kind, hist in item.items():
+                    add(f"belphegor_command_{kind}_seconds", {"command": name}, hist)
+            for op, item in sorted(self.mongo.items()):
+                add("belphegor_mongo_seconds", {"op": op}, item["time"])
+            add("belphegor_executor_seconds", {}, self.executor)
+            add("belphegor_loop_lag_seconds", {}, self.loop_lag)
+        return "\n".join(lines) + "\n"
+
+    def write_dump(self, path):
+        text = self.dump()
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    async def dump_loop(self, path, interval=60):
+        while True:
+            await asyncio.sleep(interval)
+            await self.loop.run_in_executor(None, self.write_dump, path)
@@ -153,8 +153,6 @@ class Paginator:
         page = self.current_page
         book = self.current_book
         book_mode = self.book_mode
-        render_data = self.render_data
-        Empty = discord.Embed.Empty
         per_page = self.per_page
 
         if book_mode:
@@ -167,6 +165,20 @@ class Paginator:
             item_amount = self._item_amount
             page_amount = self._page_amount
 
+        index = page * per_page
+        if book_mode:
+            paging = f"Page {page+1}/{page_amount} - Book {book+1}/{book_amount}"
+        else:
+            paging = f"Page {page+1}/{page_amount}"
+        return self._render_items(((i, container[i]) for i in range(index, min(index+per_page, item_amount))), paging)
+
+    def _render_items(self, items, paging):
+        page = self.current_page
+        book = self.current_book
+        book_mode = self.book_mode
+        render_data = self.render_data
+        Empty = discord.Embed.Empty
+
         parts = {}
         for key in ("title", "url", "colour", "prefix", "suffix", "author", "thumbnail_url", "image_url", "footer"):
             subject = render_data.get(key)
@@ -188,31 +200,28 @@ class Paginator:
         description = render_data.get("description")
         fields = render_data.get("fields")
         desc = []
-        index = page * per_page
 
-        for i in range(index, min(index+per_page, item_amount)):
+        for i, item in items:
             if book_mode:
                 if description:
                     if callable(description):
-                        desc.append(description(i, container[i], book))
+                        desc.append(description(i, item, book))
                     else:
                         desc.append(description)
                 if fields:
-                    name, value, inline = fields(i, container[i], book)
+                    name, value, inline = fields(i, item, book)
                     if name and value:
                         embed.add_field(name=name, value=value, inline=inline)
-                paging = f"Page {page+1}/{page_amount} - Book {book+1}/{book_amount}"
             else:
                 if description:
                     if callable(description):
-                        desc.append(description(i, container[i]))
+                        desc.append(description(i, item))
                     else:
                         desc.append(description)
                 if fields:
-                    name, value, inline = fields(i, container[i])
+                    name, value, inline = fields(i, item)
                     if name and value:
                         embed.add_field(name=name, value=value, inline=inline)
-                paging = f"Page {page+1}/{page_amount}"
 
         if desc:
             embed.description = f"{parts.get('prefix') or ''}\n{self.separator.join(desc)}\n{parts.get('suffix') or ''}"
@@ -252,7 +261,7 @@ class Paginator:
 
         if ctx.channel.permissions_for(ctx.me).manage_messages:
             event = "reaction_add"
-            handle_reaction = lambda m, r, u: _loop.create_task(try_it(m.remove_reaction(r, u)))
+            handle_reaction = lambda m, r, u: _bot.create_task(try_it(m.remove_reaction(r, u)), category="reaction_cleanup")
         else:
             event = "reaction_add_or_remove"
             handle_reaction = lambda m, r, u: None
@@ -262,13 +271,15 @@ class Paginator:
             embed = self.render()
         else:
             embed = next(iter(self.navigation.values()))()
+        if inspect.isawaitable(embed):
+            embed = await embed
         try:
             message = await ctx.send(embed=embed)
         except asyncio.CancelledError:
             return self.all_tasks.pop(target.id, None)
         if not self.navigation:
             return self.all_tasks.pop(target.id, None)
-        rt = _loop.create_task(self.add_navigate_reactions(message))
+        rt = _bot.create_task(self.add_navigate_reactions(message), category="reaction_add")
 
         try:
             while True:
@@ -291,4 +302,197 @@ class Paginator:
         except asyncio.CancelledError:
             rt.cancel()
         finally:
-            _loop.create_task(try_it(message.clear_reactions()))
+            _bot.create_task(try_it(message.clear_reactions()), category="reaction_cleanup")
+
+#==================================================================================================================================================
+
+async def _async_iter(source):
+    if hasattr(source, "__aiter__"):
+        async for item in source:
+            yield item
+    else:
+        for item in source:
+            yield item
+
+#==================================================================================================================================================
+
+class StreamPaginator(Paginator):
+    '''
+        Paginator over an async iterable, a page is pulled when it is navigated to, with one item read ahead to know if there is another.
+        source is either an (async) iterable or a callable taking a skip count and returning one, e.g. lambda skip: col.find(q).skip(skip).
+        Only the latter can fetch a page again, so only then are pages kept to a window of the last used ones.
+        total is an item count, or a function returning an awaitable (count_documents) that is run in background when navigation starts,
+        the page amount shown is approximate until the source runs out.
+        transform is applied to each item when its page is fetched. No book mode.
+    '''
+
+    window = 5
+
+    def __init__(self, source, per_page=1, *, total=None, transform=None, window=None, separator="\n", page_display=True, first_page=None, **kwargs):
+        self.source = source
+        self.transform = transform
+        self.per_page = per_page
+        self.separator = separator
+        self.book_mode = False
+        self.page_display = page_display
+        self.first_page = first_page
+        if window:
+            self.window = window
+
+        if callable(total):
+            self.total = None
+            self.counting = total
+        else:
+            self.total = total
+            self.counting = None
+        self.total_task = None
+
+        self.pages = collections.OrderedDict()
+        self.lock = asyncio.Lock()
+        self.iterator = None
+        self.position = 0
+        self.lookahead = []
+        self.seen_pages = 0
+        self.last_page = None
+        self.last_item_amount = None
+
+        self.container = []
+        self._item_amount = 0
+        self._page_amount = 1
+        self.render = self._from_stream
+        self.render_data = kwargs
+        self.current_page = 0
+        self.current_book = None
+        self.book_amount = 1
+        self.navigation = collections.OrderedDict()
+
+    def _open(self, page):
+        if callable(self.source):
+            self.iterator = _async_iter(self.source(page*self.per_page))
+        else:
+            self.iterator = _async_iter(self.source)
+        self.position = page
+        self.lookahead = []
+
+    async def _pull(self):
+        per_page = self.per_page
+        items = self.lookahead
+        self.lookahead = []
+        try:
+            while len(items) <= per_page:
+                items.append(await self.iterator.__anext__())
+        except StopAsyncIteration:
+            pass
+        page = self.position
+        self.position += 1
+        self.seen_pages = max(self.seen_pages, page+1)
+        if len(items) > per_page:
+            self.lookahead.append(items.pop())
+        else:
+            self.last_page = page if items or page == 0 else page - 1
+            self.last_item_amount = page * per_page + len(items)
+
+        if self.transform:
+            items = [self.transform(item) for item in items]
+        self.pages[page] = items
+        if callable(self.source):
+            while len(self.pages) > self.window:
+                self.pages.popitem(last=False)
+        return page, items
+
+    async def get_page(self, page):
+        #a cancelled navigation must not leave the source halfway through a page
+        return await asyncio.shield(self._locked_get_page(page))
+
+    async def _locked_get_page(self, page):
+        async with self.lock:
+            return await self._get_page(page)
+
+    async def _get_page(self, page):
+        page = min(page, self.get_page_amount()-1)
+        items = self.pages.get(page)
+        if items is not None:
+            self.pages.move_to_end(page)
+            return page, items
+        if self.iterator is None or (callable(self.source) and page != self.position):
+            self._open(page if callable(self.source) else 0)
+        while True:
+            current, items = await self._pull()
+            if self.last_page is not None and current > self.last_page:
+                #the source got shorter since the page amount was estimated
+                return await self._get_page(self.last_page)
+            elif current >= page or self.last_page is not None:
+                return current, items
+
+    async def get_item(self, index):
+        if index < 0:
+            return None
+        page, items = await self.get_page(index//self.per_page)
+        try:
+            return items[index-page*self.per_page]
+        except IndexError:
+            return None
+
+    async def _count(self):
+        try:
+            self.total = await self.counting()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            traceback.print_exc()
+
+    def start_counting(self):
+        if self.counting is not None and self.total_task is None:
+            self.total_task = asyncio.ensure_future(self._count())
+
+    def get_page_amount(self, book=None):
+        if self.last_page is not None:
+            return self.last_page + 1
+        elif self.total is not None:
+            return max(self.seen_pages+1, (self.total-1)//self.per_page+1)
+        else:
+            return self.seen_pages + 1
+
+    def get_item_amount(self, book=None):
+        if self.last_item_amount is not None:
+            return self.last_item_amount
+        elif self.total is not None:
+            return max(self.seen_pages*self.per_page+1, self.total)
+        else:
+            return self.seen_pages*self.per_page + 1
+
+    async def prefetch(self):
+        self.start_counting()
+        page, items = await self.get_page(0)
+        self.container = items
+        return items
+
+    async def _from_stream(self):
+        page, items = await self.get_page(self.current_page)
+        self.current_page = page
+        self._page_amount = page_amount = self.get_page_amount()
+        if self.last_page is not None:
+            paging = f"Page {page+1}/{page_amount}"
+        elif self.total is not None:
+            paging = f"Page {page+1}/~{page_amount}"
+        else:
+            paging = f"Page {page+1}/{page_amount}+"
+        start = page * self.per_page
+        return self._render_items(enumerate(items, start), paging)
+
+    async def navigate(self, ctx, **kwargs):
+        try:
+            await self.prefetch()
+            if self.last_page is None and self.total is None:
+                #more than one page but no idea how many, offer jumping anyway
+                self._page_amount = self.min_for_jump + 1
+            else:
+                self._page_amount = self.get_page_amount()
+            actions = self.navigation
+            self._setup_base_actions()
+            for emoji, func in actions.items():
+                self.set_action(emoji, func)
+            return await super().navigate(ctx, **kwargs)
+        finally:
+            if self.total_task:
+                self.total_task.cancel()
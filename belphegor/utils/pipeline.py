@@ -0,0 +1,87 @@
+import asyncio
+import traceback
+
+#==================================================================================================================================================
+
+class MessageInfo:
+    __slots__ = ("message", "guild_id", "prefix", "auto_reply")
+
+    def __init__(self, message, *, guild_id, prefix, auto_reply):
+        self.message = message
+        self.guild_id = guild_id
+        self.prefix = prefix
+        self.auto_reply = auto_reply
+
+class MessageHandler:
+    __slots__ = ("name", "match", "handle", "auto_reply", "guild_only")
+
+    def __init__(self, name, match, handle, *, auto_reply=False, guild_only=False):
+        if not asyncio.iscoroutinefunction(handle):
+            raise TypeError("Message handler must be a coroutine.")
+        self.name = name
+        self.match = match
+        self.handle = handle
+        self.auto_reply = auto_reply
+        self.guild_only = guild_only
+
+#==================================================================================================================================================
+
+class MessagePipeline:
+    def __init__(self, bot):
+        self.bot = bot
+        self.handlers = {}
+        self.classified = 0
+        self.discarded = 0
+
+    def add_handler(self, name, match, handle, *, auto_reply=False, guild_only=False):
+        self.handlers[name] = MessageHandler(name, match, handle, auto_reply=auto_reply, guild_only=guild_only)
+
+    def remove_handler(self, name):
+        self.handlers.pop(name, None)
+
+    def classify(self, message):
+        if message.author.bot:
+            return None
+        bot = self.bot
+        guild_id = getattr(message.guild, "id", None)
+        return MessageInfo(
+            message,
+            guild_id=guild_id,
+            prefix=bot.get_prefix_matcher(guild_id).match(message.content),
+            auto_reply=guild_id not in bot.auto_rep_disabled
+        )
+
+    async def _run_handler(self, handler, info, payload):
+        try:
+            await handler.handle(info.message, payload)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            print(f"Ignoring exception in message handler {handler.name}:")
+            traceback.print_exc()
+
+    async def process(self, message):
+        info = self.classify(message)
+        if info is None:
+            return
+        self.classified += 1
+
+        actionable = []
+        for handler in self.handlers.values():
+            if handler.auto_reply and not info.auto_reply:
+                continue
+            if handler.guild_only and info.guild_id is None:
+                continue
+            payload = handler.match(info)
+            if payload:
+                actionable.append((handler, payload))
+
+        if not (info.prefix or actionable):
+            self.discarded += 1
+            return
+
+        bot = self.bot
+        for handler, payload in actionable:
+            bot.create_task(self._run_handler(handler, info, payload), name=handler.name, category="message_handler")
+        if info.prefix:
+            await self.bot.process_commands(message)
@@ -0,0 +1,169 @@
+from pymongo import monitoring
+import threading
+import time
+
+#==================================================================================================================================================
+
+MAX_SHAPES = 500
+IGNORED_COMMANDS = frozenset((
+    "hello", "ismaster", "isMaster", "ping", "buildinfo", "buildInfo", "getMore", "killCursors",
+    "endSessions", "saslStart", "saslContinue", "explain", "listCollections", "listIndexes", "createIndexes"
+))
+EXPLAINABLE = frozenset(("find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"))
+
+#==================================================================================================================================================
+
+def _shape(value):
+    if isinstance(value, dict):
+        return {k: ("[...]" if k in ("$in", "$nin", "$all") else _shape(v)) for k, v in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return [_shape(v) for v in value]
+    else:
+        return type(value).__name__
+
+def _query_shape(command_name, command):
+    if command_name == "find":
+        return {"filter": _shape(command.get("filter", {})), "sort": command.get("sort")}
+    elif command_name == "aggregate":
+        return _shape(command.get("pipeline", []))
+    elif command_name in ("count", "findAndModify"):
+        return _shape(command.get("query", {}))
+    elif command_name == "distinct":
+        return {"key": command.get("key"), "query": _shape(command.get("query", {}))}
+    elif command_name == "update":
+        return [_shape(u.get("q", {})) for u in command.get("updates", [])[:1]]
+    elif command_name == "delete":
+        return [_shape(d.get("q", {})) for d in command.get("deletes", [])[:1]]
+    else:
+        return None
+
+def _sanitize(command):
+    #strip driver added fields ($db, $clusterTime, lsid...) so the command can be wrapped in explain
+    return {k: v for k, v in command.items() if not k.startswith("$") and k not in ("lsid", "txnNumber")}
+
+def _summarize_plan(plan):
+    stages = []
+    while plan:
+        stages.append(plan.get("stage", "?"))
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return " <- ".join(stages)
+
+#==================================================================================================================================================
+
+class ShapeStats:
+    __slots__ = ("command_name", "collection", "shape", "count", "total", "max", "returned", "example", "explained")
+
+    def __init__(self, command_name, collection, shape):
+        self.command_name = command_name
+        self.collection = collection
+        self.shape = shape
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.returned = 0
+        self.example = None
+        self.explained = None
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else 0.0
+
+#==================================================================================================================================================
+
+class QueryProfiler(monitoring.CommandListener):
+    '''
+        Groups mongo commands by query shape (values replaced by their type) and keeps duration per shape.
+        Docs examined needs an explain round trip, so that is only fetched on demand for the slowest shapes.
+    '''
+
+    def __init__(self, *, max_shapes=MAX_SHAPES):
+        self.max_shapes = max_shapes
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.shapes = {}
+        self.dropped = 0
+
+    def started(self, event):
+        name = event.command_name
+        if name in IGNORED_COMMANDS:
+            return
+        command = event.command
+        shape = _query_shape(name, command)
+        collection = command.get(name)
+        key = (name, collection, repr(shape))
+        example = _sanitize(command) if name in EXPLAINABLE else None
+        with self.lock:
+            self.pending[(event.connection_id, event.request_id)] = (key, shape, example)
+
+    def succeeded(self, event):
+        with self.lock:
+            item = self.pending.pop((event.connection_id, event.request_id), None)
+        if item:
+            reply = event.reply
+            returned = reply.get("n", 0)
+            cursor = reply.get("cursor")
+            if cursor:
+                returned = len(cursor.get("firstBatch", ()))
+            self.record(*item, event.duration_micros / 1000000, returned)
+
+    def failed(self, event):
+        with self.lock:
+            item = self.pending.pop((event.connection_id, event.request_id), None)
+        if item:
+            self.record(*item, event.duration_micros / 1000000, 0)
+
+    def record(self, key, shape, example, duration, returned):
+        with self.lock:
+            stats = self.shapes.get(key)
+            if stats is None:
+                if len(self.shapes) >= self.max_shapes:
+                    self.dropped += 1
+                    return
+                stats = ShapeStats(key[0], key[1], shape)
+                self.shapes[key] = stats
+            stats.count += 1
+            stats.total += duration
+            stats.returned += returned
+            if duration >= stats.max:
+                stats.max = duration
+                if example is not None:
+                    stats.example = example
+
+    def slowest(self, n=10, *, sort="max"):
+        with self.lock:
+            items = list(self.shapes.values())
+        return sorted(items, key=lambda s: getattr(s, sort), reverse=True)[:n]
+
+    def table(self, n=10, *, sort="max"):
+        items = self.slowest(n, sort=sort)
+        if not items:
+            return "No query recorded."
+        lines = [f"{'#':>2} {'command':<28} {'count':>6} {'avg ms':>8} {'max ms':>8} {'docs/q':>7}"]
+        for i, s in enumerate(items, 1):
+            name = f"{s.command_name} {s.collection}"[:28]
+            lines.append(f"{i:>2} {name:<28} {s.count:>6} {s.average*1000:>8.1f} {s.max*1000:>8.1f} {s.returned/s.count:>7.1f}")
+            lines.append(f"   {repr(s.shape)[:70]}")
+        if self.dropped:
+            lines.append(f"{self.dropped} queries over the {self.max_shapes} shapes cap were not recorded.")
+        return "\n".join(lines)
+
+    async def explain(self, db, stats):
+        if stats.example is None:
+            return None
+        start = time.perf_counter()
+        result = await db.command({"explain": stats.example, "verbosity": "executionStats"})
+        execution = result.get("executionStats", {})
+        if not execution and "stages" in result:
+            #aggregate explain puts the cursor stage first
+            execution = result["stages"][0].get("$cursor", {}).get("executionStats", {})
+            planner = result["stages"][0].get("$cursor", {}).get("queryPlanner", {})
+        else:
+            planner = result.get("queryPlanner", {})
+        stats.explained = {
+            "plan": _summarize_plan(planner.get("winningPlan", {}).get("queryPlan") or planner.get("winningPlan", {})),
+            "docs_examined": execution.get("totalDocsExamined"),
+            "keys_examined": execution.get("totalKeysExamined"),
+            "returned": execution.get("nReturned"),
+            "time": time.perf_counter() - start
+        }
+        return stats.explained
@@ -0,0 +1,165 @@
+from . import checks
+import asyncio
+import heapq
+import itertools
+import functools
+import collections
+import contextvars
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+#==================================================================================================================================================
+
+class JobRejected(checks.CustomError):
+    pass
+
+class JobTimeout(checks.CustomError):
+    pass
+
+#==================================================================================================================================================
+
+class Job:
+    __slots__ = ("tag", "seq", "func", "user_id", "guild_id", "process", "started", "cancelled", "context")
+
+    def __init__(self, tag, seq, func, *, user_id, guild_id, process, started):
+        self.tag = tag
+        self.seq = seq
+        self.func = func
+        self.user_id = user_id
+        self.guild_id = guild_id
+        self.process = process
+        self.started = started
+        self.cancelled = False
+        self.context = contextvars.copy_context()
+
+    def __lt__(self, other):
+        return (self.tag, self.seq) < (other.tag, other.seq)
+
+#==================================================================================================================================================
+
+class CPUScheduler:
+    '''
+        Start-time fair queueing over a fixed number of CPU workers.
+        Every user gets at most one job per round, every guild at most guild_share jobs per round,
+        so one member spamming heavy commands only delays their own jobs.
+        Jobs run with process=True go to a separate process pool, they don't hold the GIL and a timed out one only ties up its own process.
+    '''
+
+    def __init__(self, loop, *, workers=2, processes=2, max_queue=50, max_per_user=3, guild_share=4, timeout=60, executor=None, create_task=None):
+        self.loop = loop
+        self.create_task = create_task or (lambda coro, **kwargs: loop.create_task(coro))
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.guild_cost = 1 / guild_share
+        self.timeout = timeout
+
+        self.thread_pool = executor or ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cpu")
+        #spawn, forking a process that already runs the loop, motor and executor threads can copy a held lock
+        self.process_pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) if processes > 0 else None
+
+        self.queue = []
+        self.counter = itertools.count()
+        self.virtual_time = 0.0
+        self.user_tags = {}
+        self.guild_tags = {}
+        self.user_pending = collections.Counter()
+        self.running = 0
+
+        self.stats = collections.Counter()
+
+    def position(self, job):
+        return sum(1 for j in self.queue if not j.cancelled and j < job)
+
+    def _enqueue(self, func, user_id, guild_id, process):
+        if len(self.queue) >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise JobRejected("Too many people are doing heavy stuff right now. Please try again later.")
+        if self.user_pending[user_id] >= self.max_per_user:
+            self.stats["rejected"] += 1
+            raise JobRejected("You already have enough jobs in queue. Please wait for them to finish first.")
+
+        #start tag of the job, user_tags and guild_tags hold finish tags
+        tag = max(self.virtual_time, self.user_tags.get(user_id, 0.0))
+        if guild_id is not None:
+            guild_tag = max(self.virtual_time, self.guild_tags.get(guild_id, 0.0))
+            self.guild_tags[guild_id] = guild_tag + self.guild_cost
+            tag = max(tag, guild_tag)
+        self.user_tags[user_id] = tag + 1
+
+        job = Job(tag, next(self.counter), func, user_id=user_id, guild_id=guild_id, process=process, started=self.loop.create_future())
+        heapq.heappush(self.queue, job)
+        self.user_pending[user_id] += 1
+        self.stats["submitted"] += 1
+        return job
+
+    def _dispatch(self):
+        while self.running < self.workers and self.queue:
+            job = heapq.heappop(self.queue)
+            self.user_pending[job.user_id] -= 1
+            if self.user_pending[job.user_id] <= 0:
+                del self.user_pending[job.user_id]
+            if job.cancelled:
+                continue
+
+            self.virtual_time = job.tag
+            executor = self.process_pool if job.process and self.process_pool else self.thread_pool
+            #submit inside the caller context so executor instrumentation knows who the job belongs to
+            cf = job.context.run(executor.submit, job.func)
+            self.running += 1
+            cf.add_done_callback(self._notify_done)
+            job.started.set_result(asyncio.wrap_future(cf, loop=self.loop))
+
+        if not self.queue and self.running == 0:
+            self.user_tags.clear()
+            self.guild_tags.clear()
+
+    def _notify_done(self, cf):
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._job_done)
+
+    def _job_done(self):
+        self.running -= 1
+        self.stats["done"] += 1
+        self._dispatch()
+
+    async def run(self, func, *args, ctx=None, user_id=None, guild_id=None, process=False, timeout=None, **kwargs):
+        if ctx is not None:
+            user_id = ctx.author.id
+            guild_id = getattr(ctx.guild, "id", None)
+        if args or kwargs:
+            func = functools.partial(func, *args, **kwargs)
+
+        job = self._enqueue(func, user_id, guild_id, process)
+        self._dispatch()
+        if not job.started.done():
+            position = self.position(job)
+            if ctx is not None:
+                self.create_task(ctx.send(f"You are in queue at position {position+1}, please wait a bit.", delete_after=10), category="queue_notice")
+
+        try:
+            future = await job.started
+        except asyncio.CancelledError:
+            job.cancelled = True
+            raise
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeout"] += 1
+            raise JobTimeout("This takes too long to process. Please try with a smaller input.")
+
+    def report(self):
+        return (
+            f"Workers: {self.running}/{self.workers} busy\n"
+            f"Queue: {len(self.queue)}/{self.max_queue}\n"
+            f"Submitted: {self.stats['submitted']}\n"
+            f"Done: {self.stats['done']}\n"
+            f"Rejected: {self.stats['rejected']}\n"
+            f"Timeout: {self.stats['timeout']}"
+        )
+
+    def shutdown(self):
+        self.thread_pool.shutdown(wait=False)
+        if self.process_pool:
+            self.process_pool.shutdown(wait=False, cancel_futures=True)
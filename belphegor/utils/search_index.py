@@ -0,0 +1,383 @@
+from rapidfuzz import process, fuzz, utils as fuzz_utils
+from . import columnar
+import collections
+import copy
+import re
+
+#==================================================================================================================================================
+
+REBUILD_DELAY = 5
+FUZZY_LIMIT = 10
+FUZZY_CUTOFF = 60
+RESULT_CACHE_SIZE = 1000
+
+#==================================================================================================================================================
+
+def _grams(text):
+    if len(text) < 3:
+        return set(text)
+    return {text[i:i+3] for i in range(len(text)-2)}
+
+def _concat(doc, atts):
+    #same as $concat: any missing or non string attribute makes the whole thing null
+    values = []
+    for att in atts:
+        value = doc.get(att)
+        if not isinstance(value, str):
+            return None
+        values.append(value)
+    return " ".join(values)
+
+def _aliases(doc, aliases_att):
+    value = doc.get(aliases_att)
+    if isinstance(value, str):
+        return [value]
+    elif isinstance(value, list):
+        return [v for v in value if isinstance(v, str)]
+    else:
+        return []
+
+def _sort_key(value):
+    #missing and null sort first like in mongo
+    return (0, 0) if value is None else (1, value)
+
+#==================================================================================================================================================
+
+class Postings:
+    __slots__ = ("grams", "chars")
+
+    def __init__(self):
+        self.grams = {}
+        self.chars = {}
+
+    def add(self, position, text):
+        grams = self.grams
+        chars = self.chars
+        for g in _grams(text):
+            grams.setdefault(g, set()).add(position)
+        for c in set(text):
+            chars.setdefault(c, set()).add(position)
+
+    def candidates(self, word):
+        if len(word) >= 3:
+            sets = [self.grams.get(g) for g in _grams(word)]
+        else:
+            sets = [self.chars.get(c) for c in set(word)]
+        if not all(sets):
+            return set()
+        sets.sort(key=len)
+        result = set(sets[0])
+        for s in sets[1:]:
+            result &= s
+            if not result:
+                break
+        return result
+
+class SearchView:
+    __slots__ = ("atts", "texts", "aliases", "postings", "alias_postings", "choices", "owners")
+
+    def __init__(self, docs, atts, aliases_att):
+        self.atts = atts
+        self.choices = None
+        self.owners = None
+        self.texts = []
+        self.aliases = []
+        self.postings = Postings()
+        self.alias_postings = Postings()
+        for position, doc in enumerate(docs):
+            text = _concat(doc, atts)
+            if text is not None:
+                text = text.lower()
+                self.postings.add(position, text)
+            self.texts.append(text)
+            if aliases_att:
+                aliases = _aliases(doc, aliases_att)
+                for alias in aliases:
+                    self.alias_postings.add(position, alias.lower())
+                self.aliases.append(aliases)
+
+    def match(self, words, alias_regex):
+        texts = self.texts
+        result = None
+        for word in words:
+            candidates = self.postings.candidates(word)
+            result = candidates if result is None else result & candidates
+            if not result:
+                break
+        result = {p for p in (result or ()) if all(w in texts[p] for w in words)}
+
+        if alias_regex is not None:
+            alias_candidates = None
+            for word in words:
+                candidates = self.alias_postings.candidates(word)
+                alias_candidates = candidates if alias_candidates is None else alias_candidates & candidates
+            aliases = self.aliases
+            result.update(p for p in (alias_candidates or ()) if any(alias_regex.search(a) for a in aliases[p]))
+        return result
+
+    def fuzzy(self, docs, name, *, limit=FUZZY_LIMIT, cutoff=FUZZY_CUTOFF):
+        if self.choices is None:
+            #every attribute and alias is its own choice, owners maps a choice back to the doc position
+            choices = []
+            owners = []
+            for position, doc in enumerate(docs):
+                values = [doc.get(att) for att in self.atts]
+                if self.aliases:
+                    values.extend(self.aliases[position])
+                for value in values:
+                    if isinstance(value, str):
+                        processed = fuzz_utils.default_process(value)
+                        if processed:
+                            choices.append(processed)
+                            owners.append(position)
+            self.choices = choices
+            self.owners = owners
+
+        query = fuzz_utils.default_process(name)
+        if not query:
+            return []
+        best = {}
+        for _, score, i in process.extract(query, self.choices, scorer=fuzz.WRatio, processor=None, limit=limit*4, score_cutoff=cutoff):
+            position = self.owners[i]
+            if score > best.get(position, -1):
+                best[position] = score
+        return sorted(best.items(), key=lambda x: (-x[1], x[0]))[:limit]
+
+#==================================================================================================================================================
+
+class NameList:
+    __slots__ = ("names", "choices")
+
+    def __init__(self, names):
+        self.names = names
+        self.choices = [fuzz_utils.default_process(n) for n in names]
+
+    def extract(self, name, *, limit=FUZZY_LIMIT, cutoff=FUZZY_CUTOFF):
+        query = fuzz_utils.default_process(name)
+        if not query:
+            return []
+        return [(self.names[i], score) for _, score, i in process.extract(query, self.choices, scorer=fuzz.WRatio, processor=None, limit=limit, score_cutoff=cutoff)]
+
+#==================================================================================================================================================
+
+class SearchIndex:
+    '''
+        Whole collection kept in memory in natural order, with trigram postings per attribute list built on first search.
+        Gives the same results as the $concat/$regex aggregation BelphegorContext.search used to run.
+    '''
+
+    def __init__(self, name, docs):
+        self.name = name
+        self.docs = docs
+        self.views = {}
+        self.fields = {}
+        self.columns = None
+
+    def get_view(self, atts, aliases_att):
+        key = (tuple(atts), aliases_att)
+        view = self.views.get(key)
+        if view is None:
+            view = SearchView(self.docs, atts, aliases_att)
+            self.views[key] = view
+        return view
+
+    @property
+    def table(self):
+        if self.columns is None:
+            self.columns = columnar.ColumnarTable(self.docs)
+        return self.columns
+
+    def find_one(self, field, value):
+        values = self.fields.get(field)
+        if values is None:
+            values = {}
+            for doc in self.docs:
+                v = doc.get(field)
+                if v is not None and not isinstance(v, (list, dict)):
+                    values.setdefault(v, doc)
+            self.fields[field] = values
+        doc = values.get(value)
+        return copy.deepcopy(doc) if doc is not None else None
+
+    def fuzzy(self, name, *, atts, aliases_att=None, limit=FUZZY_LIMIT):
+        return [(copy.deepcopy(self.docs[p]), score) for p, score in self.get_view(atts, aliases_att).fuzzy(self.docs, name, limit=limit)]
+
+    def search(self, name, *, atts, aliases_att=None, sort={}):
+        #the returned docs are the index own, don't modify them
+        words = [w.lower() for w in name.split()]
+        if not words:
+            return list(self.docs)
+        alias_regex = re.compile(".*?".join(map(re.escape, name.split())), re.IGNORECASE) if aliases_att else None
+        positions = sorted(self.get_view(atts, aliases_att).match(words, alias_regex))
+        docs = [self.docs[p] for p in positions]
+
+        for key, value in reversed(list(sort.items())):
+            if isinstance(value, int):
+                try:
+                    docs.sort(key=lambda d: _sort_key(d.get(key)), reverse=value < 0)
+                except TypeError:
+                    pass
+            elif isinstance(value, (list, tuple)):
+                order = {v: i for i, v in reversed(list(enumerate(value)))}
+                docs.sort(key=lambda d: order.get(d.get(key), -1))
+        return docs
+
+#==================================================================================================================================================
+
+class ResultCache:
+    '''
+        LRU of search results by (collection, normalized query, search options), each tagged with the collection version it was computed at.
+        Cached docs are shared, whoever hands them out copies them.
+    '''
+
+    def __init__(self, size=RESULT_CACHE_SIZE):
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    def get(self, key, version):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, version, docs):
+        entries = self.entries
+        entries[key] = (version, docs)
+        entries.move_to_end(key)
+        while len(entries) > self.size:
+            entries.popitem(last=False)
+
+    def invalidate(self, collection):
+        keys = [key for key in self.entries if key[0] == collection]
+        for key in keys:
+            del self.entries[key]
+        self.invalidated += len(keys)
+
+    def clear(self):
+        self.invalidated += len(self.entries)
+        self.entries.clear()
+
+    def report(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0
+        per_collection = collections.Counter(key[0] for key in self.entries)
+        lines = [
+            f"Hits:           {self.hits}/{lookups} ({rate:.1f}%)",
+            f"Entries:        {len(self.entries)}/{self.size}",
+            f"Invalidated:    {self.invalidated}"
+        ]
+        lines.extend(f"  {name}: {count}" for name, count in per_collection.most_common())
+        return "\n".join(lines)
+
+#==================================================================================================================================================
+
+class SearchIndexes:
+    '''
+        Search indexes and cached fuzzy name lists by collection name.
+        Any write through bot.db marks the collection stale, searches fall back to mongo until it is rebuilt,
+        and the rebuild waits for REBUILD_DELAY seconds without writes so update commands only trigger one.
+        The write counter per collection doubles as the version of the search result cache. A write bumps it when sent and again when done,
+        so a result read from mongo while the write was in flight is never served afterwards.
+    '''
+
+    def __init__(self, db, loop, *, rebuild_delay=REBUILD_DELAY, cache_size=RESULT_CACHE_SIZE, create_task=None):
+        self.db = db
+        self.loop = loop
+        self.create_task = create_task or (lambda coro, **kwargs: loop.create_task(coro))
+        self.rebuild_delay = rebuild_delay
+        self.indexes = {}
+        self.names = set()
+        self.generations = {}
+        self.rebuilds = {}
+        self.name_lists = {}
+        self.results = ResultCache(cache_size)
+        db.write_hooks.append(self.mark_stale)
+
+    def get(self, name):
+        return self.indexes.get(name)
+
+    def version(self, name):
+        return self.generations.get(name, 0)
+
+    def cached_result(self, key):
+        return self.results.get(key, self.version(key[0]))
+
+    def cache_result(self, key, version, docs):
+        #a write may have happened while the result was computed
+        if self.version(key[0]) == version:
+            self.results.put(key, version, docs)
+
+    async def build(self, name):
+        self.names.add(name)
+        generation = self.generations.get(name, 0)
+        docs = [doc async for doc in self.db[name].find({})]
+        if self.generations.get(name, 0) == generation and name in self.names:
+            self.indexes[name] = SearchIndex(name, docs)
+        return len(docs)
+
+    async def build_many(self, names):
+        for name in names:
+            try:
+                await self.build(name)
+            except Exception as e:
+                print(f"Failed building search index of {name}: {e}")
+
+    async def name_list(self, name, field="name", query={}):
+        key = (field, repr(query))
+        lists = self.name_lists.setdefault(name, {})
+        item = lists.get(key)
+        if item is None:
+            generation = self.generations.get(name, 0)
+            item = NameList(await self.db[name].distinct(field, query))
+            if self.generations.get(name, 0) == generation:
+                lists[key] = item
+        return item
+
+    async def find(self, name, query, projection=None, sort=None):
+        index = self.indexes.get(name)
+        if index:
+            try:
+                return index.table.find(query, projection, sort)
+            except columnar.UnsupportedQuery:
+                pass
+        return [doc async for doc in self.db[name].find(query, projection=projection, sort=sort)]
+
+    def mark_stale(self, name):
+        self.name_lists.pop(name, None)
+        self.results.invalidate(name)
+        self.generations[name] = self.generations.get(name, 0) + 1
+        if name not in self.names:
+            return
+        self.indexes.pop(name, None)
+        handle = self.rebuilds.pop(name, None)
+        if handle:
+            handle.cancel()
+        self.rebuilds[name] = self.loop.call_later(self.rebuild_delay, self._rebuild, name)
+
+    def _rebuild(self, name):
+        self.rebuilds.pop(name, None)
+        self.create_task(self.build_many((name,)), category="index_setup")
+
+    def drop(self, name):
+        self.names.discard(name)
+        self.results.invalidate(name)
+        self.indexes.pop(name, None)
+        handle = self.rebuilds.pop(name, None)
+        if handle:
+            handle.cancel()
+
+    def report(self):
+        lines = []
+        for name in sorted(self.names):
+            index = self.indexes.get(name)
+            if index:
+                lines.append(f"{name}: {len(index.docs)} docs, {len(index.views)} views")
+            else:
+                lines.append(f"{name}: stale")
+        return "\n".join(lines) or "No search index."
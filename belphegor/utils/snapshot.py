@@ -0,0 +1,94 @@
+import os
+import time
+import pickle
+import traceback
+
+#==================================================================================================================================================
+
+SNAPSHOT_VERSION = 1
+
+#==================================================================================================================================================
+
+class SnapshotStore:
+    '''
+        Cog state handoff across reload and restart.
+        A cog opts in by defining snapshot_version, snapshot_state() and popping its state back with bot.snapshots.pop(self) in __init__.
+    '''
+
+    def __init__(self, path, *, max_age=300):
+        self.path = path
+        self.max_age = max_age
+        self.states = {}
+        #restored from disk, unpickled on pop so classes resolve against the freshly loaded extension modules
+        self.raw_states = {}
+
+    def store(self, cog):
+        try:
+            get_state = cog.snapshot_state
+        except AttributeError:
+            return
+        try:
+            self.states[cog.qualified_name] = (getattr(cog, "snapshot_version", 1), get_state())
+        except Exception:
+            print(f"Failed taking snapshot of {cog.qualified_name}:")
+            traceback.print_exc()
+
+    def pop(self, cog):
+        name = cog.qualified_name
+        version, state = self.states.pop(name, (None, None))
+        if version is None:
+            version, raw = self.raw_states.pop(name, (None, None))
+            if version is None:
+                return None
+            try:
+                state = pickle.loads(raw)
+            except Exception as e:
+                print(f"Failed restoring snapshot of {name}: {e}")
+                return None
+        if version != getattr(cog, "snapshot_version", 1):
+            return None
+        else:
+            return state
+
+    def save(self):
+        sections = {}
+        for name, (version, state) in self.states.items():
+            try:
+                sections[name] = (version, pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+            except Exception as e:
+                print(f"Skipped snapshot of {name}: {e}")
+        #sections of cogs never loaded this run, e.g. lazy extensions nobody used, are carried over as they were
+        for name, item in self.raw_states.items():
+            sections.setdefault(name, item)
+        data = {"version": SNAPSHOT_VERSION, "created": time.time(), "sections": sections}
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+        return len(sections)
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+        except FileNotFoundError:
+            return 0
+        except Exception:
+            print("Failed reading snapshot:")
+            traceback.print_exc()
+            data = None
+        finally:
+            #snapshot is consumed once, a stale one must not come back on the next boot
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+        if not data or data.get("version") != SNAPSHOT_VERSION:
+            return 0
+        if time.time() - data["created"] > self.max_age:
+            print("Snapshot is too old, ignored.")
+            return 0
+
+        self.raw_states.update(data["sections"])
+        return len(data["sections"])
@@ -202,3 +202,22 @@ class ConcatJSONDecoder(json.JSONDecoder):
         return objs
 
 load_concat_json = functools.partial(json.loads, cls=ConcatJSONDecoder)
+
+#==================================================================================================================================================
+
+class PrefixMatcher:
+    __slots__ = ("prefixes", "_match")
+
+    def __init__(self, prefixes):
+        self.prefixes = tuple(prefixes)
+        if self.prefixes:
+            self._match = re.compile("|".join(map(re.escape, self.prefixes))).match
+        else:
+            self._match = lambda content: None
+
+    def match(self, content):
+        m = self._match(content)
+        if m:
+            return m.group(0)
+        else:
+            return None
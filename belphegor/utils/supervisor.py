@@ -0,0 +1,132 @@
+import asyncio
+import time
+import traceback
+
+#==================================================================================================================================================
+
+def _owner_name(owner):
+    if owner is None or isinstance(owner, str):
+        return owner
+    else:
+        return getattr(owner, "qualified_name", type(owner).__name__)
+
+#==================================================================================================================================================
+
+class CategoryStats:
+    __slots__ = ("live", "started", "finished", "failed", "rejected", "total_time", "max_time")
+
+    def __init__(self):
+        self.live = {}
+        self.started = 0
+        self.finished = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def oldest(self, now):
+        if self.live:
+            return now - min(self.live.values())
+        else:
+            return 0.0
+
+#==================================================================================================================================================
+
+class TaskSupervisor:
+    def __init__(self, loop, *, limits={}):
+        self.loop = loop
+        self.limits = dict(limits)
+        self.categories = {}
+        self.owners = {}
+
+    def _get_category(self, category):
+        try:
+            return self.categories[category]
+        except KeyError:
+            stats = CategoryStats()
+            self.categories[category] = stats
+            return stats
+
+    def create_task(self, coro, *, name=None, category="default", owner=None):
+        stats = self._get_category(category)
+        limit = self.limits.get(category)
+        if limit is not None and len(stats.live) >= limit:
+            stats.rejected += 1
+            coro.close()
+            return None
+
+        owner = _owner_name(owner)
+        task = self.loop.create_task(coro, name=name or f"{category}-{stats.started}")
+        stats.live[task] = time.perf_counter()
+        stats.started += 1
+        if owner is not None:
+            self.owners.setdefault(owner, set()).add(task)
+
+        def done(t):
+            start = stats.live.pop(t, None)
+            if start is not None:
+                duration = time.perf_counter() - start
+                stats.total_time += duration
+                if duration > stats.max_time:
+                    stats.max_time = duration
+            if t.cancelled():
+                stats.finished += 1
+            elif t.exception() is not None:
+                stats.failed += 1
+                e = t.exception()
+                print(f"Task {t.get_name()} in {category} failed:")
+                traceback.print_exception(type(e), e, e.__traceback__)
+            else:
+                stats.finished += 1
+            if owner is not None:
+                tasks = self.owners.get(owner)
+                if tasks:
+                    tasks.discard(t)
+
+        task.add_done_callback(done)
+        return task
+
+    def do_after(self, coro, wait_time, *, category="delayed", owner=None):
+        async def things_to_do():
+            try:
+                await asyncio.sleep(wait_time)
+                await coro
+            except asyncio.CancelledError:
+                coro.close()
+            except:
+                pass
+        task = self.create_task(things_to_do(), category=category, owner=owner)
+        if task is None:
+            coro.close()
+        return task
+
+    def cancel_owner(self, owner):
+        tasks = self.owners.pop(_owner_name(owner), ())
+        for task in tasks:
+            task.cancel()
+        return len(tasks)
+
+    def live_count(self, category=None):
+        if category is None:
+            return sum(len(stats.live) for stats in self.categories.values())
+        else:
+            stats = self.categories.get(category)
+            return len(stats.live) if stats else 0
+
+    async def wait_category(self, category, *, timeout=None):
+        stats = self.categories.get(category)
+        if stats and stats.live:
+            await asyncio.wait(list(stats.live), timeout=timeout)
+
+    def report(self):
+        now = time.perf_counter()
+        lines = [f"{'Category': <20}{'Live': >7}{'Limit': >7}{'Done': >9}{'Failed': >8}{'Reject': >8}{'Avg(s)': >9}{'Max(s)': >9}{'Oldest(s)': >11}"]
+        for category, stats in sorted(self.categories.items()):
+            done = stats.finished + stats.failed
+            average = stats.total_time / done if done else 0.0
+            limit = self.limits.get(category, "-")
+            lines.append(
+                f"{category: <20}{len(stats.live): >7}{limit: >7}{stats.finished: >9}{stats.failed: >8}{stats.rejected: >8}"
+                f"{average: >9.2f}{stats.max_time: >9.2f}{stats.oldest(now): >11.1f}"
+            )
+        return "\n".join(lines)
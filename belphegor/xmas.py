@@ -41,7 +41,7 @@ class XmasSpecial(commands.Cog):
                 pic_bytes.seek(0)
                 return pic_bytes
 
-            result = await self.bot.loop.run_in_executor(None, image_process)
+            result = await self.bot.run_cpu(ctx, image_process)
             await ctx.send(file=discord.File(result, filename="santa_hat.png"))
 
 #==================================================================================================================================================
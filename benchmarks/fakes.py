@@ -0,0 +1,710 @@
+import asyncio
+import collections
+import contextvars
+import copy
+import re
+import itertools
+from pymongo import ReturnDocument, UpdateOne, UpdateMany, InsertOne, DeleteOne, DeleteMany, ReplaceOne
+
+#==================================================================================================================================================
+
+#who is talking to the database right now, set by the replay harness around every listener
+current_owner = contextvars.ContextVar("current_owner", default=None)
+
+_MISSING = object()
+
+#==================================================================================================================================================
+
+def _get_path(doc, path):
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(part, _MISSING)
+        elif isinstance(value, list) and part.isdigit():
+            index = int(part)
+            value = value[index] if index < len(value) else _MISSING
+        elif isinstance(value, list):
+            values = [v.get(part, _MISSING) for v in value if isinstance(v, dict)]
+            value = [v for v in values if v is not _MISSING] or _MISSING
+        else:
+            return _MISSING
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+def _set_path(doc, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+def _unset_path(doc, path):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+def _candidates(value):
+    if isinstance(value, list):
+        return [value, *value]
+    else:
+        return [value]
+
+def _compare(op, value, target):
+    if value is _MISSING:
+        if op == "$ne":
+            return target is not None
+        elif op == "$nin":
+            return True
+        elif op == "$exists":
+            return not target
+        elif op == "$eq":
+            return target is None
+        elif op == "$in":
+            return None in target
+        return False
+
+    if op == "$exists":
+        return bool(target)
+    elif op == "$eq":
+        return any(v == target for v in _candidates(value))
+    elif op == "$ne":
+        return all(v != target for v in _candidates(value))
+    elif op == "$in":
+        return any(v == t for v in _candidates(value) for t in target)
+    elif op == "$nin":
+        return not any(v == t for v in _candidates(value) for t in target)
+    elif op == "$size":
+        return isinstance(value, list) and len(value) == target
+    elif op == "$regex":
+        return any(isinstance(v, str) and re.search(target, v) for v in _candidates(value))
+    elif op == "$options":
+        return True
+
+    for v in _candidates(value):
+        try:
+            if op == "$lt" and v < target:
+                return True
+            elif op == "$lte" and v <= target:
+                return True
+            elif op == "$gt" and v > target:
+                return True
+            elif op == "$gte" and v >= target:
+                return True
+        except TypeError:
+            pass
+    return False
+
+def _match_value(value, condition):
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        for op, target in condition.items():
+            if op == "$not":
+                if _match_value(value, target):
+                    return False
+            elif op == "$elemMatch":
+                if not (isinstance(value, list) and any(isinstance(v, dict) and match(v, target) for v in value)):
+                    return False
+            elif op == "$regex":
+                flags = re.I if "i" in condition.get("$options", "") else 0
+                if not any(isinstance(v, str) and re.search(target, v, flags) for v in _candidates(value if value is not _MISSING else [])):
+                    return False
+            elif not _compare(op, value, target):
+                return False
+        return True
+    elif isinstance(condition, re.Pattern):
+        return any(isinstance(v, str) and condition.search(v) for v in _candidates(value if value is not _MISSING else []))
+    else:
+        return _compare("$eq", value, condition)
+
+def match(doc, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(match(doc, q) for q in condition):
+                return False
+        elif key == "$and":
+            if not all(match(doc, q) for q in condition):
+                return False
+        elif key == "$nor":
+            if any(match(doc, q) for q in condition):
+                return False
+        elif not _match_value(_get_path(doc, key), condition):
+            return False
+    return True
+
+def project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    projection = dict(projection)
+    include_id = projection.pop("_id", True)
+    inclusive = [k for k, v in projection.items() if v and not isinstance(v, dict)]
+    if inclusive:
+        result = {}
+        for key in inclusive:
+            value = _get_path(doc, key)
+            if value is not _MISSING:
+                _set_path(result, key, copy.deepcopy(value))
+    else:
+        result = copy.deepcopy(doc)
+        for key, v in projection.items():
+            if not v:
+                _unset_path(result, key)
+    for key, v in projection.items():
+        if isinstance(v, dict) and "$slice" in v:
+            value = _get_path(doc, key)
+            if isinstance(value, list):
+                s = v["$slice"]
+                _set_path(result, key, copy.deepcopy(value[s:] if s < 0 else value[:s]))
+    if include_id and "_id" in doc:
+        result["_id"] = doc["_id"]
+    else:
+        result.pop("_id", None)
+    return result
+
+def apply_update(doc, update, *, inserting=False):
+    if not any(k.startswith("$") for k in update):
+        _id = doc.get("_id")
+        doc.clear()
+        doc.update(copy.deepcopy(update))
+        if _id is not None:
+            doc["_id"] = _id
+        return
+
+    for op, fields in update.items():
+        for key, value in fields.items():
+            value = copy.deepcopy(value)
+            if op == "$set":
+                _set_path(doc, key, value)
+            elif op == "$setOnInsert":
+                if inserting:
+                    _set_path(doc, key, value)
+            elif op == "$unset":
+                _unset_path(doc, key)
+            elif op == "$inc":
+                current = _get_path(doc, key)
+                _set_path(doc, key, (0 if current is _MISSING else current) + value)
+            elif op == "$push":
+                current = _get_path(doc, key)
+                if current is _MISSING:
+                    current = []
+                    _set_path(doc, key, current)
+                if isinstance(value, dict) and "$each" in value:
+                    current.extend(value["$each"])
+                    if "$slice" in value:
+                        s = value["$slice"]
+                        current[:] = current[s:] if s < 0 else current[:s]
+                else:
+                    current.append(value)
+            elif op == "$addToSet":
+                current = _get_path(doc, key)
+                if current is _MISSING:
+                    current = []
+                    _set_path(doc, key, current)
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                for item in items:
+                    if item not in current:
+                        current.append(item)
+            elif op == "$pull":
+                current = _get_path(doc, key)
+                if isinstance(current, list):
+                    if isinstance(value, dict):
+                        current[:] = [v for v in current if not (match(v, value) if isinstance(v, dict) else _match_value(v, value))]
+                    else:
+                        current[:] = [v for v in current if v != value]
+            elif op == "$pop":
+                current = _get_path(doc, key)
+                if isinstance(current, list) and current:
+                    current.pop(0 if value == -1 else -1)
+            else:
+                raise NotImplementedError(f"Fake mongo does not support {op}")
+
+#==================================================================================================================================================
+
+class CallCounter:
+    def __init__(self):
+        self.calls = collections.Counter()
+
+    def count(self, collection, op):
+        self.calls[(current_owner.get(), collection, op)] += 1
+
+    def by_owner(self):
+        result = collections.Counter()
+        for (owner, collection, op), n in self.calls.items():
+            result[owner] += n
+        return result
+
+    def reset(self):
+        self.calls.clear()
+
+#==================================================================================================================================================
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+        self._iter = None
+
+    def sort(self, key, direction=None):
+        if isinstance(key, str):
+            keys = [(key, direction or 1)]
+        else:
+            keys = list(key)
+        for k, d in reversed(keys):
+            self._docs.sort(key=lambda doc: (_get_path(doc, k) is _MISSING, _get_path(doc, k) if _get_path(doc, k) is not _MISSING else 0), reverse=d==-1)
+        return self
+
+    def skip(self, n):
+        self._docs = self._docs[n:]
+        return self
+
+    def limit(self, n):
+        if n:
+            self._docs = self._docs[:n]
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    def __aiter__(self):
+        self._iter = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(0)
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length=None):
+        await asyncio.sleep(0)
+        return self._docs[:length] if length else list(self._docs)
+
+class BulkWriteResult:
+    def __init__(self, matched, modified, upserted, inserted, deleted):
+        self.matched_count = matched
+        self.modified_count = modified
+        self.upserted_count = upserted
+        self.inserted_count = inserted
+        self.deleted_count = deleted
+
+class UpdateResult:
+    def __init__(self, matched, modified, upserted_id=None):
+        self.matched_count = matched
+        self.modified_count = modified
+        self.upserted_id = upserted_id
+
+class InsertResult:
+    def __init__(self, ids):
+        self.inserted_ids = ids
+        self.inserted_id = ids[0] if ids else None
+
+class DeleteResult:
+    def __init__(self, deleted):
+        self.deleted_count = deleted
+
+#==================================================================================================================================================
+
+class FakeCollection:
+    _ids = itertools.count(1)
+
+    def __init__(self, name, counter):
+        self.name = name
+        self.counter = counter
+        self.docs = []
+        self.indexes = {}
+
+    def _count(self, op):
+        self.counter.count(self.name, op)
+
+    def _new_doc(self, doc):
+        doc = copy.deepcopy(doc)
+        doc.setdefault("_id", next(self._ids))
+        self.docs.append(doc)
+        return doc
+
+    def _find_docs(self, query):
+        return [d for d in self.docs if match(d, query or {})]
+
+    def _upsert_doc(self, query, update):
+        base = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        doc = self._new_doc(base)
+        apply_update(doc, update, inserting=True)
+        return doc
+
+    #reads
+
+    def find(self, query=None, projection=None, *, sort=None, limit=0, skip=0, **kwargs):
+        self._count("find")
+        docs = [project(d, projection) for d in self._find_docs(query)]
+        cursor = FakeCursor(docs)
+        if sort:
+            cursor.sort(sort)
+        if skip:
+            cursor.skip(skip)
+        if limit:
+            cursor.limit(limit)
+        return cursor
+
+    async def find_one(self, query=None, projection=None, **kwargs):
+        self._count("find_one")
+        await asyncio.sleep(0)
+        for d in self.docs:
+            if match(d, query or {}):
+                return project(d, projection)
+        return None
+
+    async def count_documents(self, query, **kwargs):
+        self._count("count_documents")
+        await asyncio.sleep(0)
+        return len(self._find_docs(query))
+
+    async def estimated_document_count(self, **kwargs):
+        self._count("estimated_document_count")
+        return len(self.docs)
+
+    async def distinct(self, key, query=None, **kwargs):
+        self._count("distinct")
+        result = []
+        for d in self._find_docs(query):
+            value = _get_path(d, key)
+            for v in (value if isinstance(value, list) else [value]):
+                if v is not _MISSING and v not in result:
+                    result.append(v)
+        return result
+
+    def aggregate(self, pipeline, **kwargs):
+        self._count("aggregate")
+        docs = [copy.deepcopy(d) for d in self.docs]
+        for stage in pipeline:
+            (op, arg), = stage.items()
+            if op == "$match":
+                docs = [d for d in docs if match(d, arg)]
+            elif op == "$project":
+                docs = [self._project_stage(d, arg) for d in docs]
+            elif op == "$unwind":
+                path = arg if isinstance(arg, str) else arg["path"]
+                path = path[1:]
+                unwound = []
+                for d in docs:
+                    value = _get_path(d, path)
+                    if isinstance(value, list):
+                        for v in value:
+                            nd = copy.deepcopy(d)
+                            _set_path(nd, path, v)
+                            unwound.append(nd)
+                docs = unwound
+            elif op == "$group":
+                docs = self._group_stage(docs, arg)
+            elif op == "$sort":
+                docs = FakeCursor(docs).sort(list(arg.items()))._docs
+            elif op == "$limit":
+                docs = docs[:arg]
+            elif op == "$skip":
+                docs = docs[arg:]
+            elif op == "$count":
+                docs = [{arg: len(docs)}]
+            else:
+                raise NotImplementedError(f"Fake mongo does not support aggregate stage {op}")
+        return FakeCursor(docs)
+
+    def _expr(self, doc, expr):
+        if isinstance(expr, str) and expr.startswith("$"):
+            value = _get_path(doc, expr[1:])
+            return None if value is _MISSING else value
+        return expr
+
+    def _project_stage(self, doc, spec):
+        result = {}
+        for key, value in spec.items():
+            if value in (1, True):
+                v = _get_path(doc, key)
+                if v is not _MISSING:
+                    _set_path(result, key, v)
+            elif value in (0, False):
+                continue
+            else:
+                result[key] = self._expr(doc, value)
+        if spec.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+
+    def _group_stage(self, docs, spec):
+        groups = collections.OrderedDict()
+        id_expr = spec["_id"]
+        for d in docs:
+            if isinstance(id_expr, dict):
+                key = tuple((k, self._expr(d, v)) for k, v in id_expr.items())
+            else:
+                key = self._expr(d, id_expr)
+            groups.setdefault(key, []).append(d)
+
+        result = []
+        for key, members in groups.items():
+            out = {"_id": dict(key) if isinstance(id_expr, dict) else key}
+            for field, acc in spec.items():
+                if field == "_id":
+                    continue
+                (op, expr), = acc.items()
+                values = [self._expr(d, expr) for d in members]
+                if op == "$push":
+                    out[field] = values
+                elif op == "$addToSet":
+                    out[field] = list(dict.fromkeys(values))
+                elif op == "$sum":
+                    out[field] = sum(v for v in values if isinstance(v, (int, float)))
+                elif op == "$first":
+                    out[field] = values[0]
+                elif op == "$last":
+                    out[field] = values[-1]
+                elif op == "$max":
+                    out[field] = max(values)
+                elif op == "$min":
+                    out[field] = min(values)
+                elif op == "$avg":
+                    out[field] = sum(values) / len(values)
+                else:
+                    raise NotImplementedError(f"Fake mongo does not support accumulator {op}")
+            result.append(out)
+        return result
+
+    #writes
+
+    async def insert_one(self, doc, **kwargs):
+        self._count("insert_one")
+        await asyncio.sleep(0)
+        new = self._new_doc(doc)
+        doc.setdefault("_id", new["_id"])
+        return InsertResult([new["_id"]])
+
+    async def insert_many(self, docs, **kwargs):
+        self._count("insert_many")
+        await asyncio.sleep(0)
+        return InsertResult([self._new_doc(d)["_id"] for d in docs])
+
+    def _update(self, query, update, *, upsert, many):
+        matched = 0
+        for d in self.docs:
+            if match(d, query):
+                apply_update(d, update)
+                matched += 1
+                if not many:
+                    break
+        if matched == 0 and upsert:
+            doc = self._upsert_doc(query, update)
+            return UpdateResult(0, 0, doc["_id"])
+        return UpdateResult(matched, matched)
+
+    async def update_one(self, query, update, *, upsert=False, **kwargs):
+        self._count("update_one")
+        await asyncio.sleep(0)
+        return self._update(query, update, upsert=upsert, many=False)
+
+    async def update_many(self, query, update, *, upsert=False, **kwargs):
+        self._count("update_many")
+        await asyncio.sleep(0)
+        return self._update(query, update, upsert=upsert, many=True)
+
+    async def replace_one(self, query, doc, *, upsert=False, **kwargs):
+        self._count("replace_one")
+        await asyncio.sleep(0)
+        return self._update(query, doc, upsert=upsert, many=False)
+
+    async def find_one_and_update(self, query, update, *, projection=None, upsert=False, return_document=ReturnDocument.BEFORE, **kwargs):
+        self._count("find_one_and_update")
+        await asyncio.sleep(0)
+        for d in self.docs:
+            if match(d, query):
+                before = project(d, projection)
+                apply_update(d, update)
+                return project(d, projection) if return_document == ReturnDocument.AFTER else before
+        if upsert:
+            doc = self._upsert_doc(query, update)
+            return project(doc, projection) if return_document == ReturnDocument.AFTER else None
+        return None
+
+    async def find_one_and_delete(self, query, *, projection=None, **kwargs):
+        self._count("find_one_and_delete")
+        await asyncio.sleep(0)
+        for i, d in enumerate(self.docs):
+            if match(d, query):
+                del self.docs[i]
+                return project(d, projection)
+        return None
+
+    def _delete(self, query, *, many):
+        deleted = 0
+        remaining = []
+        for d in self.docs:
+            if (many or deleted == 0) and match(d, query):
+                deleted += 1
+            else:
+                remaining.append(d)
+        self.docs = remaining
+        return deleted
+
+    async def delete_one(self, query, **kwargs):
+        self._count("delete_one")
+        await asyncio.sleep(0)
+        return DeleteResult(self._delete(query, many=False))
+
+    async def delete_many(self, query, **kwargs):
+        self._count("delete_many")
+        await asyncio.sleep(0)
+        return DeleteResult(self._delete(query, many=True))
+
+    async def bulk_write(self, requests, *, ordered=True, **kwargs):
+        self._count("bulk_write")
+        await asyncio.sleep(0)
+        matched = modified = upserted = inserted = deleted = 0
+        for req in requests:
+            if isinstance(req, InsertOne):
+                self._new_doc(req._doc)
+                inserted += 1
+            elif isinstance(req, (UpdateOne, UpdateMany, ReplaceOne)):
+                result = self._update(req._filter, req._doc, upsert=bool(req._upsert), many=isinstance(req, UpdateMany))
+                matched += result.matched_count
+                modified += result.modified_count
+                upserted += result.upserted_id is not None
+            elif isinstance(req, (DeleteOne, DeleteMany)):
+                deleted += self._delete(req._filter, many=isinstance(req, DeleteMany))
+        return BulkWriteResult(matched, modified, upserted, inserted, deleted)
+
+    async def create_index(self, keys, **kwargs):
+        self._count("create_index")
+        name = kwargs.get("name") or "_".join(f"{k}_{d}" for k, d in (keys if isinstance(keys, list) else [(keys, 1)]))
+        self.indexes[name] = {"key": keys, **kwargs}
+        return name
+
+    async def index_information(self):
+        return dict(self.indexes)
+
+#==================================================================================================================================================
+
+class FakeDatabase:
+    def __init__(self, name, counter):
+        self.name = name
+        self.counter = counter
+        self.collections = {}
+
+    def __getitem__(self, name):
+        try:
+            return self.collections[name]
+        except KeyError:
+            collection = FakeCollection(name, self.counter)
+            self.collections[name] = collection
+            return collection
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def command(self, *args, **kwargs):
+        self.counter.count(None, "command")
+        return {"ok": 1}
+
+class FakeMongoClient:
+    def __init__(self):
+        self.counter = CallCounter()
+        self.databases = {}
+
+    def __getitem__(self, name):
+        try:
+            return self.databases[name]
+        except KeyError:
+            db = FakeDatabase(name, self.counter)
+            self.databases[name] = db
+            return db
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def close(self):
+        pass
+
+#==================================================================================================================================================
+
+class FakeStream:
+    def __init__(self, data):
+        self.data = data
+
+    async def iter_chunked(self, size):
+        for i in range(0, len(self.data), size):
+            yield self.data[i:i+size]
+
+    def at_eof(self):
+        return True
+
+class FakeResponse:
+    def __init__(self, data, status=200):
+        self.status = status
+        self.content = FakeStream(data)
+        self._data = data
+
+    async def read(self):
+        return self._data
+
+    async def text(self):
+        return self._data.decode("utf-8")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+class FakeSession:
+    def __init__(self, responses={}):
+        self.responses = dict(responses)
+        self.calls = collections.Counter()
+
+    def _request(self, method, url, **kwargs):
+        self.calls[(current_owner.get(), method)] += 1
+        return FakeResponse(self.responses.get(url, b""))
+
+    def get(self, url, **kwargs):
+        return self._request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._request("POST", url, **kwargs)
+
+    async def close(self):
+        pass
+
+#==================================================================================================================================================
+
+class FakeDiscordHTTP:
+    '''
+        Stand-in for HTTPClient.request. Answers message sends with a plausible payload and everything else with nothing.
+    '''
+
+    def __init__(self, bot_user):
+        self.bot_user = bot_user
+        self.calls = collections.Counter()
+        self._ids = itertools.count(10**17)
+
+    async def request(self, route, *, files=None, form=None, **kwargs):
+        self.calls[(current_owner.get(), f"{route.method} {route.path}")] += 1
+        await asyncio.sleep(0)
+        if route.method == "POST" and route.path == "/channels/{channel_id}/messages":
+            payload = kwargs.get("json") or {}
+            return {
+                "id": str(next(self._ids)),
+                "channel_id": str(route.channel_id),
+                "author": self.bot_user,
+                "content": payload.get("content") or "",
+                "timestamp": "2020-01-01T00:00:00+00:00",
+                "edited_timestamp": None,
+                "tts": False,
+                "mention_everyone": False,
+                "mentions": [],
+                "mention_roles": [],
+                "attachments": [],
+                "embeds": [payload["embed"]] if payload.get("embed") else [],
+                "pinned": False,
+                "type": 0
+            }
+        return None
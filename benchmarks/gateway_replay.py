@@ -0,0 +1,357 @@
+import discord
+import asyncio
+import argparse
+import collections
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot
+from belphegor.utils import config
+from benchmarks import fakes
+
+#==================================================================================================================================================
+
+BOT_ID = 306706699102715907
+DRAGON_SHOUT_GUILD_ID = 502478591869370378
+TIMESTAMP = "2020-01-01T00:00:00+00:00"
+
+EXTENSIONS = [
+    "belphegor.override",
+    "belphegor.guild",
+    "belphegor.misc",
+    "belphegor.sticker",
+    "belphegor.experimental"
+]
+
+#extensions that need asset files not kept in the repo
+REQUIRED_DATA = {
+    "belphegor.misc": f"{config.DATA_PATH}/font/consola.ttf"
+}
+
+EVENT_WEIGHTS = {
+    "chat": 50,
+    "command": 5,
+    "sticker": 3,
+    "presence": 30,
+    "member": 7,
+    "reaction": 5
+}
+
+STATUSES = ("online", "idle", "dnd", "offline")
+
+#==================================================================================================================================================
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+def user_payload(user_id):
+    return {"id": str(user_id), "username": f"user{user_id}", "discriminator": f"{user_id%10000:04}", "avatar": None, "bot": False}
+
+#==================================================================================================================================================
+
+class Recorder:
+    def __init__(self):
+        self.durations = collections.defaultdict(list)
+        self.failures = collections.Counter()
+
+    async def timed(self, name, coro):
+        token = fakes.current_owner.set(name)
+        start = time.perf_counter()
+        try:
+            await coro
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            self.failures[name] += 1
+        finally:
+            self.durations[name].append(time.perf_counter() - start)
+            fakes.current_owner.reset(token)
+
+#==================================================================================================================================================
+
+class ReplayBot(bot.Belphegor):
+    def __init__(self, **kwargs):
+        self.recorder = Recorder()
+        self.pending = set()
+        super().__init__(**kwargs)
+
+    def _track(self, task):
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+        return task
+
+    def _schedule_event(self, coro, event_name, *args, **kwargs):
+        name = getattr(coro, "__qualname__", event_name)
+        return self._track(self.loop.create_task(self.recorder.timed(name, self._run_event(coro, event_name, *args, **kwargs))))
+
+    def create_task(self, coro, *, name=None, category="default", owner=None):
+        if category == "message_handler":
+            coro = self.recorder.timed(f"handler:{name}", coro)
+        task = super().create_task(coro, name=name, category=category, owner=owner)
+        if task is not None and category in ("message_handler", "delayed_delete", "reaction_cleanup"):
+            self._track(task)
+        return task
+
+    async def on_command_error(self, ctx, error):
+        pass
+
+    async def drain(self):
+        while self.pending:
+            await asyncio.wait(list(self.pending))
+
+#==================================================================================================================================================
+
+class World:
+    def __init__(self, *, guilds, members, channels, opt_in, seed):
+        self.random = random.Random(seed)
+        self.guild_ids = [700000000000000000 + i for i in range(guilds)]
+        self.user_ids = [800000000000000000 + i for i in range(max(members * guilds // 2, members))]
+        self.channels = {g: [g + 1000 + i for i in range(channels)] for g in self.guild_ids}
+        self.members = {g: self.random.sample(self.user_ids, members) for g in self.guild_ids}
+        self.statuses = {}
+        self.opt_in = set(self.random.sample(self.user_ids, int(len(self.user_ids) * opt_in)))
+        self.message_ids = collections.deque(maxlen=500)
+        self._ids = iter(range(900000000000000000, 10**18))
+
+    def guild_payload(self, guild_id):
+        members = []
+        presences = []
+        for user_id in self.members[guild_id]:
+            members.append({"user": user_payload(user_id), "roles": [], "joined_at": TIMESTAMP, "deaf": False, "mute": False})
+            status = self.random.choice(STATUSES)
+            self.statuses[(guild_id, user_id)] = status
+            presences.append({"user": {"id": str(user_id)}, "status": status, "activities": [], "client_status": {}})
+        return {
+            "id": str(guild_id),
+            "name": f"guild{guild_id}",
+            "owner_id": str(self.members[guild_id][0]),
+            "member_count": len(members),
+            "roles": [{"id": str(guild_id), "name": "@everyone", "permissions": "104324673", "position": 0, "color": 0, "hoist": False, "managed": False, "mentionable": False}],
+            "channels": [{"id": str(c), "type": 0, "name": f"channel{c}", "position": i, "permission_overwrites": []} for i, c in enumerate(self.channels[guild_id])],
+            "members": members,
+            "presences": presences,
+            "emojis": [],
+            "features": []
+        }
+
+    def seed_database(self, db):
+        db.belphegor_config.docs.append({"category": "block", "blocked_user_ids": []})
+        for i, guild_id in enumerate(self.guild_ids):
+            doc = {"guild_id": guild_id}
+            if i % 3 == 0:
+                doc["prefixes"] = ["!", "b!"]
+            if i % 4 == 0:
+                doc["log_channel"] = self.channels[guild_id][-1]
+            if i % 5 == 0:
+                doc["sticker_prefix"] = "+"
+            db.guild_data.docs.append(doc)
+        for user_id in self.opt_in:
+            db.user_data.docs.append({"user_id": user_id, "status": []})
+        for name in ("hello", "bye", "lol", "rip"):
+            db.sticker_list.docs.append({"name": name, "url": f"https://example.com/{name}.png", "uses": 0, "banned_guilds": []})
+
+    def message(self, guild_id, content):
+        user_id = self.random.choice(self.members[guild_id])
+        message_id = next(self._ids)
+        self.message_ids.append((guild_id, message_id))
+        return {
+            "id": str(message_id),
+            "channel_id": str(self.random.choice(self.channels[guild_id])),
+            "guild_id": str(guild_id),
+            "author": user_payload(user_id),
+            "member": {"roles": [], "joined_at": TIMESTAMP, "deaf": False, "mute": False},
+            "content": content,
+            "timestamp": TIMESTAMP,
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "pinned": False,
+            "type": 0
+        }
+
+    def event(self, kind):
+        guild_id = self.random.choice(self.guild_ids)
+        if kind == "chat":
+            text = " ".join("".join(self.random.choices(string.ascii_lowercase, k=self.random.randint(2, 8))) for _ in range(self.random.randint(1, 12)))
+            return "MESSAGE_CREATE", self.message(guild_id, text)
+        elif kind == "command":
+            return "MESSAGE_CREATE", self.message(guild_id, self.random.choice([">>dice 2d6", ">>say hello", ">>nonexistent", "!dice 1d20"]))
+        elif kind == "sticker":
+            return "MESSAGE_CREATE", self.message(guild_id, f"look ${self.random.choice(['hello', 'lol', 'nope'])}")
+        elif kind == "presence":
+            user_id = self.random.choice(self.members[guild_id])
+            status = self.random.choice([s for s in STATUSES if s != self.statuses[(guild_id, user_id)]])
+            self.statuses[(guild_id, user_id)] = status
+            return "PRESENCE_UPDATE", {"user": {"id": str(user_id)}, "guild_id": str(guild_id), "status": status, "activities": [], "client_status": {}}
+        elif kind == "member":
+            user_id = self.random.choice(self.members[guild_id])
+            return "GUILD_MEMBER_UPDATE", {"guild_id": str(guild_id), "user": user_payload(user_id), "roles": [], "nick": f"nick{self.random.randint(0, 999)}", "joined_at": TIMESTAMP}
+        elif kind == "reaction":
+            if self.message_ids:
+                guild_id, message_id = self.random.choice(self.message_ids)
+            else:
+                message_id = next(self._ids)
+            user_id = self.random.choice(self.members[guild_id])
+            return "MESSAGE_REACTION_ADD", {
+                "user_id": str(user_id),
+                "channel_id": str(self.channels[guild_id][0]),
+                "message_id": str(message_id),
+                "guild_id": str(guild_id),
+                "emoji": {"id": None, "name": "\U0001f44d"},
+                "member": {"user": user_payload(user_id), "roles": [], "joined_at": TIMESTAMP, "deaf": False, "mute": False}
+            }
+
+    def stream(self, count):
+        kinds = list(EVENT_WEIGHTS)
+        weights = list(EVENT_WEIGHTS.values())
+        for kind in self.random.choices(kinds, weights, k=count):
+            yield self.event(kind)
+
+#==================================================================================================================================================
+
+def read_recording(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                data = json.loads(line)
+                yield data["t"], data["d"]
+
+async def wait_loaded(belphybot, extensions, timeout=30):
+    end = time.perf_counter() + timeout
+    while not all(e in belphybot.extensions for e in extensions):
+        if time.perf_counter() > end:
+            raise RuntimeError(f"Extensions not loaded: {[e for e in extensions if e not in belphybot.extensions]}")
+        await asyncio.sleep(0.01)
+    cog = belphybot.get_cog("Statistics")
+    if cog:
+        await cog.fetch_ready.wait()
+    await asyncio.sleep(0.1)
+
+async def replay(belphybot, events, *, batch):
+    parsers = belphybot._connection.parsers
+    state = belphybot._connection
+    count = collections.Counter()
+    start = time.perf_counter()
+    for i, (t, d) in enumerate(events, 1):
+        if t == "GUILD_CREATE":
+            state._add_guild_from_data(d)
+            continue
+        parsers[t](d)
+        count[t] += 1
+        if i % batch == 0:
+            await asyncio.sleep(0)
+    await belphybot.drain()
+    return count, time.perf_counter() - start
+
+def report(belphybot, mongo, http, count, elapsed):
+    total = sum(count.values())
+    print(f"Events: {total} in {elapsed:.3f}s -> {total/elapsed:.0f} events/s")
+    print("  " + ", ".join(f"{t} {n}" for t, n in count.most_common()))
+    print()
+
+    recorder = belphybot.recorder
+    db_calls = mongo.counter.by_owner()
+    http_calls = collections.Counter()
+    for (owner, route), n in http.calls.items():
+        http_calls[owner] += n
+
+    lines = [f"{'Listener': <40}{'Calls': >8}{'p50(ms)': >10}{'p99(ms)': >10}{'DB/call': >9}{'HTTP/call': >11}{'Fail': >6}"]
+    for name, durations in sorted(recorder.durations.items(), key=lambda x: sum(x[1]), reverse=True):
+        calls = len(durations)
+        lines.append(
+            f"{name[:39]: <40}{calls: >8}{percentile(durations, 50)*1000: >10.3f}{percentile(durations, 99)*1000: >10.3f}"
+            f"{db_calls[name]/calls: >9.2f}{http_calls[name]/calls: >11.2f}{recorder.failures[name]: >6}"
+        )
+    print("\n".join(lines))
+    print()
+    print(f"DB calls per event: {sum(db_calls.values())/total:.3f} (outside listeners: {db_calls[None]})")
+    ops = collections.Counter()
+    for (owner, collection, op), n in mongo.counter.calls.items():
+        ops[f"{collection}.{op}"] += n
+    print("  " + ", ".join(f"{k} {v}" for k, v in ops.most_common(10)))
+
+#==================================================================================================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay gateway events into Belphegor without network.")
+    parser.add_argument("--events", type=int, default=20000, help="number of synthetic events")
+    parser.add_argument("--recording", help="JSONL file of raw gateway events ({\"t\": ..., \"d\": ...}), GUILD_CREATE included")
+    parser.add_argument("--guilds", type=int, default=20)
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--channels", type=int, default=5)
+    parser.add_argument("--opt-in", type=float, default=0.3, help="fraction of users opted in to status recording")
+    parser.add_argument("--batch", type=int, default=50, help="events fed between yields to the event loop")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--extensions", nargs="+", default=EXTENSIONS)
+    args = parser.parse_args()
+
+    extensions = []
+    for extension in args.extensions:
+        path = REQUIRED_DATA.get(extension)
+        if path and not os.path.exists(path):
+            print(f"Skipped {extension}, missing {path}")
+        else:
+            extensions.append(extension)
+
+    tmp = tempfile.mkdtemp(prefix="belphegor-replay-")
+    config.SNAPSHOT_PATH = os.path.join(tmp, "snapshot.pickle")
+    config.METRICS_DUMP_PATH = os.path.join(tmp, "metrics.txt")
+    config.EXTENSION_MANIFEST_PATH = os.path.join(tmp, "extension_manifest.json")
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    mongo = fakes.FakeMongoClient()
+    belphybot = ReplayBot(
+        loop=loop, owner_id=config.OWNER_ID, intents=discord.Intents.all(), mongo_client=mongo, session=fakes.FakeSession(),
+        initial_extensions=extensions, lazy_extensions=[]
+    )
+    state = belphybot._connection
+    bot_user = user_payload(BOT_ID)
+    bot_user["bot"] = True
+    state.user = discord.ClientUser(state=state, data=bot_user)
+    http = fakes.FakeDiscordHTTP(bot_user)
+    belphybot.http.request = http.request
+
+    world = World(guilds=args.guilds, members=args.members, channels=args.channels, opt_in=args.opt_in, seed=args.seed)
+    world.seed_database(mongo.belphydb)
+    state._add_guild_from_data({"id": str(DRAGON_SHOUT_GUILD_ID), "name": "dragon", "roles": [], "channels": [], "members": [], "emojis": []})
+    if not args.recording:
+        for guild_id in world.guild_ids:
+            state._add_guild_from_data(world.guild_payload(guild_id))
+
+    async def run():
+        belphybot._ready.set()
+        await wait_loaded(belphybot, extensions)
+        mongo.counter.reset()
+        http.calls.clear()
+        belphybot.recorder.durations.clear()
+        events = read_recording(args.recording) if args.recording else world.stream(args.events)
+        count, elapsed = await replay(belphybot, events, batch=args.batch)
+        report(belphybot, mongo, http, count, elapsed)
+
+    try:
+        loop.run_until_complete(run())
+    finally:
+        tasks = asyncio.all_tasks(loop)
+        for task in tasks:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        loop.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import discord
+from belphegor import utils
+import timeit
+import random
+import string
+
+#==================================================================================================================================================
+
+BOT_ID = 306706699102715907
+DEFAULT_PREFIX = (">>", "bel ")
+GUILD_PREFIXES = sorted(["!", "?", "b!", "bel.", "belphy ", "$$", ">"], reverse=True)
+NUMBER = 200000
+
+#==================================================================================================================================================
+
+def old_get_prefix(gp):
+    prefixes = [f"<@{BOT_ID}> ", f"<@!{BOT_ID}> "]
+    if gp:
+        prefixes.extend(gp)
+    else:
+        prefixes.extend(DEFAULT_PREFIX)
+    return prefixes
+
+def old_match(content, gp):
+    prefixes = old_get_prefix(gp)
+    if content.startswith(tuple(prefixes)):
+        return discord.utils.find(content.startswith, prefixes)
+    else:
+        return None
+
+def random_chat(length=40):
+    return "".join(random.choices(string.ascii_letters+" ", k=length))
+
+def run(label, contents, gp):
+    matcher = utils.PrefixMatcher(old_get_prefix(gp))
+    for content in contents:
+        assert old_match(content, gp) == matcher.match(content), content
+
+    n = NUMBER // len(contents)
+    old = timeit.timeit(lambda: [old_match(c, gp) for c in contents], number=n) / (n * len(contents))
+    new = timeit.timeit(lambda: [matcher.match(c) for c in contents], number=n) / (n * len(contents))
+    print(f"{label: <32} old {old*1e9: >8.1f} ns/msg    new {new*1e9: >8.1f} ns/msg    {old/new: >5.2f}x")
+
+#==================================================================================================================================================
+
+if __name__ == "__main__":
+    random.seed(0)
+    chat = [random_chat() for _ in range(100)]
+    commands = [f">>help {i}" for i in range(50)] + [f"<@!{BOT_ID}> ping" for i in range(50)]
+    custom = [f"belphy {i}" for i in range(50)] + [f"> {i}" for i in range(50)]
+
+    run("default prefixes, chat", chat, None)
+    run("default prefixes, commands", commands, None)
+    run("custom prefixes, chat", chat, GUILD_PREFIXES)
+    run("custom prefixes, commands", custom, GUILD_PREFIXES)
@@ -0,0 +1,115 @@
+import asyncio
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from belphegor import experimental
+from benchmarks import fakes
+
+#==================================================================================================================================================
+
+STATUSES = experimental.STATUSES
+HOURS = experimental.HOURS
+CURRENT_MARK = 70000
+BENCH_DB = "belphegor_bench_status"
+
+#==================================================================================================================================================
+
+def status_items(rng, hours):
+    items = []
+    for mark in range(CURRENT_MARK-hours-1, CURRENT_MARK):
+        for stt in rng.sample(STATUSES, rng.randint(1, 2)):
+            items.append({"mark": mark, "stt": stt, "dur": rng.random()})
+    return items
+
+def hourly_rows(user_id, items, hours, *, expire=False):
+    rows = {}
+    for item in items:
+        row = rows.get(item["mark"])
+        if row is None:
+            row = rows[item["mark"]] = {"user_id": user_id, "mark": item["mark"], **dict.fromkeys(STATUSES, 0)}
+            if expire:
+                #same as experimental._expire_at, with the retention scaled to this run
+                row["expire_at"] = experimental.BEGINNING + timedelta(hours=item["mark"]+hours+1)
+        row[item["stt"]] += item["dur"]
+    return list(rows.values())
+
+async def timed(coro):
+    start = time.perf_counter()
+    result = await coro
+    return time.perf_counter() - start, result
+
+async def open_database(mongo_uri):
+    #a real mongod walks the mark and expire_at indexes, the fake has no index and scans every bucket
+    if mongo_uri:
+        from motor import motor_asyncio
+        client = motor_asyncio.AsyncIOMotorClient(mongo_uri)
+        db = client[BENCH_DB]
+        await client.drop_database(BENCH_DB)
+        await db.user_status_hourly.create_index("mark")
+        #plain index, a TTL one would let the monitor delete mid-run
+        await db.user_status_hourly_ttl.create_index("expire_at")
+        return client, db
+    else:
+        return None, fakes.FakeDatabase("bench", fakes.CallCounter())
+
+#==================================================================================================================================================
+
+async def run(db, users, hours):
+    rng = random.Random(0)
+    arrays = db.user_data
+    buckets = db.user_status_hourly
+    ttl_buckets = db.user_status_hourly_ttl
+    for user_id in range(users):
+        items = status_items(rng, hours)
+        await arrays.insert_one({"user_id": user_id, "status": items})
+        await buckets.insert_many(hourly_rows(user_id, items, hours))
+        await ttl_buckets.insert_many(hourly_rows(user_id, items, hours, expire=True))
+    #hours is the retention of this run, so only the oldest hour falls out
+    cutoff = CURRENT_MARK - hours
+    size = f"{users}x{hours+1}"
+    bucket_count = await buckets.count_documents({})
+
+    #before user-021: every user document rewritten by $pull
+    elapsed, result = await timed(arrays.update_many({}, {"$pull": {"status": {"mark": {"$lt": cutoff}}}}))
+    print(f"{size: <12}{bucket_count: >10}  {'array $pull': <24}{elapsed*1000: >10.1f}ms   {result.modified_count: >8} docs rewritten")
+
+    #user-021 to user-024: the bot deletes the expired hour
+    elapsed, result = await timed(buckets.delete_many({"mark": {"$lt": cutoff}}))
+    print(f"{size: <12}{bucket_count: >10}  {'bucket delete_many': <24}{elapsed*1000: >10.1f}ms   {result.deleted_count: >8} docs deleted")
+
+    #now: buckets carry expire_at and the bot has no hourly pass left, this is the delete mongod's TTL monitor runs instead
+    now = experimental.BEGINNING + timedelta(hours=CURRENT_MARK, minutes=30)
+    elapsed, result = await timed(ttl_buckets.delete_many({"expire_at": {"$lt": now}}))
+    print(f"{size: <12}{bucket_count: >10}  {'ttl expire_at (server)': <24}{elapsed*1000: >10.1f}ms   {result.deleted_count: >8} docs deleted")
+
+    for collection in (arrays, buckets, ttl_buckets):
+        await collection.delete_many({})
+
+async def main(args):
+    client, db = await open_database(args.mongo_uri)
+    print(f"{'mongod at ' + args.mongo_uri if client else 'fake mongo, no index, deletes scan every bucket'}, one hour expiring per user")
+    print(f"{'Users x hrs': <12}{'Buckets': >10}  {'Pass': <24}{'Time': >12}")
+    try:
+        for users in args.users:
+            for hours in args.hours:
+                await run(db, users, hours)
+    finally:
+        if client:
+            await client.drop_database(BENCH_DB)
+            client.close()
+
+#==================================================================================================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time one hourly presence retention pass per storage layout at several sizes.")
+    parser.add_argument("--users", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--hours", type=int, nargs="+", default=[HOURS])
+    parser.add_argument("--mongo-uri", default=os.environ.get("MONGO_URI"), help="time against this mongod instead of the fake, defaults to $MONGO_URI")
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -1,7 +1,7 @@
 import discord
 from discord.ext import commands
 from belphegor import utils
-from belphegor.utils import checks, config, context
+from belphegor.utils import analytics, checks, config, context, counters, emoji_registry, indexes, loader, metrics, pipeline, profiler, scheduler, search_index, snapshot, supervisor
 import asyncio
 import aiohttp
 import psutil
@@ -10,10 +10,13 @@ from motor import motor_asyncio
 import sys
 import traceback
 import functools
+import json
+import time
 
 #==================================================================================================================================================
 
 EMPTY_SET = frozenset()
+EMPTY_TUPLE = ()
 
 #==================================================================================================================================================
 
@@ -22,41 +25,93 @@ class Belphegor(commands.AutoShardedBot):
         super().__init__(None, **kwargs)
         self.default_prefix = kwargs.get("default_prefix", (">>", "bel "))
         self.guild_prefixes = {}
-        self.session = aiohttp.ClientSession(loop=self.loop)
+        self.prefix_matchers = {}
+        self.auto_rep_disabled = set()
+        self.message_pipeline = pipeline.MessagePipeline(self)
+        self.session = kwargs.get("session") or aiohttp.ClientSession(loop=self.loop)
         self.process = psutil.Process(os.getpid())
         self.cpu_count = psutil.cpu_count()
         self.process.cpu_percent(None)
         self.start_time = utils.now_time()
         self.loop.create_task(self.load())
-        self.mongo_client = motor_asyncio.AsyncIOMotorClient()
-        self.db = self.mongo_client.belphydb
-        self.counter = 0
+        self.metrics = metrics.Metrics(self.loop)
+        self.loop.set_default_executor(metrics.TimedExecutor(self.metrics))
+        self.query_profiler = profiler.QueryProfiler()
+        self.mongo_client = kwargs.get("mongo_client") or motor_asyncio.AsyncIOMotorClient(event_listeners=[self.metrics.listener, self.query_profiler])
+        self.db = loader.LoaderDatabase(self.mongo_client.belphydb)
+        self.index_registry = indexes.IndexRegistry(self.db)
+        self.emoji_registry = emoji_registry.EmojiRegistry(self)
+        self.search_indexes = search_index.SearchIndexes(self.db, self.loop, cache_size=config.SEARCH_CACHE_SIZE, create_task=self.create_task)
+        self.counters = counters.CounterBuffer(self.db, interval=config.COUNTER_FLUSH_INTERVAL, max_pending=config.COUNTER_MAX_PENDING)
+        self.command_analytics = analytics.CommandAnalytics(self.db, self.counters)
+        self.supervisor = supervisor.TaskSupervisor(self.loop, limits=kwargs.get("task_limits", config.TASK_LIMITS))
+        cpu_config = kwargs.get("cpu_scheduler", config.CPU_SCHEDULER)
+        self.cpu_scheduler = scheduler.CPUScheduler(
+            self.loop,
+            executor=metrics.TimedExecutor(self.metrics, max_workers=cpu_config.get("workers", 2), thread_name_prefix="cpu"),
+            create_task=self.create_task,
+            **cpu_config
+        )
         self.bot_lock = asyncio.Lock()
         self.initial_extensions = kwargs.get("initial_extensions", config.all_extensions)
+        self.lazy_extension_names = set(kwargs.get("lazy_extensions", config.lazy_extensions))
+        self.lazy_extensions = {}
+        self.lazy_lock = asyncio.Lock()
+        self.extension_timings = {}
         self.restart_flag = False
+        self.closing = False
         self.saved_stuff = {}
+        self.snapshots = snapshot.SnapshotStore(config.SNAPSHOT_PATH, max_age=config.SNAPSHOT_MAX_AGE)
+        restored = self.snapshots.load()
+        if restored:
+            print(f"Restored {restored} cog snapshots")
         self.default_activity = discord.Game(name="with Chronos-senpai")
 
-    async def get_prefix(self, message):
+    def get_all_prefixes(self, guild_id):
         prefixes = [f"<@{self.user.id}> ", f"<@!{self.user.id}> "]
-        if message.guild:
-            gp = self.guild_prefixes.get(message.guild.id)
-        else:
-            gp = None
+        gp = self.guild_prefixes.get(guild_id)
         if gp:
             prefixes.extend(gp)
         else:
             prefixes.extend(self.default_prefix)
         return prefixes
 
+    def get_prefix_matcher(self, guild_id):
+        try:
+            return self.prefix_matchers[guild_id]
+        except KeyError:
+            matcher = utils.PrefixMatcher(self.get_all_prefixes(guild_id))
+            self.prefix_matchers[guild_id] = matcher
+            return matcher
+
+    def update_prefix_matcher(self, guild_id):
+        self.prefix_matchers.pop(guild_id, None)
+
+    async def get_prefix(self, message):
+        guild_id = getattr(message.guild, "id", None)
+        return self.get_prefix_matcher(guild_id).match(message.content) or EMPTY_TUPLE
+
     async def process_commands(self, message):
         ctx = await self.get_context(message, cls=context.BelphegorContext)
         await self.invoke(ctx)
 
+    def dispatch(self, event_name, *args, **kwargs):
+        token = loader.begin_scope()
+        try:
+            super().dispatch(event_name, *args, **kwargs)
+        finally:
+            loader.end_scope(token)
+
+    async def invoke(self, ctx):
+        if ctx.command is None:
+            return await super().invoke(ctx)
+        with self.metrics.measure(ctx.command.qualified_name) as invocation:
+            await super().invoke(ctx)
+            if ctx.invoked_subcommand:
+                invocation.name = ctx.invoked_subcommand.qualified_name
+
     async def on_message(self, message):
-        if message.author.bot:
-            return
-        await self.process_commands(message)
+        await self.message_pipeline.process(message)
 
     async def on_command_error(self, ctx, error):
         if hasattr(ctx.command, 'on_error'):
@@ -76,14 +131,33 @@ class Belphegor(commands.AutoShardedBot):
         await asyncio.sleep(5)
         await self.change_presence(activity=self.default_activity)
 
-    def create_task_and_count(self, coro):
-        self.counter += 1
+    async def on_guild_emojis_update(self, guild, before, after):
+        self.emoji_registry.update(guild, after)
 
-        async def do_stuff():
-            await coro
-            self.counter -= 1
+    async def on_guild_remove(self, guild):
+        self.emoji_registry.drop(guild.id)
 
-        self.loop.create_task(do_stuff())
+    def create_task(self, coro, *, name=None, category="default", owner=None):
+        return self.supervisor.create_task(coro, name=name, category=category, owner=owner)
+
+    def add_cog(self, cog):
+        super().add_cog(cog)
+        db_indexes = getattr(cog, "db_indexes", None)
+        if db_indexes:
+            self.create_task(self.index_registry.ensure(cog.qualified_name, db_indexes), category="index_setup")
+        search_collections = getattr(cog, "search_collections", None)
+        if search_collections:
+            self.create_task(self.search_indexes.build_many(search_collections), category="index_setup")
+
+    def remove_cog(self, name):
+        cog = self.get_cog(name)
+        if cog:
+            self.snapshots.store(cog)
+            for collection in getattr(cog, "search_collections", ()):
+                self.search_indexes.drop(collection)
+            self.emoji_registry.unsubscribe(cog)
+        super().remove_cog(name)
+        self.supervisor.cancel_owner(name)
 
     async def run_in_lock(self, *args, **kwargs):
         args = list(args)
@@ -99,69 +173,84 @@ class Belphegor(commands.AutoShardedBot):
         else:
             raise TypeError("Wat. You serious?")
 
-    async def logout(self):
-        await self.session.close()
-        await super().logout()
+    async def run_cpu(self, ctx, func, *args, **kwargs):
+        return await self.cpu_scheduler.run(func, *args, ctx=ctx, **kwargs)
+
+    def save_snapshot(self):
+        for cog in self.cogs.values():
+            self.snapshots.store(cog)
+        try:
+            count = self.snapshots.save()
+        except OSError:
+            traceback.print_exc()
+        else:
+            print(f"Saved {count} cog snapshots")
+
+    async def close(self):
+        #logout, restart and Client.run all end here, everything that writes goes before the connection closes
+        #since the loop is stopped as soon as it does
+        if self.closing or self.is_closed():
+            return
+        self.closing = True
         print("Logging out...")
-        while self.counter > 0:
-            await asyncio.sleep(0.1)
-        await asyncio.sleep(3)
+        #pickled while the extension modules are still loaded, so snapshot classes resolve
+        self.save_snapshot()
+        #cog_unload queues its shutdown tasks while still connected
+        for extension in tuple(self.extensions):
+            try:
+                self.unload_extension(extension)
+            except Exception:
+                traceback.print_exc()
+        for name in tuple(self.cogs):
+            try:
+                self.remove_cog(name)
+            except Exception:
+                traceback.print_exc()
+        await self.supervisor.wait_category("shutdown")
+        #stats tasks write what they hold once cancelled by their cog unload
+        await self.supervisor.wait_category("stats", timeout=30)
+        await self.counters.flush()
+        self.cpu_scheduler.shutdown()
         if "google" in self.saved_stuff:
             self.saved_stuff["google"].terminate()
+        await self.session.close()
+        await super().close()
 
     def block_or_not(self, ctx):
         author_id = ctx.author.id
-        channel_id = getattr(ctx.channel, "id", None)
-        guild_id = getattr(ctx.guild, "id", None)
 
         if author_id in self.blocked_user_ids:
-            self.loop.create_task(ctx.send("Omae wa mou blocked.", delete_after=30))
-            self.do_after(ctx.message.delete(), 30)
+            self.create_task(ctx.send("Omae wa mou blocked.", delete_after=30), category="block_notice")
+            self.do_after(ctx.message.delete(), 30, category="delayed_delete")
             return False
 
-        blocked_data = self.disabled_data.get(guild_id)
-        if blocked_data:
+        policy = self.command_policies.get(getattr(ctx.guild, "id", None))
+        if policy:
             if getattr(ctx.command, "hidden", None) or getattr(ctx.command, "qualified_name", "").partition(" ")[0] in ("enable", "disable"):
                 return True
 
-            if blocked_data.get("disabled_bot_guild", False):
-                self.loop.create_task(ctx.send("Command usage is disabled in this server.", delete_after=30))
-                self.do_after(ctx.message.delete(), 30)
-                return False
-            if channel_id in blocked_data.get("disabled_bot_channel", EMPTY_SET):
-                self.loop.create_task(ctx.send("Command usage is disabled in this channel.", delete_after=30))
-                self.do_after(ctx.message.delete(), 30)
-                return False
-            if author_id in blocked_data.get("disabled_bot_member", EMPTY_SET):
-                self.loop.create_task(ctx.send("You are forbidden from using bot commands in this server.", delete_after=30))
-                self.do_after(ctx.message.delete(), 30)
-                return False
-
-            cmd_name = ctx.command.qualified_name
-            if cmd_name in blocked_data.get("disabled_command_guild", EMPTY_SET):
-                self.loop.create_task(ctx.send("This command is disabled in this server.", delete_after=30))
-                self.do_after(ctx.message.delete(), 30)
-                return False
-            if (cmd_name, channel_id) in blocked_data.get("disabled_command_channel", EMPTY_SET):
-                self.loop.create_task(ctx.send("This command is disabled in this channel.", delete_after=30))
-                self.do_after(ctx.message.delete(), 30)
-                return False
-            if (cmd_name, author_id) in blocked_data.get("disabled_command_member", EMPTY_SET):
-                self.loop.create_task(ctx.send("You are forbidden from using this command in this server.", delete_after=30))
-                self.do_after(ctx.message.delete(), 30)
+            reason = policy.deny_reason(ctx.command.qualified_name, getattr(ctx.channel, "id", None), author_id)
+            if reason:
+                self.create_task(ctx.send(reason, delete_after=30), category="block_notice")
+                self.do_after(ctx.message.delete(), 30, category="delayed_delete")
                 return False
         return True
 
-    async def load(self):
+    def update_command_policy(self, guild_id):
+        self.command_policies[guild_id] = checks.CommandPolicy(self.disabled_data.get(guild_id, {}), previous=self.command_policies.get(guild_id))
+
+    async def load_prefixes(self):
         async for guild_data in self.db.guild_data.find({"prefixes": {"$exists": True, "$ne": []}}, projection={"_id": -1, "guild_id": 1, "prefixes": 1}):
             if guild_data["prefixes"]:
                 guild_data["prefixes"].sort(reverse=True)
                 self.guild_prefixes[guild_data["guild_id"]] = guild_data["prefixes"]
+        self.prefix_matchers.clear()
 
+    async def load_blocked_users(self):
         bot_data = await self.db.belphegor_config.find_one({"category": "block"})
         self.blocked_user_ids = set(bot_data.get("blocked_user_ids", []))
 
-        self.disabled_data = {}
+    async def load_disabled_data(self):
         async for guild_data in self.db.guild_data.find(
             {
                 "$or": [
@@ -195,7 +284,7 @@ class Belphegor(commands.AutoShardedBot):
                         }
                     },
                     {
-                        "disabled_bot_member": {
+                        "disabled_command_member": {
                             "$exists": True,
                             "$ne": []
                         }
@@ -215,17 +304,124 @@ class Belphegor(commands.AutoShardedBot):
         ):
             guild_id = guild_data.pop("guild_id")
             self.disabled_data[guild_id] = {key: (value if isinstance(value, bool) else set(tuple(v) if isinstance(v, list) else v for v in value)) for key, value in guild_data.items()}
+            self.update_command_policy(guild_id)
+
+    async def load(self):
+        self.create_task(self.metrics.sample_loop_lag(), category="metrics")
+        self.create_task(self.metrics.dump_loop(config.METRICS_DUMP_PATH, config.METRICS_DUMP_INTERVAL), category="metrics")
+        self.create_task(self.counters.flush_regularly(), category="counters")
+        self.create_task(self.index_registry.ensure("CommandAnalytics", self.command_analytics.db_indexes), category="index_setup")
+
+        self.disabled_data = {}
+        self.command_policies = {}
+        await asyncio.gather(self.load_prefixes(), self.load_blocked_users(), self.load_disabled_data(), self.command_analytics.load())
         self.add_check(self.block_or_not)
 
         await self.wait_until_ready()
+        manifest = self.read_extension_manifest()
         for extension in self.initial_extensions:
             try:
-                self.load_extension(extension)
-                print(f"Loaded {extension}")
+                if extension in self.lazy_extension_names and extension in manifest:
+                    self.add_lazy_extension(extension, manifest[extension])
+                else:
+                    self.timed_load_extension(extension)
             except Exception as e:
                 print(f"Failed loading {extension}: {e}")
-                return await self.logout()
-        print("Done")
+                return await self.close()
+        self.write_extension_manifest()
+
+        cog = self.get_cog("Help")
+        if cog:
+            cog.setup_help()
+        print(self.extension_report())
+        print(f"Done in {(utils.now_time() - self.start_time).total_seconds():.2f}s")
+
+    def timed_load_extension(self, extension, mode="eager"):
+        start = time.perf_counter()
+        self.load_extension(extension)
+        self.extension_timings[extension] = (mode, time.perf_counter() - start)
+        print(f"Loaded {extension}")
+
+    def extension_commands(self, extension):
+        package = f"{extension}."
+        ret = []
+        for command in self.commands:
+            module = command.callback.__module__
+            if module == extension or module.startswith(package):
+                ret.append({
+                    "name": command.name,
+                    "aliases": list(command.aliases),
+                    "help": command.help,
+                    "brief": getattr(command, "brief", None),
+                    "category": getattr(command, "category", None),
+                    "field": getattr(command, "field", "Commands"),
+                    "paragraph": getattr(command, "paragraph", 0),
+                    "hidden": command.hidden
+                })
+        return ret
+
+    def read_extension_manifest(self):
+        try:
+            with open(config.EXTENSION_MANIFEST_PATH, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_extension_manifest(self):
+        manifest = self.read_extension_manifest()
+        for extension in self.lazy_extension_names:
+            if extension in self.extensions:
+                manifest[extension] = self.extension_commands(extension)
+        with open(config.EXTENSION_MANIFEST_PATH, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=4, ensure_ascii=False)
+
+    def add_lazy_extension(self, extension, entries):
+        start = time.perf_counter()
+
+        async def lazy_load(ctx):
+            await self.load_lazy_extension(extension)
+            await self.process_commands(ctx.message)
+
+        for entry in entries:
+            command = commands.Command(lazy_load, name=entry["name"], aliases=entry["aliases"], help=entry["help"], hidden=entry["hidden"])
+            if entry["category"] is not None or entry["brief"] is not None:
+                command.brief = entry["brief"]
+                command.category = entry["category"]
+                command.field = entry["field"]
+                command.paragraph = entry["paragraph"]
+            #the real command counts the invocation once it's loaded
+            command.lazy = True
+            self.add_command(command)
+        self.lazy_extensions[extension] = [entry["name"] for entry in entries]
+        self.extension_timings[extension] = ("lazy", time.perf_counter() - start)
+
+    async def load_lazy_extension(self, extension):
+        async with self.lazy_lock:
+            names = self.lazy_extensions.pop(extension, None)
+            if names is None:
+                return
+            placeholders = [self.remove_command(name) for name in names]
+            try:
+                self.timed_load_extension(extension, "on demand")
+            except Exception as e:
+                print(f"Failed loading {extension}: {e}")
+                #put the placeholders back so the next invoke retries
+                for command in placeholders:
+                    if command:
+                        self.add_command(command)
+                self.lazy_extensions[extension] = names
+                raise checks.CustomError(f"Failed loading {extension}, try again later.")
+            self.write_extension_manifest()
+            cog = self.get_cog("Help")
+            if cog:
+                cog.setup_help()
+
+    def extension_report(self):
+        lines = [f"{'Extension': <26}{'Mode': >11}{'Time(ms)': >10}"]
+        for extension, (mode, duration) in sorted(self.extension_timings.items(), key=lambda x: x[1][1], reverse=True):
+            lines.append(f"{extension: <26}{mode: >11}{duration*1000: >10.1f}")
+        lines.append(f"{'Total': <26}{'': >11}{sum(t[1] for t in self.extension_timings.values())*1000: >10.1f}")
+        return "\n".join(lines)
 
     async def fetch(self, url, **kwargs):
         return await utils.fetch(self.session, url, **kwargs)
@@ -233,11 +429,5 @@ class Belphegor(commands.AutoShardedBot):
     async def download(self, url, path, **kwargs):
         return await utils.download(self.session, url, path, **kwargs)
 
-    def do_after(self, coro, wait_time):
-        async def things_to_do():
-            await asyncio.sleep(wait_time)
-            try:
-                await coro
-            except:
-                pass
-        self.loop.create_task(things_to_do())
+    def do_after(self, coro, wait_time, *, category="delayed", owner=None):
+        return self.supervisor.do_after(coro, wait_time, category=category, owner=owner)